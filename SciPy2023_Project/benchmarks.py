@@ -0,0 +1,168 @@
+"""
+Benchmarks for the data processing and plotting hot paths on synthetic surveys.
+
+Every benchmark runs on a fresh processor for each survey size in the sweep, and the results are written
+as JSON records (one per benchmark and size) with the best wall-clock time and the peak memory allocated
+by Python during one run.
+
+Example:
+    python benchmarks.py --respondents 100 1000 10000 --tasks 3 10 --output bench.json
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+
+from data_processing_API import SurveyDataProcessor
+from synthetic import generate_survey_frame
+
+
+WEIGHTS = {"E": 0.1, "Q": 0.2, "S": 0.1, "P": 0.3, "Si": 0.3}
+
+
+def _bind(function, *args):
+    return lambda: function(*args)
+
+
+def _processor(df, name='Synthetic survey'):
+    return SurveyDataProcessor.from_dataframe(name, df)
+
+
+# Each benchmark takes the two synthetic surveys of a size and returns a setup function. Setup builds
+# fresh processors (so no cached results are reused) and returns the function to measure.
+def _data_benchmarks():
+    return {
+        'calculate_averages': lambda df1, df2: _processor(df1).calculate_averages,
+        'calculate_general_averages': lambda df1, df2: _processor(df1).calculate_general_averages,
+        'compute_prioritization_scores': lambda df1, df2: _bind(
+            _processor(df1).compute_prioritization_scores, _processor(df1).calculate_averages(), WEIGHTS),
+        'prepare_data_for_violinplot': lambda df1, df2: _processor(df1).prepare_data_for_violinplot,
+    }
+
+
+def _plot_benchmarks():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import visualizations as viz
+
+    def plot(function, *args):
+        def run():
+            plt.close(function(*args, show=False))
+        return run
+
+    def averages(df):
+        return _processor(df).calculate_averages()
+
+    return {
+        'create_grouped_bar_charts': lambda df1, df2: plot(
+            viz.create_grouped_bar_charts, averages(df1), _processor(df1).DIMENSIONS, _processor(df1).TASKS),
+        'create_heatmap': lambda df1, df2: plot(viz.create_heatmap, averages(df1)),
+        'create_line_graphs': lambda df1, df2: plot(viz.create_line_graphs, averages(df1), _processor(df1).TASKS),
+        'plot_prioritization_scores': lambda df1, df2: plot(
+            viz.plot_prioritization_scores, _processor(df1).compute_prioritization_scores(averages(df1), WEIGHTS)),
+        'plot_task_specific_scores': lambda df1, df2: plot(
+            viz.plot_task_specific_scores, averages(df1), averages(df2), _processor(df1).TASKS, _processor(df1).DIMENSIONS),
+        'plot_general_comparison': lambda df1, df2: plot(viz.plot_general_comparison, _processor(df1), _processor(df2)),
+        'plot_violin_graph': lambda df1, df2: plot(
+            viz.plot_violin_graph, _processor(df1).prepare_data_for_violinplot(), _processor(df2).prepare_data_for_violinplot()),
+    }
+
+
+def measure(setup, df1, df2, repeat=3):
+    """
+    Times a benchmark and records its peak memory.
+
+    Parameters:
+    - setup (callable): Builds the function to measure from the two synthetic surveys.
+    - df1 (DataFrame): The first synthetic survey.
+    - df2 (DataFrame): The second synthetic survey.
+    - repeat (int, optional): Number of timed runs; the fastest one is reported. Default is 3.
+
+    Returns:
+    - dict: 'seconds' (best wall-clock time) and 'peak_bytes' (peak traced allocation of one run).
+    """
+    timings = []
+    for _ in range(repeat):
+        run = setup(df1, df2)
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    # Trace memory in a separate run, since tracing slows the code down
+    run = setup(df1, df2)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def run_benchmarks(respondents=(100, 1000), tasks=(3,), questions_per_group=(1,), n_general=5, missing_rate=0.1,
+                   repeat=3, plots=True, names=None, seed=0):
+    """
+    Runs every benchmark across a sweep of survey sizes.
+
+    Parameters:
+    - respondents (tuple, optional): Numbers of respondents to sweep.
+    - tasks (tuple, optional): Numbers of tasks to sweep.
+    - questions_per_group (tuple, optional): Numbers of questions per task and dimension to sweep.
+    - n_general (int, optional): Number of general questions. Default is 5.
+    - missing_rate (float, optional): Probability that an answer is missing. Default is 0.1.
+    - repeat (int, optional): Timed runs per benchmark. Default is 3.
+    - plots (bool, optional): If False, skip the plotting benchmarks. Default is True.
+    - names (list, optional): Only run the benchmarks with these names.
+    - seed (int, optional): Seed for the synthetic surveys. Default is 0.
+
+    Yields:
+    - dict: One result record per benchmark and survey size.
+    """
+    benchmarks = _data_benchmarks()
+    if plots:
+        benchmarks.update(_plot_benchmarks())
+    if names:
+        benchmarks = {name: setup for name, setup in benchmarks.items() if name in names}
+
+    for n_respondents, n_tasks, n_questions in itertools.product(respondents, tasks, questions_per_group):
+        size = dict(n_respondents=n_respondents, n_tasks=n_tasks, questions_per_group=n_questions,
+                    n_general=n_general, missing_rate=missing_rate)
+        df1 = generate_survey_frame(seed=seed, **size)
+        df2 = generate_survey_frame(seed=seed + 1, **size)
+        for name, setup in benchmarks.items():
+            yield {'benchmark': name, **size, 'columns': df1.shape[1], **measure(setup, df1, df2, repeat)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark SurveyDataProcessor and visualizations on synthetic surveys.')
+    parser.add_argument('--respondents', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--tasks', type=int, nargs='+', default=[3, 30])
+    parser.add_argument('--questions-per-group', type=int, nargs='+', default=[1])
+    parser.add_argument('--general', type=int, default=5, help='Number of general questions')
+    parser.add_argument('--missing-rate', type=float, default=0.1)
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark (the fastest is reported)')
+    parser.add_argument('--no-plots', action='store_true', help='Skip the plotting benchmarks')
+    parser.add_argument('--only', nargs='+', help='Run only the benchmarks with these names')
+    parser.add_argument('--output', help='Write the results to this JSON file instead of standard output')
+    args = parser.parse_args(argv)
+
+    results = []
+    for record in run_benchmarks(args.respondents, args.tasks, args.questions_per_group, args.general,
+                                 args.missing_rate, args.repeat, not args.no_plots, args.only):
+        results.append(record)
+        print(f"{record['benchmark']:<32} respondents={record['n_respondents']:<7} tasks={record['n_tasks']:<4} "
+              f"{record['seconds'] * 1000:10.2f} ms {record['peak_bytes'] / 2 ** 20:9.2f} MiB", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
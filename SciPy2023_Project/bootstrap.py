@@ -0,0 +1,104 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from survey_schema import group_indicator
+
+
+# Bootstrap resampling of survey respondents.
+#
+# Each replicate is a row of respondent indices drawn with replacement. A replicate's column sums and
+# answer counts are matrix products of its respondent multiplicities with the score matrix, so a whole
+# chunk of replicates is computed with two matmuls instead of one pandas pass per replicate.
+
+
+def replicate_group_means(scores, group, n_groups, indices):
+    """
+    Computes the task/dimension averages of many bootstrap replicates at once.
+
+    As in `calculate_averages`, a group's average is the mean of its column means.
+
+    Parameters:
+    - scores (ndarray): The (respondents × columns) score matrix with NaN for missing answers.
+    - group (ndarray): Group code of each score column.
+    - n_groups (int): Number of groups.
+    - indices (ndarray): A (replicates × respondents) array of resampled respondent indices.
+
+    Returns:
+    - ndarray: A (replicates × groups) array of averages; NaN where a replicate has no answers for a group.
+    """
+    n_replicates, n_respondents = indices.shape
+
+    # How often each respondent was drawn in each replicate
+    offsets = np.arange(n_replicates)[:, np.newaxis] * n_respondents
+    multiplicity = np.bincount((indices + offsets).ravel(), minlength=n_replicates * n_respondents)
+    multiplicity = multiplicity.reshape(n_replicates, n_respondents).astype(np.float64)
+
+    answered = ~np.isnan(scores)
+    sums = multiplicity @ np.where(answered, scores, 0.0)
+    counts = multiplicity @ answered.astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        column_means = sums / counts
+
+    indicator = group_indicator(group, n_groups)
+    valid = ~np.isnan(column_means)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (np.where(valid, column_means, 0.0) @ indicator) / (valid @ indicator)
+
+
+def _bootstrap_chunk(scores, group, n_groups, n_replicates, seed):
+    """Draws and evaluates one chunk of replicates; runs in a worker process."""
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, len(scores), size=(n_replicates, len(scores)))
+    return replicate_group_means(scores, group, n_groups, indices)
+
+
+def bootstrap_group_means(scores, group, n_groups, n_replicates=1000, seed=None, n_jobs=None, chunk_size=250):
+    """
+    Draws bootstrap replicates of the task/dimension averages.
+
+    The replicates are split into chunks, each with its own seed derived from `seed`, so the result is the
+    same whether the chunks run serially or on a process pool.
+
+    Parameters:
+    - scores (ndarray): The (respondents × columns) score matrix with NaN for missing answers.
+    - group (ndarray): Group code of each score column.
+    - n_groups (int): Number of groups.
+    - n_replicates (int, optional): Number of replicates. Default is 1000.
+    - seed (int, optional): Seed for reproducible resampling.
+    - n_jobs (int, optional): Number of worker processes. Default (None or 1) runs in this process.
+    - chunk_size (int, optional): Replicates per chunk. Default is 250.
+
+    Returns:
+    - ndarray: A (replicates × groups) array of averages.
+    """
+    sizes = [min(chunk_size, n_replicates - start) for start in range(0, n_replicates, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [(scores, group, n_groups, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if n_jobs is None or n_jobs == 1:
+        chunks = [_bootstrap_chunk(*args) for args in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunks = list(executor.map(_bootstrap_chunk, *zip(*arguments)))
+
+    if not chunks:
+        return np.empty((0, n_groups))
+    return np.vstack(chunks)
+
+
+def percentile_interval(replicates, confidence=0.95):
+    """
+    Returns the percentile confidence interval of bootstrap replicates.
+
+    Parameters:
+    - replicates (ndarray): A (replicates × values) array.
+    - confidence (float, optional): Coverage of the interval. Default is 0.95.
+
+    Returns:
+    - tuple: (lower, upper) arrays with one bound per value.
+    """
+    tail = (1 - confidence) / 2 * 100
+    with np.errstate(invalid='ignore'):
+        lower, upper = np.nanpercentile(replicates, [tail, 100 - tail], axis=0)
+    return lower, upper
@@ -0,0 +1,124 @@
+"""
+Command-line entry point that prints survey averages and prioritization scores as JSON.
+
+Only the data processing modules are imported, so a run never loads the plotting stack, and an
+offline run never loads the Google API libraries either.
+
+Example:
+    python cli.py "Thiago Bachelor Thesis v.2 (Responses)" --weights E=0.1,Q=0.2,S=0.1,P=0.3,Si=0.3
+
+Large response exports can be aggregated chunk by chunk instead of being loaded into memory:
+    python cli.py archive-2022.csv archive-2023.parquet --files
+"""
+import argparse
+import json
+import sys
+
+import instrumentation
+from streaming import aggregate_file
+from survey_loader import load_surveys
+from survey_storage import CSVExportStore, default_store
+
+
+# Same default weights as in main.py
+DEFAULT_WEIGHTS = {
+    "E": 0.1,
+    "Q": 0.2,
+    "S": 0.1,
+    "P": 0.3,
+    "Si": 0.3
+}
+
+
+def parse_weights(text):
+    """
+    Parses dimension weights given as 'E=0.1,Q=0.2,...'.
+
+    Parameters:
+    - text (str): Comma-separated dimension=weight pairs.
+
+    Returns:
+    - dict: Dimensions as keys and their weights as values.
+    """
+    weights = {}
+    for pair in text.split(','):
+        dimension, _, weight = pair.partition('=')
+        weights[dimension.strip()] = float(weight)
+    return weights
+
+
+def _records(frame):
+    """Converts a DataFrame or Series into JSON-ready values, with NaN as null."""
+    orient = 'records' if frame.ndim == 2 else 'index'
+    return json.loads(frame.to_json(orient=orient))
+
+
+def summarize(processor, weights):
+    """
+    Collects the averages, general averages and prioritization scores of one survey.
+
+    Parameters:
+    - processor (SurveyDataProcessor or StreamingAggregate): The survey to summarize.
+    - weights (dict): Dimension weights for the prioritization scores.
+
+    Returns:
+    - dict: JSON-ready summary of the survey.
+    """
+    averages = processor.calculate_averages()
+    return {
+        'averages': _records(averages),
+        'general_averages': _records(processor.calculate_general_averages()),
+        'prioritization_scores': _records(processor.compute_prioritization_scores(averages, weights)),
+    }
+
+
+def _run(args):
+    """Loads or aggregates the requested surveys and prints their summaries."""
+    if args.files:
+        summary = {path: summarize(aggregate_file(path, chunksize=args.chunksize), args.weights)
+                   for path in args.surveys}
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        return
+
+    options = {'offline': args.offline or args.csv_dir is not None}
+    if args.csv_dir is not None:
+        options['store'] = CSVExportStore(args.csv_dir)
+    elif args.cache_dir is not None:
+        options['store'] = default_store(args.cache_dir)
+
+    loaded = dict(load_surveys(args.surveys, max_workers=args.workers, **options))
+    summary = {survey_name: summarize(loaded[survey_name], args.weights) for survey_name in args.surveys}
+    json.dump(summary, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print survey averages and prioritization scores as JSON.')
+    parser.add_argument('surveys', nargs='+', help='Names of the Google Sheets to analyze (file paths with --files)')
+    parser.add_argument('--weights', type=parse_weights, default=DEFAULT_WEIGHTS,
+                        help='Dimension weights as E=0.1,Q=0.2,... (default: the weights used in main.py)')
+    parser.add_argument('--offline', action='store_true', help='Use local copies only, never contact Google Sheets')
+    parser.add_argument('--csv-dir', help='Folder of CSV exports to read in offline mode')
+    parser.add_argument('--cache-dir', help='Folder for the local copies of fetched sheets')
+    parser.add_argument('--workers', type=int, default=4, help='Number of surveys fetched concurrently')
+    parser.add_argument('--files', action='store_true',
+                        help='Treat the surveys as CSV or Parquet exports and aggregate them chunk by chunk')
+    parser.add_argument('--chunksize', type=int, default=50_000, help='Rows per chunk with --files')
+    parser.add_argument('--trace', help='Record stage timings and sizes to this JSON file '
+                                        "(Chrome trace format if it ends in '.trace.json')")
+    parser.add_argument('--profile', action='store_true', help='With --trace, also profile every stage with cProfile')
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        instrumentation.enable(profile=args.profile)
+        try:
+            _run(args)
+        finally:
+            instrumentation.export(args.trace)
+    else:
+        _run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,79 @@
-import gspread
+import functools
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
-from oauth2client.service_account import ServiceAccountCredentials
+from pandas.api.types import union_categoricals
+
+from bootstrap import bootstrap_group_means, percentile_interval
+from densities import density_frame, score_counts
+from instrumentation import count, instrumented, is_enabled, span
+from prioritization import averages_matrix, score_batch, score_coefficients, weighted_dimensions, weights_matrix
+from survey_aggregates import ScoreAccumulator
+from survey_schema import ColumnSchema, column_letter, compact_scores, score_matrix
+from survey_storage import append_frame, columnar_frame, default_store, grid_frame, unique_header
+
+
+def _freeze(value):
+    """Turns a method argument into a hashable cache key, using the contents (not the identity) of frames and arrays."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes()).hexdigest()
+        labels = tuple(value.columns) if isinstance(value, pd.DataFrame) else value.name
+        return (type(value).__name__, labels, digest)
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.dtype.str, value.shape, hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest())
+    if isinstance(value, dict):
+        return ('dict', tuple((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(item) for item in value))
+    return value
+
+
+def _memoized(method):
+    """
+    Caches the results of a processor method per argument values in the processor's LRU result cache.
+
+    The cache is cleared whenever `df` is replaced, and callers receive copies, so modifying a returned
+    frame never changes later results.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, _freeze(args), _freeze(tuple(sorted(kwargs.items()))))
+        results = self._results
+        if key in results:
+            count('cache.hits')
+            results.move_to_end(key)
+        else:
+            count('cache.misses')
+            results[key] = method(self, *args, **kwargs)
+            while len(results) > self.RESULT_CACHE_SIZE:
+                results.popitem(last=False)
+        return results[key].copy()
+    return wrapper
+
+
+def _count_fetched(rows):
+    """Reports the rows and characters of a downloaded value grid to the instrumentation."""
+    if is_enabled():
+        count('fetch.rows', len(rows))
+        count('fetch.bytes', sum(len(str(cell)) for row in rows for cell in row))
+
+
+def _same_answer(value, stored):
+    """Compares one answer of a sheet row with its ingested value; missing answers only equal each other."""
+    if pd.isna(value) or pd.isna(stored):
+        return bool(pd.isna(value) and pd.isna(stored))
+    try:
+        return float(value) == float(stored)
+    except (TypeError, ValueError):
+        return str(value) == str(stored)
 
 
-# This class handles data retrieval and processing of survey data from Google Sheets
+# This class handles data retrieval and processing of survey data from Google Sheets.
+# The Google API libraries (gspread, oauth2client) are only imported once a sheet has to be fetched,
+# so offline and cached runs do not pay for them.
 class SurveyDataProcessor:
     
     # Define the scope of permissions for the Google Sheets API
@@ -11,54 +81,411 @@ class SurveyDataProcessor:
     # Path to the Google service account credentials JSON file
 
     CREDS_PATH = '/Users/thiagogoldschmidt/Desktop/Thesis_Python_script/bachelor-thesis-survey-5cfd13208281.json'
-    TASKS = [1, 2, 3]
-    # Define the tasks and dimensions for the survey analysis
-    # Tasks represent different sections or parts of the survey.
-    # Dimensions represent different metrics or categories within each task.
-    DIMENSIONS = ['E', 'Q', 'S', 'P', 'Si']  # E for Efficiency, Q for Quality, S for Satisfaction, P for Prevalence, Si for Significance
+    # Folder for the local copies of fetched sheets
+    CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.survey_cache')
+    # Number of columns fetched per range when reading a sheet; None fetches the whole grid in one range
+    COLUMN_BATCH = None
+    # Number of derived results (averages, scores, violin data, ...) kept per processor
+    RESULT_CACHE_SIZE = 32
     
-    def __init__(self, survey_name):
+    def __init__(self, survey_name, store=None, offline=False, client=None):
         """
         Initializes the SurveyDataProcessor with a specified survey name.
+
+        Nothing is fetched here: the client is authorized and the data is loaded on first access to
+        `client` and `df` (or by calling `load()`).
     
         Args:
         - survey_name (str): The name of the Google Sheet containing the survey data.
+        - store (SheetStore, optional): Local cache for the sheet data. Defaults to the fastest store
+          available in `CACHE_DIR`; pass a `CSVExportStore` to work from local CSV exports.
+        - offline (bool, optional): If True, never contact Google Sheets and read the data from `store` only.
+        - client (Client, optional): An already authorized Google Sheets client to reuse instead of authorizing a new one.
     
         Attributes:
         - survey_name (str): Stores the name of the survey.
-        - client (Client): Google Sheets API client authorized using provided credentials.
+        - store (SheetStore): Local cache for the sheet data.
+        - offline (bool): Whether the data is read from the local cache only.
+        - client (Client): Google Sheets API client authorized using provided credentials (None when offline).
         - df (DataFrame): Data retrieved from the Google Sheet and stored as a Pandas DataFrame.
+          `refresh()` appends the responses that arrive later.
+        - revision (str): The sheet revision `df` was fetched at (see `_sheet_revision`), or the store's revision
+          of the local copy in offline mode. None for data that was assigned directly.
+
+        Derived results (averages, general averages, prioritization scores and violin plot data) are cached
+        per argument values, up to `RESULT_CACHE_SIZE` of them, until `df` is replaced.
         """
         self.survey_name = survey_name
-        self.client = self._get_gspread_client()
-        self.df = self._fetch_data_from_sheet()
+        self.store = store if store is not None else default_store(self.CACHE_DIR)
+        self.offline = offline
+        self._client = client
+        self.revision = None
+        # Last update time of the sheet when its data was last checked, to spot edits between refreshes
+        self._sheet_update = None
+        self._df = None
+        self._schema = None
+        self._appended = []
+        self._accumulator = None
+        self._results = OrderedDict()
 
-        
-    def _get_gspread_client(self):
+    @classmethod
+    def from_dataframe(cls, survey_name, df):
+        """
+        Creates a processor for survey data that is already in memory (e.g. synthetic or exported data).
+    
+        Parameters:
+        - survey_name (str): A name for the survey.
+        - df (DataFrame): The survey data, with the same header conventions as the Google Sheets.
+          It is typed as fetched sheets are (see `survey_storage.columnar_frame`).
+    
+        Returns:
+        - SurveyDataProcessor: An offline processor holding `df`.
+        """
+        processor = cls(survey_name, offline=True)
+        processor.df = columnar_frame(df)
+        return processor
+
+    @property
+    def client(self):
+        """Google Sheets API client, authorized on first access (None when offline)."""
+        if self._client is None and not self.offline:
+            with span('authorize'):
+                self._client = self._get_gspread_client()
+        return self._client
+
+    @property
+    def df(self):
+        """Survey data as a Pandas DataFrame, fetched on first access."""
+        self.load()
+        if self._appended:
+            # Merge the rows ingested by `refresh()` only when the full frame is needed
+            new_rows = self._appended[0]
+            for rows in self._appended[1:]:
+                new_rows = append_frame(new_rows, rows)
+            self._df = append_frame(self._df, new_rows)
+            self._appended = []
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        self._df = df
+        self.revision = None
+        self._appended = []
+        self._accumulator = None
+        self._results.clear()
+
+    def _last_ingested(self):
+        """Returns the number of ingested responses and the frame holding the last of them, without merging."""
+        self.load()
+        tail = self._appended[-1] if self._appended else self._df
+        return len(self._df) + sum(len(rows) for rows in self._appended), tail
+
+    def load(self):
+        """
+        Fetches the survey data now if it has not been loaded yet.
+    
+        Returns:
+        - SurveyDataProcessor: This processor, for chaining.
+        """
+        if self._df is None:
+            with span('fetch', survey=self.survey_name) as stage:
+                self._replace_data(*self._fetch_data_from_sheet())
+                stage.set(rows=len(self._df), columns=len(self._df.columns))
+        return self
+
+    def _replace_data(self, df, revision):
+        """Replaces `df` with freshly fetched data and records the revision it was fetched at."""
+        self.df = df
+        self.revision = self._sheet_update = revision
+
+    def clear_results(self):
+        """
+        Drops the cached derived results.
+
+        Replacing `df` (directly, by `refresh()` or on load) does this automatically; call it after modifying
+        `df` in place. The running task/dimension totals are rebuilt as well.
+        """
+        self._results.clear()
+        self._accumulator = None
+
+    @classmethod
+    def _get_gspread_client(cls):
         """
         Authorizes and returns a Google Sheets API client using service account credentials.
     
         Returns:
         - Client: Google Sheets API client.
         """
-        creds = ServiceAccountCredentials.from_json_keyfile_name(self.CREDS_PATH, self.SCOPE)
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        creds = ServiceAccountCredentials.from_json_keyfile_name(cls.CREDS_PATH, cls.SCOPE)
         return gspread.authorize(creds)
     
-    def _fetch_data_from_sheet(self):
+    def _fetch_data_from_sheet(self, use_cache=True):
         """
         Fetches the survey data from the Google Sheet specified by the survey_name attribute.
+
+        The sheet is only downloaded when the local store has no copy of its current revision.
+        In offline mode the most recent local copy is returned without contacting Google Sheets.
+    
+        Parameters:
+        - use_cache (bool, optional): If False, download the sheet even when the store has a copy of its revision.
     
         Returns:
-        - DataFrame: Pandas DataFrame containing the fetched survey data.
+        - tuple: (df, revision), the Pandas DataFrame containing the fetched survey data and its revision.
          """
+        if self.offline:
+            with span('fetch.store_load', store=type(self.store).__name__):
+                revision = self.store.revision(self.survey_name)
+                df = self.store.latest(self.survey_name)
+            if df is None:
+                raise FileNotFoundError(f"No local copy of '{self.survey_name}' is available in offline mode")
+            return df, revision
+
         # Find the workbook by name and open the first sheet
         sheet = self.client.open(self.survey_name)
         sheet_instance = sheet.get_worksheet(0)
 
-        # Get all records of the data and convert to DataFrame
-        records_data = sheet_instance.get_all_records()
-        return pd.DataFrame(records_data)
+        # Reuse the local copy if the sheet has not changed since it was stored
+        revision = self._sheet_revision(sheet, sheet_instance)
+        with span('fetch.store_load', store=type(self.store).__name__):
+            cached = self.store.load(self.survey_name, revision) if use_cache else None
+        if cached is not None:
+            return cached, revision
+
+        # Get the raw value grid of the sheet and parse it into typed columns
+        df = self._fetch_grid(sheet_instance)
+        with span('fetch.store_save', store=type(self.store).__name__):
+            self.store.save(self.survey_name, revision, df)
+        return df, revision
+
+    def _fetch_grid(self, sheet_instance):
+        """
+        Downloads the worksheet as raw 2-D value grids and parses them into a typed DataFrame.
+
+        With `COLUMN_BATCH` set, the columns are requested in blocks of that width (all in one batch request)
+        and parsed block by block; otherwise the whole grid is read at once.
+
+        Parameters:
+        - sheet_instance (Worksheet): The worksheet holding the responses, with the header in row 1.
+
+        Returns:
+        - DataFrame: The survey data, typed as by `survey_storage.columnar_frame`.
+        """
+        if not self.COLUMN_BATCH:
+            with span('fetch.download'):
+                values = sheet_instance.get_all_values()
+            _count_fetched(values)
+            with span('fetch.parse'):
+                return grid_frame(values[0] if values else [], values[1:])
+
+        # Checked as a whole, since each block only sees its own part of the header
+        header = unique_header(sheet_instance.row_values(1))
+        starts = range(0, len(header), self.COLUMN_BATCH)
+        ranges = [f'{column_letter(start + 1)}2:{column_letter(min(start + self.COLUMN_BATCH, len(header)))}'
+                  for start in starts]
+        with span('fetch.download', ranges=len(ranges)):
+            blocks = sheet_instance.batch_get(ranges)
+        for block in blocks:
+            _count_fetched(block)
+
+        with span('fetch.parse'):
+            frames = [grid_frame(header[start:start + self.COLUMN_BATCH], block) for start, block in zip(starts, blocks)]
+
+            # The API leaves out the empty rows at the end of each block, so align the blocks on the longest one
+            n_rows = max((len(frame) for frame in frames), default=0)
+            return pd.concat([frame.reindex(range(n_rows)) for frame in frames], axis=1)
+
+    @staticmethod
+    def _sheet_revision(sheet, sheet_instance, n_rows=None):
+        """
+        Identifies the current revision of a sheet without downloading its data.
+    
+        Parameters:
+        - sheet (Spreadsheet): The opened workbook.
+        - sheet_instance (Worksheet): The worksheet holding the responses.
+        - n_rows (int, optional): Number of filled rows, header included, when the caller already knows it.
+          Otherwise the first column is read to count them if the last update time is unavailable.
+    
+        Returns:
+        - str: The workbook's last update time, or the number of filled rows when that is unavailable.
+        """
+        last_update = SurveyDataProcessor._last_update(sheet)
+        if last_update:
+            return last_update
+        if n_rows is None:
+            n_rows = len(sheet_instance.col_values(1))
+        return f'rows-{n_rows}'
+
+    @staticmethod
+    def _last_update(sheet):
+        """Returns the workbook's last update time as a string, or None when it is unavailable."""
+        import gspread
+
+        try:
+            last_update = sheet.lastUpdateTime
+        except (AttributeError, gspread.exceptions.APIError):
+            last_update = None
+        return str(last_update) if last_update else None
+
+    @instrumented('refresh')
+    def refresh(self):
+        """
+        Ingests the responses appended to the Google Sheet since the data was last fetched.
+
+        Only the header, the last ingested row and the rows below it are downloaded. Their sums and counts are
+        added to the running task/dimension totals, and only the new rows are written to the local store; they
+        are merged into `df` when it is next accessed. The cost of a refresh therefore grows with the number
+        of new responses rather than the size of the survey.
+
+        The whole sheet is fetched again when the header changed, when the last ingested response no longer
+        matches (it was edited, or rows above it were removed), or when the sheet's last update time changed
+        without new responses (an earlier row was edited). Edits to earlier rows made together with new
+        responses are not detected here, since those rows are not downloaded again. The local copy with the
+        appended rows is therefore stored under a revision of its own rather than the sheet's update time,
+        so the next `load()` in a new session fetches the whole sheet instead of trusting it. Sheets without
+        an update time are identified by their row count only, as in `_sheet_revision`.
+    
+        Returns:
+        - int: The number of rows ingested.
+        """
+        if self.offline:
+            raise RuntimeError('Cannot refresh a survey in offline mode')
+
+        sheet = self.client.open(self.survey_name)
+        sheet_instance = sheet.get_worksheet(0)
+        last_update = self._last_update(sheet)
+
+        # Row 1 is the header, so the last ingested response sits in row n_ingested + 1
+        n_ingested, _ = self._last_ingested()
+        last_row = n_ingested + 1
+        last_column = column_letter(len(self._df.columns))
+        with span('fetch.download'):
+            header, rows = sheet_instance.batch_get(['1:1', f'A{last_row}:{last_column}'])
+        _count_fetched(rows)
+
+        if not self._matches_ingested(header[0] if header else [], rows[0] if rows else []):
+            self._replace_data(*self._fetch_data_from_sheet(use_cache=False))
+            return len(self._df)
+
+        new_rows = self._rows_to_frame(rows[1:])
+        if new_rows.empty:
+            # Without new responses, a new update time means that rows which were already ingested changed
+            if last_update is not None and last_update != self._sheet_update:
+                self._replace_data(*self._fetch_data_from_sheet(use_cache=False))
+                return len(self._df)
+            return 0
+
+        # Fold the new answers into the running totals before queueing them for `df`
+        accumulator = self._score_accumulator()
+        accumulator.update(score_matrix(new_rows, self.schema.score_columns))
+        self._appended.append(new_rows)
+        self._results.clear()
+
+        revision = self._sheet_revision(sheet, sheet_instance, n_rows=last_row + len(new_rows))
+        if last_update is not None:
+            # The earlier rows were not checked against this update time, so the copy must not claim it
+            revision = f'{revision}-appended'
+        self._sheet_update = last_update
+        with span('fetch.store_save', store=type(self.store).__name__):
+            # Stores without a copy to append to get the whole survey
+            if not self.store.append(self.survey_name, revision, new_rows):
+                self.store.save(self.survey_name, revision, self.df)
+        self.revision = revision
+        count('refresh.rows', len(new_rows))
+        return len(new_rows)
+
+    @instrumented('aggregate_in_pages')
+    def aggregate_in_pages(self, page_size=5000):
+        """
+        Aggregates the Google Sheet page by page without building `df`, for surveys too large to hold in memory.
+
+        Parameters:
+        - page_size (int, optional): Rows per request. Default is 5000.
+
+        Returns:
+        - StreamingAggregate: Averages, general averages, prioritization scores and violin plot data of the sheet.
+        """
+        from streaming import aggregate_chunks, iter_sheet_pages
+
+        if self.offline:
+            raise RuntimeError('Cannot read a survey page by page in offline mode')
+
+        sheet_instance = self.client.open(self.survey_name).get_worksheet(0)
+        return aggregate_chunks(iter_sheet_pages(sheet_instance, page_size), self.survey_name)
+
+    def _matches_ingested(self, header, last_row):
+        """
+        Checks that the sheet still lines up with the ingested data.
+    
+        Parameters:
+        - header (list): The current header row of the sheet.
+        - last_row (list): The current values of the last ingested row.
+    
+        Returns:
+        - bool: True if the header is unchanged and every answer of the last ingested response is the same.
+        """
+        n_ingested, tail = self._last_ingested()
+        if [str(value) for value in header] != [str(column) for column in tail.columns]:
+            return False
+        if n_ingested == 0:
+            return True
+        # Type the sheet's row as the ingested data, then compare numbers by value and everything else as text
+        current = self._rows_to_frame([last_row]).iloc[0]
+        return all(_same_answer(value, stored) for value, stored in zip(current, tail.iloc[-1]))
+
+    def _rows_to_frame(self, rows):
+        """
+        Converts raw sheet rows into a typed DataFrame with the columns of `df`.
+    
+        Parameters:
+        - rows (list): Rows of cell values; trailing empty cells may be missing.
+    
+        Returns:
+        - DataFrame: The rows, typed as by `columnar_frame`, with empty cells masked.
+        """
+        return grid_frame(self.load()._df.columns, rows)
+
+    # Define the tasks and dimensions for the survey analysis
+    # Tasks represent different sections or parts of the survey.
+    # Dimensions represent different metrics or categories within each task.
+    # Both are discovered from the question codes in the sheet header (e.g. "E1", "Si3").
+    @property
+    def TASKS(self):
+        return self.schema.tasks
+
+    @property
+    def DIMENSIONS(self):
+        return self.schema.dimensions
 
+    @property
+    def schema(self):
+        """
+        Returns the parsed column index of the survey header, parsing it again only when the columns change.
+    
+        Returns:
+        - ColumnSchema: Mapping of every score column to its task, dimension and question.
+        """
+        # Rows appended by `refresh()` have the same columns, so they need not be merged first
+        columns = self.load()._df.columns
+        if self._schema is None or self._schema.columns != list(columns):
+            self._schema = ColumnSchema(columns)
+        return self._schema
+
+    def _score_accumulator(self):
+        """
+        Returns the running sums and answer counts of the score columns, rebuilding them only when `df` was replaced.
+    
+        Returns:
+        - ScoreAccumulator: Sums and counts aligned with `schema.score_columns`.
+        """
+        if self._accumulator is None:
+            self._accumulator = ScoreAccumulator.from_scores(score_matrix(self.df, self.schema.score_columns))
+        return self._accumulator
+
+    @instrumented('compute.calculate_averages')
+    @_memoized
     def calculate_averages(self):
         """
         Calculates the average score for each combination of tasks and dimensions from the survey data.
@@ -67,21 +494,19 @@ class SurveyDataProcessor:
         - DataFrame: A Pandas DataFrame containing the average scores for each task and dimension combination.
                  The DataFrame has columns: 'Task', 'Dimension', and 'Average'.
         """
-        averages = pd.DataFrame(columns=['Task', 'Dimension', 'Average'])
-        
-        # Iterate over each task and dimension combination
-        for task in self.TASKS:
-            for dimension in self.DIMENSIONS:
-                # Filter the data for the current task and dimension
-                task_dimension_df = self.df.filter(regex=f'.*{dimension}{task}.*')
-                # Calculate the average score for the current task and dimension
-                average = task_dimension_df.mean().mean()
-                new_row = pd.DataFrame([{'Task': task, 'Dimension': dimension, 'Average': average}])
-                averages = pd.concat([averages, new_row], ignore_index=True)
+        schema = self.schema
 
+        # Average the column means of every task and dimension group in one grouped reduction
+        group_averages = schema.group_means(self._score_accumulator().means())
 
-        return averages
+        return pd.DataFrame({
+            'Task': [task for task, _ in schema.groups],
+            'Dimension': [dimension for _, dimension in schema.groups],
+            'Average': group_averages,
+        })
 
+    @instrumented('compute.calculate_general_averages')
+    @_memoized
     def calculate_general_averages(self):
         """
         Calculates the average scores for general survey questions (questions without specific task and dimension identifiers).
@@ -89,18 +514,16 @@ class SurveyDataProcessor:
         Returns:
         - Series: A Pandas Series containing average scores for the general survey questions.
         """
-        # Drop the 'Timestamp' column if it exists
-        df = self.df.drop(columns=['Timestamp'], errors='ignore')
+        # The schema lists the general question columns (without task and dimension identifiers),
+        # leaving out metadata such as the 'Timestamp' column
+        general_columns = self.schema.general_columns
 
-        # Identify the columns corresponding to general questions (without task and dimension identifiers)
-        general_columns = [col for col in df.columns if not any(f"{dim}{task}" in col for task in self.TASKS for dim in self.DIMENSIONS)]
-
-        # Filter the dataframe to include only general question columns
-        df_general = df[general_columns]
-
-        # Calculate and return the average scores for the general questions
-        return df_general.mean()
+        # Calculate and return the average scores for the general questions; free-text questions average to NaN
+        general = ScoreAccumulator.from_scores(score_matrix(self.df, general_columns))
+        return pd.Series(general.means(), index=general_columns)
     
+    @instrumented('compute.compute_prioritization_scores')
+    @_memoized
     def compute_prioritization_scores(self, averages, weights):
         """
         Computes the prioritization scores for each task based on given average scores and dimension weights.
@@ -113,28 +536,78 @@ class SurveyDataProcessor:
         - DataFrame: A Pandas DataFrame containing the prioritization scores for each task. 
                     The DataFrame has columns: 'Task' and 'Prioritization Score'.
         """
-        prioritization_scores = pd.DataFrame(columns=['Task', 'Prioritization Score'])
-        
-        for task in self.TASKS:
-            task_df = averages[averages['Task'] == task]
-            
-            # Compute the weighted score for each dimension of the task
-            score = sum(
-                task_df[task_df['Dimension'] == dimension]['Average'].values[0] * weights.get(dimension, 0)
-                for dimension in weights
-            )
-            
-            # For specific dimensions (E, Q, S), adjust the score by considering (1 - average)
-            for dimension in ['E', 'Q', 'S']:
-                if dimension in task_df['Dimension'].values:
-                    score -= 2 * task_df[task_df['Dimension'] == dimension]['Average'].values[0] * weights.get(dimension, 0)
-            
-            score = score / 5  # Adjust score by dividing by 5
-            new_row = pd.DataFrame({'Task': [task], 'Prioritization Score': [score]})
-            prioritization_scores = pd.concat([prioritization_scores, new_row], ignore_index=True)
-        
-        return prioritization_scores
+        dimensions = weighted_dimensions(weights, averages['Dimension'])
+        tasks = self.TASKS
+
+        # Score every task in one matrix product; E, Q and S enter with a negative sign (see `prioritization`)
+        coefficients = score_coefficients(averages_matrix(averages, tasks, dimensions), dimensions)
+        scores = score_batch(coefficients, weights_matrix([weights], dimensions))[0]
+
+        return pd.DataFrame({'Task': tasks, 'Prioritization Score': scores})
+    
+    @instrumented('compute.bootstrap_replicates')
+    def bootstrap_replicates(self, n_replicates=1000, seed=None, n_jobs=None):
+        """
+        Resamples the respondents with replacement and computes the task/dimension averages of every replicate.
+    
+        Parameters:
+        - n_replicates (int, optional): Number of bootstrap replicates. Default is 1000.
+        - seed (int, optional): Seed that makes the resampling reproducible.
+        - n_jobs (int, optional): Number of worker processes; by default everything runs in this process.
     
+        Returns:
+        - ndarray: A (replicates × groups) array of averages, with groups ordered as in `schema.groups`.
+        """
+        schema = self.schema
+        scores = score_matrix(self.df, schema.score_columns)
+        return bootstrap_group_means(scores, schema.group, schema.n_groups, n_replicates, seed=seed, n_jobs=n_jobs)
+
+    def bootstrap_averages(self, n_replicates=1000, confidence=0.95, seed=None, n_jobs=None):
+        """
+        Calculates the task/dimension averages with bootstrap confidence intervals.
+    
+        Parameters:
+        - n_replicates (int, optional): Number of bootstrap replicates. Default is 1000.
+        - confidence (float, optional): Coverage of the intervals. Default is 0.95.
+        - seed (int, optional): Seed that makes the resampling reproducible.
+        - n_jobs (int, optional): Number of worker processes; by default everything runs in this process.
+    
+        Returns:
+        - DataFrame: The output of `calculate_averages` with two extra columns, 'Lower' and 'Upper'.
+        """
+        replicates = self.bootstrap_replicates(n_replicates, seed=seed, n_jobs=n_jobs)
+        lower, upper = percentile_interval(replicates, confidence)
+        return self.calculate_averages().assign(Lower=lower, Upper=upper)
+
+    def bootstrap_prioritization_scores(self, weights, n_replicates=1000, confidence=0.95, seed=None, n_jobs=None):
+        """
+        Calculates the prioritization scores with bootstrap confidence intervals.
+    
+        Parameters:
+        - weights (dict): A dictionary with dimensions as keys and their respective weights as values.
+        - n_replicates (int, optional): Number of bootstrap replicates. Default is 1000.
+        - confidence (float, optional): Coverage of the intervals. Default is 0.95.
+        - seed (int, optional): Seed that makes the resampling reproducible.
+        - n_jobs (int, optional): Number of worker processes; by default everything runs in this process.
+    
+        Returns:
+        - DataFrame: The output of `compute_prioritization_scores` with two extra columns, 'Lower' and 'Upper'.
+        """
+        schema = self.schema
+        dimensions = weighted_dimensions(weights, schema.dimensions)
+        replicates = self.bootstrap_replicates(n_replicates, seed=seed, n_jobs=n_jobs)
+
+        # The groups form a task-major grid, so every replicate reshapes into a task × dimension matrix
+        grid = replicates.reshape(len(replicates), len(schema.tasks), len(schema.dimensions))
+        matrices = grid[:, :, [schema.dimensions.index(dim) for dim in dimensions]]
+        replicate_scores = score_coefficients(matrices, dimensions) @ weights_matrix([weights], dimensions)[0]
+
+        lower, upper = percentile_interval(replicate_scores, confidence)
+        averages = self.calculate_averages()
+        return self.compute_prioritization_scores(averages, weights).assign(Lower=lower, Upper=upper)
+
+    @instrumented('compute.prepare_data_for_violinplot')
+    @_memoized
     def prepare_data_for_violinplot(self):
         """
         Prepares and reshapes the survey data into a long form suitable for generating violin plots.
@@ -143,22 +616,77 @@ class SurveyDataProcessor:
         - DataFrame: A Pandas DataFrame containing the data in a long format for violin plots. 
                     The DataFrame has columns: 'Survey', 'Task-Dimension', and 'Score'.
         """
-        long_data = []
-
-        for task in self.TASKS:
-            for dimension in self.DIMENSIONS:
-                # Extract data relevant to the current task and dimension
-                task_dimension_df = self.df.filter(regex=f'.*{dimension}{task}.*')
-
-                # Convert wide data to long form
-                for _, row in task_dimension_df.iterrows():
-                    for col in task_dimension_df.columns:
-                        score = row[col]
-                        if pd.notna(score):  # Exclude missing values
-                            long_data.append({
-                                "Survey": self.survey_name,
-                                "Task-Dimension": f"{task}-{dimension}",
-                                "Score": score
-                            })
-
-        return pd.DataFrame(long_data)
\ No newline at end of file
+        schema = self.schema
+        scores = score_matrix(self.df, schema.score_columns)
+
+        # Flatten respondent by respondent, then stably regroup so the rows run task/dimension-major
+        # (group, respondent, question) as before, without building a Python object per score
+        flat_scores = scores.ravel()
+        flat_groups = np.tile(schema.group.astype(np.min_scalar_type(max(schema.n_groups - 1, 0))), len(scores))
+        answered = ~np.isnan(flat_scores)  # Exclude missing values
+        order = np.argsort(flat_groups[answered], kind='stable')
+
+        n_scores = len(order)
+        return pd.DataFrame({
+            "Survey": pd.Categorical.from_codes(np.zeros(n_scores, dtype=np.int8), [self.survey_name]),
+            "Task-Dimension": pd.Categorical.from_codes(flat_groups[answered][order], schema.group_labels),
+            "Score": compact_scores(flat_scores[answered][order]),
+        })
+
+    @instrumented('compute.prepare_violin_densities')
+    @_memoized
+    def prepare_violin_densities(self):
+        """
+        Summarizes the score distribution of every task and dimension for violin plots.
+
+        The scores are counted per distinct value in one pass over the score matrix, and the densities and
+        quartiles are computed from these counts (see `densities`), so no long-form frame with one row per
+        score is built.
+        
+        Returns:
+        - DataFrame: One row per task/dimension and evaluation point with columns 'Survey', 'Task-Dimension',
+                    'Score', 'Density', 'Count', 'Q1', 'Median' and 'Q3'.
+        """
+        schema = self.schema
+        values, counts = score_counts(score_matrix(self.df, schema.score_columns), schema.group, schema.n_groups)
+        return density_frame(values, counts, schema.group_labels, [self.survey_name] * schema.n_groups)
+
+    def segment_cube(self, by=(), time_window=None):
+        """
+        Builds the per-segment sums and counts for breakdowns by respondent attributes.
+
+        The responses are scanned once; averages, general averages and prioritization scores of any segment
+        or roll-up are then answered from the cube (see `segments.SegmentCube`).
+        
+        Parameters:
+        - by (list, optional): Columns whose values define the segments, e.g. ['Team', 'Role'].
+        - time_window (str, optional): Pandas period frequency (e.g. 'W' or 'M') for segmenting by 'Timestamp'.
+        
+        Returns:
+        - SegmentCube: The cube of this survey.
+        """
+        from segments import SegmentCube
+
+        with span('compute.segment_cube', by=list(by), time_window=time_window):
+            return SegmentCube(self.df, self.schema, by, time_window)
+
+
+def prepare_data_for_violinplots(processors):
+    """
+    Builds one long-form violin plot frame covering several surveys.
+
+    Parameters:
+    - processors (list): `SurveyDataProcessor` instances, one per survey.
+
+    Returns:
+    - DataFrame: The concatenated long-form data with categorical 'Survey' and 'Task-Dimension' columns
+                 and a compact numeric 'Score' column.
+    """
+    frames = [processor.prepare_data_for_violinplot() for processor in processors]
+
+    # Merge the categories of every survey so the result stays categorical instead of falling back to strings
+    return pd.DataFrame({
+        "Survey": union_categoricals([frame["Survey"] for frame in frames]),
+        "Task-Dimension": union_categoricals([frame["Task-Dimension"] for frame in frames]),
+        "Score": compact_scores(np.concatenate([frame["Score"].to_numpy(dtype=np.float64) for frame in frames])),
+    })
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+
+# Precomputed violin plot densities.
+#
+# Instead of handing every individual score to the plotting library, the scores of each survey and
+# task/dimension group are reduced to counts per distinct value. Likert answers take only a handful of
+# whole-number values, so these counts are exact; other scores are binned. Kernel density estimates and
+# quartiles are then computed from the counts for all groups at once, and the violins are drawn from this
+# summary, so drawing costs the same for ten or a million respondents.
+
+# Largest number of distinct whole-number values counted exactly; wider ranges are binned
+MAX_DISCRETE_VALUES = 64
+# Number of bins for scores that are not (few) whole numbers
+CONTINUOUS_BINS = 256
+# Number of points at which every density is evaluated
+GRIDSIZE = 100
+# How many bandwidths the densities extend past the lowest and highest score (as seaborn's `cut`)
+CUT = 2
+
+
+def score_counts(scores, group, n_groups):
+    """
+    Counts the scores of every group per distinct value.
+
+    Parameters:
+    - scores (ndarray): A (respondents × columns) score matrix with NaN for missing answers.
+    - group (ndarray): Group code of each column.
+    - n_groups (int): Number of groups.
+
+    Returns:
+    - tuple: (values, counts) with the distinct values (or bin centers) and a (groups × values) count matrix.
+    """
+    answered = ~np.isnan(scores)
+    flat_scores = scores[answered]
+    flat_groups = np.broadcast_to(group, scores.shape)[answered]
+    if flat_scores.size == 0:
+        return np.zeros(0), np.zeros((n_groups, 0), dtype=np.int64)
+
+    low, high = flat_scores.min(), flat_scores.max()
+    if np.all(np.mod(flat_scores, 1) == 0) and high - low < MAX_DISCRETE_VALUES:
+        # Whole numbers index their own slot, e.g. a 1..7 Likert scale gives seven values
+        values = np.arange(low, high + 1)
+        index = (flat_scores - low).astype(np.int64)
+    else:
+        edges = np.linspace(low, high, CONTINUOUS_BINS + 1)
+        values = (edges[:-1] + edges[1:]) / 2
+        index = np.clip(np.searchsorted(edges, flat_scores, side='right') - 1, 0, CONTINUOUS_BINS - 1)
+
+    counts = np.bincount(flat_groups * len(values) + index, minlength=n_groups * len(values))
+    return values, counts.reshape(n_groups, len(values))
+
+
+def weighted_quantiles(values, counts, quantiles=(0.25, 0.5, 0.75)):
+    """
+    Computes quantiles of every group from its value counts, as `np.percentile` would on the expanded scores.
+
+    Parameters:
+    - values (ndarray): The distinct values, in ascending order.
+    - counts (ndarray): A (groups × values) count matrix.
+    - quantiles (tuple, optional): Quantiles to compute. Default is the quartiles.
+
+    Returns:
+    - ndarray: A (groups × quantiles) matrix; NaN for groups without scores.
+    """
+    n = counts.sum(axis=1)
+    cumulative = np.cumsum(counts, axis=1)
+    result = np.full((len(counts), len(quantiles)), np.nan)
+    scored = n > 0
+    if not scored.any():
+        return result
+
+    def value_at(rank):
+        # The score at a 0-based rank is the first value whose cumulative count exceeds the rank
+        return values[np.argmax(cumulative[scored] > rank[:, np.newaxis], axis=1)]
+
+    for j, quantile in enumerate(quantiles):
+        position = quantile * (n[scored] - 1)
+        lower = np.floor(position)
+        below, above = value_at(lower), value_at(np.ceil(position))
+        result[scored, j] = below + (position - lower) * (above - below)
+    return result
+
+
+def kde_densities(values, counts, gridsize=GRIDSIZE, cut=CUT):
+    """
+    Evaluates a Gaussian kernel density estimate of every group from its value counts.
+
+    The bandwidth follows Scott's rule on the expanded scores (as `scipy.stats.gaussian_kde` and seaborn use),
+    so the result matches a KDE over the individual scores.
+
+    Parameters:
+    - values (ndarray): The distinct values (or bin centers).
+    - counts (ndarray): A (groups × values) count matrix.
+    - gridsize (int, optional): Number of evaluation points per group. Default is 100.
+    - cut (float, optional): Bandwidths the support extends past the extreme scores. Default is 2.
+
+    Returns:
+    - tuple: (support, density), two (groups × gridsize) matrices. Groups with fewer than two distinct
+             scores get a flat support at their score and a density of 1.
+    """
+    counts = counts.astype(np.float64)
+    n = counts.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = counts @ values / n
+        variance = (counts * (values - mean[:, np.newaxis]) ** 2).sum(axis=1) / (n - 1)
+        bandwidth = np.sqrt(variance) * n ** (-1 / 5)
+
+    present = counts > 0
+    low = np.where(present, values, np.inf).min(axis=1)
+    high = np.where(present, values, -np.inf).max(axis=1)
+    smooth = np.isfinite(bandwidth) & (bandwidth > 0)
+
+    steps = np.linspace(0, 1, gridsize)
+    start = np.where(smooth, low - cut * bandwidth, low)
+    stop = np.where(smooth, high + cut * bandwidth, high)
+    support = start[:, np.newaxis] + (stop - start)[:, np.newaxis] * steps
+
+    # Sum one Gaussian kernel per distinct value, weighted by its count, for all groups and points at once
+    safe_bandwidth = np.where(smooth, bandwidth, 1.0)[:, np.newaxis, np.newaxis]
+    offsets = (support[:, :, np.newaxis] - values) / safe_bandwidth
+    kernels = np.exp(-0.5 * offsets ** 2) / (np.sqrt(2 * np.pi) * safe_bandwidth)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        density = (kernels * counts[:, np.newaxis, :]).sum(axis=2) / n[:, np.newaxis]
+    density[~smooth] = 1.0
+    return support, density
+
+
+def density_frame(values, counts, labels, surveys, gridsize=GRIDSIZE, cut=CUT):
+    """
+    Builds the compact violin plot summary from value counts.
+
+    Parameters:
+    - values (ndarray): The distinct values (or bin centers).
+    - counts (ndarray): A (groups × values) count matrix.
+    - labels (list): 'Task-Dimension' label of each group.
+    - surveys (list): 'Survey' label of each group.
+    - gridsize (int, optional): Number of evaluation points per group. Default is 100.
+    - cut (float, optional): Bandwidths the support extends past the extreme scores. Default is 2.
+
+    Returns:
+    - DataFrame: One row per group and evaluation point with columns 'Survey', 'Task-Dimension', 'Score',
+                 'Density', 'Count', 'Q1', 'Median' and 'Q3'. Groups without scores are left out.
+    """
+    scored = counts.sum(axis=1) > 0
+    counts = counts[scored]
+    support, density = kde_densities(values, counts, gridsize, cut)
+    quartiles = weighted_quantiles(values, counts)
+    group_labels = pd.Categorical(np.asarray(labels, dtype=object)[scored], categories=list(dict.fromkeys(labels)))
+    group_surveys = pd.Categorical(np.asarray(surveys, dtype=object)[scored], categories=list(dict.fromkeys(surveys)))
+
+    def per_point(group_values):
+        return np.repeat(group_values, gridsize)
+
+    return pd.DataFrame({
+        'Survey': group_surveys.take(per_point(np.arange(len(counts)))),
+        'Task-Dimension': group_labels.take(per_point(np.arange(len(counts)))),
+        'Score': support.ravel(),
+        'Density': density.ravel(),
+        'Count': per_point(counts.sum(axis=1)),
+        'Q1': per_point(quartiles[:, 0]),
+        'Median': per_point(quartiles[:, 1]),
+        'Q3': per_point(quartiles[:, 2]),
+    })
+
+
+def violin_summary(data, gridsize=GRIDSIZE, cut=CUT):
+    """
+    Reduces long-form violin plot data to its compact summary.
+
+    Parameters:
+    - data (DataFrame): Long-form data with columns 'Survey', 'Task-Dimension' and 'Score', e.g. from
+      `SurveyDataProcessor.prepare_data_for_violinplot`.
+    - gridsize (int, optional): Number of evaluation points per group. Default is 100.
+    - cut (float, optional): Bandwidths the support extends past the extreme scores. Default is 2.
+
+    Returns:
+    - DataFrame: The summary described in `density_frame`, with groups in order of first appearance.
+    """
+    survey_codes, survey_names = pd.factorize(data['Survey'])
+    label_codes, label_names = pd.factorize(data['Task-Dimension'])
+    n_labels = len(label_names)
+    group = survey_codes * n_labels + label_codes
+
+    values, counts = score_counts(data['Score'].to_numpy(dtype=np.float64)[:, np.newaxis], group[:, np.newaxis],
+                                  len(survey_names) * n_labels)
+    labels = [str(label) for label in label_names] * len(survey_names)
+    surveys = [str(survey) for survey in survey_names for _ in range(n_labels)]
+    return density_frame(values, counts, labels, surveys, gridsize, cut)
@@ -0,0 +1,285 @@
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+
+# Stage-level instrumentation for fetching, computing and plotting.
+#
+# Code marks its stages with `span(...)` blocks or the `instrumented(...)` decorator and reports sizes with
+# `count(...)`. Nothing is recorded until `enable()` is called (or the SURVEY_TRACE environment variable is
+# set); while disabled, a span is one flag check and counters return straight away.
+#
+# Environment variables, read at import:
+# - SURVEY_TRACE: Enables instrumentation and writes the results to this path when the process exits.
+#   Paths ending in '.trace.json' get the Chrome trace format (chrome://tracing, Perfetto), others the JSON report.
+# - SURVEY_TRACE_PROFILE: If set to 1, profile every outermost span with cProfile.
+# - SURVEY_TRACE_MEMORY: If set to 1, trace memory allocations with tracemalloc.
+
+# Number of functions listed in the profile of a span
+PROFILE_LIMIT = 15
+
+
+class _Recorder:
+    """Shared state of the instrumentation; one instance per process."""
+
+    def __init__(self):
+        self.enabled = False
+        self.profile = False
+        self.memory = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter_ns()
+        self.spans = []
+        self.counters = {}
+
+
+_recorder = _Recorder()
+
+
+class _NoSpan:
+    """Span returned while instrumentation is disabled; entering and leaving it does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    """One timed stage; records itself when the block is left."""
+
+    def __init__(self, name, attributes, profile):
+        self.name = name
+        self.attributes = attributes
+        self.profile = profile
+        self._profiler = None
+
+    def set(self, **attributes):
+        """Adds attributes (e.g. sizes only known inside the block) to the recorded span."""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        local = _recorder.local
+        self.depth = getattr(local, 'depth', 0)
+        local.depth = self.depth + 1
+
+        # cProfile cannot nest, so only the outermost span of a thread is profiled
+        if (self.profile or _recorder.profile) and self.depth == 0:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if _recorder.memory and tracemalloc.is_tracing():
+            if self.depth == 0:
+                tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        end = time.perf_counter_ns()
+        _recorder.local.depth = self.depth
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(self._profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_LIMIT)
+            self.attributes['profile'] = output.getvalue()
+        if _recorder.memory and tracemalloc.is_tracing() and hasattr(self, '_memory_start'):
+            current, peak = tracemalloc.get_traced_memory()
+            self.attributes['memory_delta_bytes'] = current - self._memory_start
+            self.attributes['memory_peak_bytes'] = peak
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+
+        record = {
+            'name': self.name,
+            'start_us': (self.start - _recorder.origin) / 1000,
+            'duration_us': (end - self.start) / 1000,
+            'depth': self.depth,
+            'pid': os.getpid(),
+            'thread': threading.get_ident(),
+            'attributes': self.attributes,
+        }
+        with _recorder.lock:
+            _recorder.spans.append(record)
+        return False
+
+
+def enable(profile=False, memory=False):
+    """
+    Starts recording spans and counters.
+
+    Parameters:
+    - profile (bool, optional): If True, profile every outermost span with cProfile and attach the top functions.
+    - memory (bool, optional): If True, trace allocations with tracemalloc and attach the net and peak memory of every span.
+    """
+    _recorder.profile = profile
+    _recorder.memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _recorder.enabled = True
+
+
+def disable():
+    """Stops recording; the spans and counters recorded so far are kept until `reset()`."""
+    _recorder.enabled = False
+    if _recorder.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _recorder.memory = False
+    _recorder.profile = False
+
+
+def is_enabled():
+    """Returns True while spans and counters are being recorded."""
+    return _recorder.enabled
+
+
+def reset():
+    """Discards the recorded spans and counters."""
+    with _recorder.lock:
+        _recorder.spans = []
+        _recorder.counters = {}
+        _recorder.origin = time.perf_counter_ns()
+
+
+def span(name, profile=False, **attributes):
+    """
+    Times a block of code as one stage.
+
+    Example:
+        with span('fetch', survey=name) as stage:
+            ...
+            stage.set(rows=len(df))
+
+    Parameters:
+    - name (str): Name of the stage, e.g. 'fetch.download'.
+    - profile (bool, optional): If True, profile this span with cProfile even when profiling is not enabled globally.
+    - attributes: Values recorded with the span, e.g. the survey name.
+
+    Returns:
+    - A context manager; its `set(**attributes)` adds attributes inside the block.
+    """
+    if not _recorder.enabled:
+        return _NO_SPAN
+    return _Span(name, attributes, profile)
+
+
+def instrumented(name=None):
+    """
+    Decorator that records every call of a function as a span.
+
+    Parameters:
+    - name (str, optional): Name of the span. Defaults to the qualified name of the function.
+    """
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _recorder.enabled:
+                return function(*args, **kwargs)
+            with _Span(span_name, {}, False):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """
+    Adds to a counter, e.g. the number of rows or bytes fetched.
+
+    Parameters:
+    - name (str): Name of the counter.
+    - value (int or float, optional): Amount to add. Default is 1.
+    """
+    if not _recorder.enabled:
+        return
+    with _recorder.lock:
+        _recorder.counters[name] = _recorder.counters.get(name, 0) + value
+
+
+def report():
+    """
+    Returns everything recorded so far.
+
+    Returns:
+    - dict: 'spans' (every recorded span, in the order they ended), 'counters' and 'summary'
+            (count, total, mean and max duration in milliseconds per span name).
+    """
+    with _recorder.lock:
+        spans = list(_recorder.spans)
+        counters = dict(_recorder.counters)
+
+    summary = {}
+    for record in spans:
+        stats = summary.setdefault(record['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        duration = record['duration_us'] / 1000
+        stats['count'] += 1
+        stats['total_ms'] += duration
+        stats['max_ms'] = max(stats['max_ms'], duration)
+    for stats in summary.values():
+        stats['mean_ms'] = stats['total_ms'] / stats['count']
+    return {'spans': spans, 'counters': counters, 'summary': summary}
+
+
+def chrome_trace():
+    """
+    Returns the recorded spans and counters in the Chrome trace event format.
+
+    Returns:
+    - dict: A trace with one complete ('X') event per span and one counter ('C') event per counter.
+    """
+    recorded = report()
+    events = [{
+        'name': record['name'],
+        'cat': record['name'].split('.')[0],
+        'ph': 'X',
+        'ts': record['start_us'],
+        'dur': record['duration_us'],
+        'pid': record['pid'],
+        'tid': record['thread'],
+        'args': record['attributes'],
+    } for record in recorded['spans']]
+    end = max((event['ts'] + event['dur'] for event in events), default=0)
+    events += [{'name': name, 'ph': 'C', 'ts': end, 'pid': os.getpid(), 'args': {name: value}}
+               for name, value in recorded['counters'].items()]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def export(path):
+    """
+    Writes the recorded spans and counters to a file.
+
+    Parameters:
+    - path (str): Output path; paths ending in '.trace.json' get the Chrome trace format, others the `report()` JSON.
+    """
+    data = chrome_trace() if path.endswith('.trace.json') else report()
+    with open(path, 'w') as output:
+        json.dump(data, output, indent=2, default=str)
+
+
+def enable_from_environment():
+    """Enables instrumentation when SURVEY_TRACE is set and exports the results to that path at exit."""
+    path = os.environ.get('SURVEY_TRACE')
+    # Worker processes inherit the variable; only the process that enabled it writes the file
+    if not path or os.environ.get('SURVEY_TRACE_OWNER', str(os.getpid())) != str(os.getpid()):
+        return
+    os.environ['SURVEY_TRACE_OWNER'] = str(os.getpid())
+    enable(profile=os.environ.get('SURVEY_TRACE_PROFILE') == '1', memory=os.environ.get('SURVEY_TRACE_MEMORY') == '1')
+    atexit.register(export, path)
+
+
+enable_from_environment()
@@ -1,54 +1,89 @@
-from data_processing_API import SurveyDataProcessor
-import visualizations as viz
+from render import FigureJob, render_figures, show_figures
+from survey_loader import load_surveys
+from waves import SurveyWaves
 
 # Define the surveys you want to analyze
 SURVEY_NAMES = ['Thiago Bachelor Thesis v.2 (Responses)', 'Results Thiago Bachelor Thesis v.2 (Responses)']
 
-# Create `SurveyDataProcessor` instances for each survey. This class fetches data from the Google Sheet
-# and provides methods to compute averages and other metrics from the fetched data.
-processors = [SurveyDataProcessor(survey_name) for survey_name in SURVEY_NAMES]
+# Set to a folder to write all figures to files instead of opening a window for each one (e.g. on a headless server).
+# Figures are rendered in parallel and only redrawn when their data has changed.
+RENDER_DIR = None
+RENDER_FORMATS = ('png',)  # Any of 'png', 'svg' and 'pdf'
 
-# Calculate the average scores for each dimension and task for the surveys
-averages = [processor.calculate_averages() for processor in processors]
 
-# Define weights for each dimension. This can be adjusted based on the importance of each dimension.
-weights = {
-    "E": 0.1,
-    "Q": 0.2,
-    "S": 0.1,
-    "P": 0.3,
-    "Si": 0.3
-}
+def main():
+    # Create `SurveyDataProcessor` instances for each survey. This class fetches data from the Google Sheet
+    # and provides methods to compute averages and other metrics from the fetched data.
+    # The surveys are downloaded concurrently over one shared client, then put back in the order listed above.
+    loaded = dict(load_surveys(SURVEY_NAMES))
+    processors = [loaded[survey_name] for survey_name in SURVEY_NAMES]
 
-# Visualizations:
+    # Aggregate every survey (wave) once into a single wave × task × dimension structure.
+    # All comparisons across the waves below are derived from it instead of recomputing each pair of surveys.
+    waves = SurveyWaves(processors)
 
-# Plot grouped bar charts for each survey's average scores. 
-# This provides a side-by-side comparison for each dimension within the tasks.
-for avg in averages:
-    viz.create_grouped_bar_charts(avg, processors[0].DIMENSIONS, processors[0].TASKS)
+    # The average scores for each dimension and task for the surveys
+    averages = [waves.wave_averages(i) for i in range(len(processors))]
 
-# Plot a heatmap for the first survey's average scores. 
-# This provides a visual representation of how scores are distributed across tasks and dimensions.
-viz.create_heatmap(averages[0])
+    # Define weights for each dimension. This can be adjusted based on the importance of each dimension.
+    weights = {
+        "E": 0.1,
+        "Q": 0.2,
+        "S": 0.1,
+        "P": 0.3,
+        "Si": 0.3
+    }
 
-# Plot line graphs to visualize the trend of scores across dimensions for each task in the first survey.
-viz.create_line_graphs(averages[0], processors[0].TASKS)
+    # Visualizations:
+    # Each figure is described as a job (plotting function in `visualizations` and its arguments),
+    # then all jobs are either displayed or rendered to files at the end.
+    figures = []
 
-# Calculate and visualize the prioritization scores for the first survey.
-# This score is based on the average scores and predefined weights for each dimension.
-prioritization_scores = processors[0].compute_prioritization_scores(averages[0], weights)
-viz.plot_prioritization_scores(prioritization_scores)
+    # Plot grouped bar charts for each survey's average scores. 
+    # This provides a side-by-side comparison for each dimension within the tasks.
+    for i, avg in enumerate(averages):
+        figures.append(FigureJob(f'grouped_bar_charts_{i + 1}', 'create_grouped_bar_charts', avg, processors[0].DIMENSIONS, processors[0].TASKS))
 
-# Plot a comparison of average scores between the initial and later survey for each task and dimension.
-viz.plot_task_specific_scores(averages[0], averages[1], processors[0].TASKS, processors[0].DIMENSIONS)
+    # Plot a heatmap for the first survey's average scores. 
+    # This provides a visual representation of how scores are distributed across tasks and dimensions.
+    figures.append(FigureJob('heatmap', 'create_heatmap', averages[0]))
 
-# Plot a comparison of average scores for general questions between the initial and later survey.
-viz.plot_general_comparison(processors[0], processors[1])
+    # Plot line graphs to visualize the trend of scores across dimensions for each task in the first survey.
+    figures.append(FigureJob('line_graphs', 'create_line_graphs', averages[0], processors[0].TASKS))
 
-# Prepare the data in a format suitable for violin plots. This will allow us to visualize the distribution of scores.
-data_violins = [processor.prepare_data_for_violinplot() for processor in processors]
+    # Calculate and visualize the prioritization scores for the first survey.
+    # This score is based on the average scores and predefined weights for each dimension.
+    prioritization_scores = processors[0].compute_prioritization_scores(averages[0], weights)
+    figures.append(FigureJob('prioritization_scores', 'plot_prioritization_scores', prioritization_scores))
 
-# Plot violin graphs to visualize the distribution of scores for each dimension and task.
-# The graphs are created in pairs, comparing the distributions between the initial and later surveys.
-for i in range(0, len(data_violins), 2):  # Assuming you always have even number of surveys
-    viz.plot_violin_graph(data_violins[i], data_violins[i+1])
+    # Plot a comparison of average scores between the initial and later survey for each task and dimension.
+    figures.append(FigureJob('task_specific_scores', 'plot_task_specific_scores', averages[0], averages[1], processors[0].TASKS, processors[0].DIMENSIONS))
+
+    # Plot a comparison of average scores for general questions between the initial and later survey.
+    figures.append(FigureJob('general_comparison', 'plot_general_averages_comparison',
+                             processors[0].calculate_general_averages(), processors[1].calculate_general_averages()))
+
+    # Plot the averages of every task across all survey waves, one small chart per task,
+    # and the change of every average relative to the first wave.
+    figures.append(FigureJob('wave_small_multiples', 'plot_wave_small_multiples', waves.averages, waves.labels, waves.tasks, waves.dimensions))
+    figures.append(FigureJob('wave_deltas', 'plot_wave_deltas', waves.deltas(), waves.labels, waves.tasks, waves.dimensions))
+
+    # Summarize the score distribution of every wave, task and dimension for the violin plots. The densities are
+    # computed from the counts of each Likert value, so the figures stay small however many responses there are.
+    data_violins = waves.violin_densities()
+
+    # Plot violin graphs to visualize the distribution of scores for each dimension and task.
+    # Each wave is compared with the next one, so any number of surveys can be analyzed.
+    for i in range(len(waves.labels) - 1):
+        data_initial = data_violins[data_violins['Survey'] == waves.labels[i]]
+        data_later = data_violins[data_violins['Survey'] == waves.labels[i + 1]]
+        figures.append(FigureJob(f'violin_graph_{i + 1}', 'plot_violin_densities', data_initial, data_later))
+
+    if RENDER_DIR is None:
+        show_figures(figures)
+    else:
+        render_figures(figures, RENDER_DIR, formats=RENDER_FORMATS)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+# Prioritization scores weight the average of every dimension of a task. For the dimensions listed in
+# ADJUSTED_DIMENSIONS the weighted average is subtracted twice, so they enter the score with a negative
+# sign; the sum is then divided by SCORE_DIVISOR.
+ADJUSTED_DIMENSIONS = ['E', 'Q', 'S']
+SCORE_DIVISOR = 5
+
+
+def averages_matrix(averages, tasks=None, dimensions=None):
+    """
+    Turns the long-form averages into a task × dimension matrix.
+
+    Parameters:
+    - averages (DataFrame): The average scores, with columns 'Task', 'Dimension' and 'Average'.
+    - tasks (list, optional): Row order of the matrix. Defaults to the tasks in `averages`.
+    - dimensions (list, optional): Column order of the matrix. Defaults to the dimensions in `averages`.
+
+    Returns:
+    - ndarray: A (tasks × dimensions) float matrix; NaN where a combination is missing.
+    """
+    tasks = list(dict.fromkeys(averages['Task'])) if tasks is None else list(tasks)
+    dimensions = list(dict.fromkeys(averages['Dimension'])) if dimensions is None else list(dimensions)
+
+    # Scatter the averages into the matrix by position instead of pivoting
+    rows = pd.Index(tasks).get_indexer(averages['Task'])
+    columns = pd.Index(dimensions).get_indexer(averages['Dimension'])
+    known = (rows >= 0) & (columns >= 0)
+    matrix = np.full((len(tasks), len(dimensions)), np.nan)
+    matrix[rows[known], columns[known]] = averages['Average'].to_numpy(dtype=np.float64)[known]
+    return matrix
+
+
+def weighted_dimensions(weights, known):
+    """
+    Selects the dimensions a weight dictionary actually uses.
+
+    Dimensions with weight 0 are left out, so a missing average cannot turn a score into NaN (NaN × 0 is NaN).
+    Every other dimension must have averages.
+
+    Parameters:
+    - weights (dict): A dictionary with dimensions as keys and their respective weights as values.
+    - known (iterable): The dimensions that have averages.
+
+    Returns:
+    - list: The dimensions with a nonzero weight, in the order of `weights`.
+    """
+    known = set(known)
+    dimensions = [dimension for dimension, weight in weights.items() if weight != 0]
+    unknown = [dimension for dimension in dimensions if dimension not in known]
+    if unknown:
+        raise ValueError(f"No averages for the weighted dimension(s) {', '.join(map(str, unknown))}; "
+                         f"known dimensions are {', '.join(map(str, sorted(known)))}")
+    return dimensions
+
+
+def score_coefficients(matrix, dimensions):
+    """
+    Folds the E/Q/S adjustment and the final division into the averages matrix.
+
+    A task's prioritization score is then the plain dot product of its row with the weight vector.
+
+    Parameters:
+    - matrix (ndarray): The (tasks × dimensions) averages matrix.
+    - dimensions (list): The dimension of each matrix column.
+
+    Returns:
+    - ndarray: A (tasks × dimensions) coefficient matrix.
+    """
+    signs = np.array([-1.0 if dimension in ADJUSTED_DIMENSIONS else 1.0 for dimension in dimensions])
+    return matrix * signs / SCORE_DIVISOR
+
+
+def weights_matrix(weights, dimensions):
+    """
+    Stacks weight dictionaries into a (weight vectors × dimensions) matrix.
+
+    Parameters:
+    - weights (list): Dictionaries with dimensions as keys and weights as values.
+    - dimensions (list): The dimension of each matrix column; missing dimensions get weight 0.
+
+    Returns:
+    - ndarray: The weight matrix.
+    """
+    return np.array([[w.get(dimension, 0) for dimension in dimensions] for w in weights], dtype=np.float64)
+
+
+def score_batch(coefficients, weights):
+    """
+    Scores every task for a whole batch of weight vectors with one matrix product.
+
+    Parameters:
+    - coefficients (ndarray): The (tasks × dimensions) matrix from `score_coefficients`.
+    - weights (ndarray): A (weight vectors × dimensions) matrix.
+
+    Returns:
+    - ndarray: A (weight vectors × tasks) matrix of prioritization scores.
+    """
+    return weights @ coefficients.T
+
+
+def dirichlet_weights(n_samples, n_dimensions, alpha=1.0, seed=None, chunk_size=100_000):
+    """
+    Draws random weight vectors from a Dirichlet distribution, chunk by chunk.
+
+    Parameters:
+    - n_samples (int): Total number of weight vectors.
+    - n_dimensions (int): Number of dimensions per vector.
+    - alpha (float or list, optional): Concentration parameter(s). Default is 1.0 (uniform over the simplex).
+    - seed (int, optional): Seed for reproducible draws.
+    - chunk_size (int, optional): Number of vectors per chunk. Default is 100 000.
+
+    Yields:
+    - ndarray: A (chunk × dimensions) weight matrix whose rows sum to 1.
+    """
+    rng = np.random.default_rng(seed)
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), (n_dimensions,))
+    for start in range(0, n_samples, chunk_size):
+        yield rng.dirichlet(alpha, size=min(chunk_size, n_samples - start))
+
+
+def simplex_grid_weights(n_dimensions, steps, chunk_size=100_000):
+    """
+    Enumerates every weight vector on a regular grid over the simplex, chunk by chunk.
+
+    Each weight is a multiple of 1/steps and the weights of a vector sum to 1.
+
+    Parameters:
+    - n_dimensions (int): Number of dimensions per vector.
+    - steps (int): Grid resolution, e.g. 10 for weights in steps of 0.1.
+    - chunk_size (int, optional): Number of vectors per chunk. Default is 100 000.
+
+    Yields:
+    - ndarray: A (chunk × dimensions) weight matrix.
+    """
+    # Stars and bars: every choice of n_dimensions - 1 bar positions among steps + n_dimensions - 1 slots
+    # gives one composition of `steps` into n_dimensions non-negative parts
+    bars = itertools.combinations(range(steps + n_dimensions - 1), n_dimensions - 1)
+    while True:
+        chunk = np.array(list(itertools.islice(bars, chunk_size)), dtype=np.int64).reshape(-1, n_dimensions - 1)
+        if len(chunk) == 0:
+            return
+        edges = np.hstack([np.full((len(chunk), 1), -1), chunk, np.full((len(chunk), 1), steps + n_dimensions - 1)])
+        yield (np.diff(edges, axis=1) - 1) / steps
+
+
+class PrioritizationSensitivity:
+    """
+    Streaming summary of prioritization scores over many candidate weight vectors.
+
+    Batches of weight vectors are scored and folded into fixed-size accumulators, so memory does not grow
+    with the number of vectors.
+
+    Attributes:
+    - tasks (list): Task identifiers, in the row order of the averages matrix.
+    - dimensions (list): Dimension of each weight vector component.
+    - n_samples (int): Number of weight vectors scored so far.
+    - bin_edges (ndarray): Edges of the score histograms.
+    - histograms (ndarray): (tasks × bins) counts of scores; scores outside the edges go to the outer bins.
+    - rank_counts (ndarray): (tasks × ranks) counts of how often each task reached each rank (rank 1 = highest score).
+    """
+
+    def __init__(self, averages, dimensions, bins=50, score_range=None):
+        """
+        Parameters:
+        - averages (DataFrame): The average scores for each task and dimension.
+        - dimensions (list): Dimension of each weight vector component.
+        - bins (int, optional): Number of histogram bins. Default is 50.
+        - score_range (tuple, optional): (low, high) histogram range. Defaults to the range reachable with
+          non-negative weights that sum to 1.
+        """
+        self.tasks = list(dict.fromkeys(averages['Task']))
+        self.dimensions = list(dimensions)
+        # A random weight vector may weight any of the dimensions, so all of them need averages
+        weighted_dimensions(dict.fromkeys(self.dimensions, 1), averages['Dimension'])
+        self.coefficients = score_coefficients(averages_matrix(averages, self.tasks, self.dimensions), self.dimensions)
+
+        if score_range is None:
+            score_range = (np.nanmin(self.coefficients), np.nanmax(self.coefficients))
+        self.bin_edges = np.linspace(score_range[0], score_range[1], bins + 1)
+
+        n_tasks = len(self.tasks)
+        self.n_samples = 0
+        self._sum = np.zeros(n_tasks)
+        self._sum_squares = np.zeros(n_tasks)
+        self._min = np.full(n_tasks, np.inf)
+        self._max = np.full(n_tasks, -np.inf)
+        self.histograms = np.zeros((n_tasks, bins), dtype=np.int64)
+        self.rank_counts = np.zeros((n_tasks, n_tasks), dtype=np.int64)
+
+    def update(self, weights):
+        """
+        Scores a batch of weight vectors and adds the results to the summary.
+
+        Parameters:
+        - weights (ndarray): A (weight vectors × dimensions) matrix.
+        """
+        scores = score_batch(self.coefficients, np.asarray(weights, dtype=np.float64))
+        n_batch, n_tasks = scores.shape
+        task_index = np.arange(n_tasks)
+
+        self.n_samples += n_batch
+        self._sum += scores.sum(axis=0)
+        self._sum_squares += (scores ** 2).sum(axis=0)
+        self._min = np.minimum(self._min, scores.min(axis=0))
+        self._max = np.maximum(self._max, scores.max(axis=0))
+
+        # Histogram every task's scores at once by offsetting each task's bins into one flat bincount
+        n_bins = len(self.bin_edges) - 1
+        bin_index = np.clip(np.searchsorted(self.bin_edges, scores, side='right') - 1, 0, n_bins - 1)
+        self.histograms += np.bincount((bin_index + task_index * n_bins).ravel(),
+                                       minlength=n_tasks * n_bins).reshape(n_tasks, n_bins)
+
+        # Rank 1 goes to the highest score of each weight vector
+        ranks = np.empty_like(scores, dtype=np.int64)
+        np.put_along_axis(ranks, np.argsort(-scores, axis=1), task_index[np.newaxis, :], axis=1)
+        self.rank_counts += np.bincount((task_index * n_tasks + ranks).ravel(),
+                                        minlength=n_tasks * n_tasks).reshape(n_tasks, n_tasks)
+
+    def summary(self):
+        """
+        Returns the distribution of each task's prioritization score over all scored weight vectors.
+
+        Returns:
+        - DataFrame: One row per task with columns 'Task', 'Mean', 'Std', 'Min', 'Max' and 'Median'
+                     (the median is read from the histogram).
+        """
+        mean = self._sum / self.n_samples
+        std = np.sqrt(np.maximum(self._sum_squares / self.n_samples - mean ** 2, 0))
+        cumulative = np.cumsum(self.histograms, axis=1)
+        median_bins = np.argmax(cumulative >= self.n_samples / 2, axis=1)
+        centers = (self.bin_edges[:-1] + self.bin_edges[1:]) / 2
+        return pd.DataFrame({
+            'Task': self.tasks,
+            'Mean': mean,
+            'Std': std,
+            'Min': self._min,
+            'Max': self._max,
+            'Median': centers[median_bins],
+        })
+
+    def rank_frequencies(self):
+        """
+        Returns how often each task reached each rank.
+
+        Returns:
+        - DataFrame: Tasks as rows and ranks 1..n as columns; values are fractions of the scored weight vectors.
+        """
+        return pd.DataFrame(self.rank_counts / self.n_samples, index=pd.Index(self.tasks, name='Task'),
+                            columns=pd.RangeIndex(1, len(self.tasks) + 1, name='Rank'))
+
+
+def prioritization_sensitivity(averages, weight_batches, dimensions, chunk_size=100_000, **options):
+    """
+    Scores many candidate weight vectors and summarizes how stable the task ranking is.
+
+    Parameters:
+    - averages (DataFrame): The average scores for each task and dimension.
+    - weight_batches (ndarray or iterable): A (weight vectors × dimensions) matrix, or an iterable of such
+      matrices such as `dirichlet_weights(...)` or `simplex_grid_weights(...)`.
+    - dimensions (list): Dimension of each weight vector component.
+    - chunk_size (int, optional): Largest number of vectors scored at once. Default is 100 000.
+    - options: Further keyword arguments for `PrioritizationSensitivity` (`bins`, `score_range`).
+
+    Returns:
+    - PrioritizationSensitivity: The accumulated score distributions and rank frequencies.
+    """
+    sensitivity = PrioritizationSensitivity(averages, dimensions, **options)
+    if isinstance(weight_batches, np.ndarray):
+        weight_batches = [weight_batches]
+    for batch in weight_batches:
+        for start in range(0, len(batch), chunk_size):
+            sensitivity.update(batch[start:start + chunk_size])
+    return sensitivity
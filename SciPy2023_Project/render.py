@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, span
+
+
+# Headless rendering of the figures in `visualizations`.
+#
+# Figures are described as jobs (a plotting function and its arguments), rendered with the
+# non-interactive Agg backend, written to files and closed straight away. Jobs run in parallel on a
+# process pool, and a job is skipped when its inputs hash to the same value as in the previous run and
+# its files still exist.
+
+# Name of the file, inside the output folder, that records the content hash of every rendered job
+MANIFEST_NAME = '.render_manifest.json'
+
+
+class FigureJob:
+    """
+    One figure to render.
+
+    Attributes:
+    - name (str): File name of the figure, without extension.
+    - function (str): Name of the plotting function in `visualizations`.
+    - args (tuple): Positional arguments for the function.
+    - kwargs (dict): Keyword arguments for the function.
+    """
+
+    def __init__(self, name, function, *args, **kwargs):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+
+def _hash_value(digest, value):
+    """Feeds a plotting argument into a hash, using the contents (not the identity) of frames and arrays."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _hash_value(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f'dict{len(value)}'.encode())
+        for key in sorted(value, key=repr):
+            _hash_value(digest, key)
+            _hash_value(digest, value[key])
+    else:
+        digest.update(repr(value).encode())
+
+
+def content_hash(job, formats, dpi):
+    """
+    Returns a hash of everything that determines the files of a job.
+
+    Parameters:
+    - job (FigureJob): The job.
+    - formats (tuple): File formats to write.
+    - dpi (int): Resolution of raster formats.
+
+    Returns:
+    - str: Hex digest of the job's function, arguments and output settings.
+    """
+    digest = hashlib.sha256()
+    _hash_value(digest, (job.function, job.args, job.kwargs, tuple(formats), dpi))
+    return digest.hexdigest()
+
+
+def _use_headless_backend():
+    """Switches matplotlib to the non-interactive Agg backend."""
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+
+def _render_job(function, args, kwargs, paths, dpi):
+    """Draws one figure, saves it in every requested format and releases it; runs in a worker process."""
+    import matplotlib.pyplot as plt
+    import visualizations
+
+    fig = getattr(visualizations, function)(*args, show=False, **kwargs)
+    try:
+        for path in paths:
+            with span('render.save', path=path):
+                fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return paths
+
+
+def render_figures(jobs, output_dir, formats=('png',), max_workers=None, dpi=100, force=False):
+    """
+    Renders figures to files without opening any window.
+
+    Parameters:
+    - jobs (list): The `FigureJob`s to render; their names must be unique.
+    - output_dir (str): Folder for the figure files.
+    - formats (tuple, optional): File formats to write, e.g. ('png', 'svg', 'pdf'). Default is ('png',).
+    - max_workers (int, optional): Number of worker processes. Default uses one per CPU; 1 renders in this process.
+    - dpi (int, optional): Resolution of raster formats. Default is 100.
+    - force (bool, optional): If True, render every job even when its inputs are unchanged.
+
+    Returns:
+    - dict: The written (or up-to-date) file paths of every job, keyed by job name.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+
+    outputs = {}
+    pending = []
+    for job in jobs:
+        paths = [os.path.join(output_dir, f'{job.name}.{extension}') for extension in formats]
+        outputs[job.name] = paths
+        digest = content_hash(job, formats, dpi)
+        if not force and manifest.get(job.name) == digest and all(os.path.exists(path) for path in paths):
+            continue
+        manifest[job.name] = digest
+        pending.append((job.function, job.args, job.kwargs, paths, dpi))
+
+    count('render.skipped', len(jobs) - len(pending))
+    count('render.rendered', len(pending))
+
+    # Spans recorded inside worker processes are not collected; use max_workers=1 to trace every figure
+    with span('render', jobs=len(pending), workers=max_workers):
+        if max_workers == 1:
+            _use_headless_backend()
+            for arguments in pending:
+                _render_job(*arguments)
+        elif pending:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_use_headless_backend) as executor:
+                list(executor.map(_render_job, *zip(*pending)))
+
+    with open(manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return outputs
+
+
+def show_figures(jobs):
+    """
+    Displays the figures of the given jobs interactively, one window after the other.
+
+    Parameters:
+    - jobs (list): The `FigureJob`s to display.
+    """
+    import visualizations
+
+    for job in jobs:
+        getattr(visualizations, job.function)(*job.args, **job.kwargs)
@@ -0,0 +1,453 @@
+"""
+Local HTTP service that serves survey results and rendered charts to dashboards and other consumers.
+
+The surveys are fetched once at start-up. Every response (JSON results and chart images alike) is cached in
+memory, keyed by the revision of the survey data and the request parameters, so repeated views cost a
+dictionary lookup. A background thread polls the surveys for new responses; when the data changes, the
+results that were requested before are recomputed for the new revision in the background.
+
+Example:
+    python report_service.py "Thiago Bachelor Thesis v.2 (Responses)" "Results Thiago Bachelor Thesis v.2 (Responses)"
+
+Endpoints (survey names URL-encoded):
+    GET /surveys                                          Surveys with their revision and number of responses
+    GET /surveys/<name>/averages                          Task/dimension averages
+    GET /surveys/<name>/general-averages                  General question averages
+    GET /surveys/<name>/prioritization-scores?weights=E=0.1,Q=0.2,S=0.1,P=0.3,Si=0.3
+    GET /surveys/<name>/charts/<chart>.<png|svg>          grouped-bar-charts, heatmap, line-graphs,
+                                                          prioritization-scores (accepts weights)
+    GET /compare/<chart>.<png|svg>?before=<name>&after=<name>
+                                                          task-specific-scores, general-comparison, violin
+"""
+import argparse
+import io
+import json
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from cli import DEFAULT_WEIGHTS, parse_weights
+from data_processing_API import SurveyDataProcessor
+from instrumentation import count, span
+from survey_loader import call_with_retries, load_surveys
+from survey_storage import CSVExportStore, default_store
+
+
+# Content types of the chart formats
+CHART_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# Resolution of PNG charts
+CHART_DPI = 100
+# Charts of one survey and of a pair of surveys, by URL name, with the plotting function in `visualizations`
+SURVEY_CHARTS = {
+    'grouped-bar-charts': 'create_grouped_bar_charts',
+    'heatmap': 'create_heatmap',
+    'line-graphs': 'create_line_graphs',
+    'prioritization-scores': 'plot_prioritization_scores',
+}
+COMPARISON_CHARTS = {
+    'task-specific-scores': 'plot_task_specific_scores',
+    'general-comparison': 'plot_general_averages_comparison',
+    'violin': 'plot_violin_densities',
+}
+# Resources whose result depends on the dimension weights
+WEIGHTED = {'prioritization-scores', 'chart:prioritization-scores'}
+
+
+def data_revision(processor):
+    """
+    Identifies the data of a survey without reading it.
+
+    This is the revision the processor fetched or refreshed its data at (see `SurveyDataProcessor.revision`),
+    so polling does not touch the responses themselves. Data that was assigned directly has no revision and
+    is identified by its number of rows instead, as sheets without an update time are.
+
+    Parameters:
+    - processor (SurveyDataProcessor): The processor of the survey.
+
+    Returns:
+    - str: The revision of the survey's data.
+    """
+    processor.load()
+    if processor.revision is not None:
+        return processor.revision
+    return f'rows-{len(processor.df)}'
+
+
+def _json_body(frame):
+    """Serializes a DataFrame (as records) or Series (as a mapping) to JSON bytes, with NaN as null."""
+    return frame.to_json(orient='records' if frame.ndim == 2 else 'index').encode()
+
+
+class ReportService:
+    """
+    Cached results and charts of a set of surveys.
+
+    A request is described by a spec: a tuple (resource, survey names, weights, chart format) with None for
+    the parts a resource does not use. Results are cached per spec and revision of the surveys involved.
+
+    Attributes:
+    - processors (dict): The `SurveyDataProcessor` of every survey, by survey name.
+    - revisions (dict): The current `data_revision` of every survey, by survey name.
+    """
+
+    # Number of responses kept in the cache
+    CACHE_SIZE = 256
+    # Number of distinct requests recomputed in the background when a survey changes
+    WARM_SIZE = 64
+
+    def __init__(self, processors, max_workers=2):
+        """
+        Parameters:
+        - processors (list): Loaded `SurveyDataProcessor`s of the surveys to serve.
+        - max_workers (int, optional): Number of threads computing results. Default is 2.
+        """
+        self.processors = {p.survey_name: p for p in processors}
+        self.revisions = {name: data_revision(p) for name, p in self.processors.items()}
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._requested = OrderedDict()
+        # Guards the cache; `_data_lock` serializes access to the processors and `_render_lock` to pyplot
+        self._lock = threading.Lock()
+        self._data_lock = threading.RLock()
+        self._render_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._stop = threading.Event()
+        self._poller = None
+
+    def _key(self, spec):
+        return spec, tuple(self.revisions[name] for name in spec[1])
+
+    def get(self, spec):
+        """
+        Returns the response of a request from the cache, computing it first if needed.
+
+        Parameters:
+        - spec (tuple): The request; see the class description.
+
+        Returns:
+        - tuple: (revision, content type, body) with the revisions of the surveys joined into one string.
+        """
+        for name in spec[1]:
+            if name not in self.processors:
+                raise KeyError(f"Unknown survey '{name}'")
+
+        with self._lock:
+            self._requested[spec] = None
+            self._requested.move_to_end(spec)
+            while len(self._requested) > self.WARM_SIZE:
+                self._requested.popitem(last=False)
+
+            key = self._key(spec)
+            if key in self._cache:
+                count('service.cache.hits')
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            count('service.cache.misses')
+            future = self._submit(spec)
+        return future.result()
+
+    def _submit(self, spec):
+        """Schedules the computation of a request unless it is already running; call with `_lock` held."""
+        future = self._pending.get(spec)
+        if future is None:
+            future = self._executor.submit(self._compute, spec)
+            self._pending[spec] = future
+        return future
+
+    def _compute(self, spec):
+        """Computes a request for the current revision of its surveys and caches the response."""
+        try:
+            with span('service.compute', resource=spec[0], surveys=list(spec[1])):
+                with self._data_lock:
+                    key = self._key(spec)
+                    content_type, build = self._prepare(spec)
+                body = build()
+            response = ('-'.join(key[1]), content_type, body)
+            with self._lock:
+                self._cache[key] = response
+                while len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            return response
+        finally:
+            with self._lock:
+                self._pending.pop(spec, None)
+
+    def _prepare(self, spec):
+        """
+        Gathers the data of a request from the processors.
+
+        Returns the content type and a function that produces the body, so that charts are drawn after the
+        processors are released.
+        """
+        resource, names, weights, chart_format = spec
+        processors = [self.processors[name] for name in names]
+        weights = dict(weights) if weights is not None else None
+
+        if resource == 'averages':
+            body = _json_body(processors[0].calculate_averages())
+            return 'application/json', lambda: body
+        if resource == 'general-averages':
+            body = _json_body(processors[0].calculate_general_averages())
+            return 'application/json', lambda: body
+        if resource == 'prioritization-scores':
+            p = processors[0]
+            body = _json_body(p.compute_prioritization_scores(p.calculate_averages(), weights))
+            return 'application/json', lambda: body
+
+        chart = resource.split(':', 1)[1]
+        if chart in SURVEY_CHARTS:
+            p = processors[0]
+            averages = p.calculate_averages()
+            args = {
+                'grouped-bar-charts': lambda: (averages, p.DIMENSIONS, p.TASKS),
+                'heatmap': lambda: (averages,),
+                'line-graphs': lambda: (averages, p.TASKS),
+                'prioritization-scores': lambda: (p.compute_prioritization_scores(averages, weights),),
+            }[chart]()
+            function = SURVEY_CHARTS[chart]
+        else:
+            before, after = processors
+            args = {
+                'task-specific-scores': lambda: (before.calculate_averages(), after.calculate_averages(),
+                                                 before.TASKS, before.DIMENSIONS),
+                'general-comparison': lambda: (before.calculate_general_averages(), after.calculate_general_averages()),
+                'violin': lambda: (before.prepare_violin_densities(), after.prepare_violin_densities()),
+            }[chart]()
+            function = COMPARISON_CHARTS[chart]
+        return CHART_FORMATS[chart_format], lambda: self._render(function, args, chart_format)
+
+    def _render(self, function, args, chart_format):
+        """Draws a chart with the headless Agg backend and returns the image bytes."""
+        import matplotlib
+        matplotlib.use('Agg', force=True)
+        import matplotlib.pyplot as plt
+        import visualizations
+
+        # pyplot keeps global state, so charts are drawn one at a time
+        with self._render_lock:
+            fig = getattr(visualizations, function)(*args, show=False)
+            try:
+                output = io.BytesIO()
+                fig.savefig(output, format=chart_format, dpi=CHART_DPI, bbox_inches='tight')
+            finally:
+                plt.close(fig)
+        return output.getvalue()
+
+    def refresh(self):
+        """
+        Checks every survey for new or changed responses and recomputes the recent requests of changed surveys.
+
+        Online surveys ingest their new rows (see `SurveyDataProcessor.refresh`); offline surveys are read
+        again from their local store.
+
+        Returns:
+        - list: Names of the surveys whose data changed.
+        """
+        changed = []
+        for name, processor in list(self.processors.items()):
+            with span('service.refresh', survey=name), self._data_lock:
+                if processor.offline:
+                    # Only read the local copy again when its revision changed; surveys created from in-memory
+                    # data have no copy to read
+                    revision = processor.store.revision(name)
+                    if revision is None or revision == self.revisions[name]:
+                        continue
+                    processor = SurveyDataProcessor(name, store=processor.store, offline=True)
+                    processor.df = processor.store.latest(name)
+                    processor.revision = revision
+                else:
+                    call_with_retries(processor.refresh)
+                    revision = data_revision(processor)
+                    if revision == self.revisions[name]:
+                        continue
+                self.processors[name] = processor
+                self.revisions[name] = revision
+            changed.append(name)
+
+        if changed:
+            with self._lock:
+                # Drop the responses of the old revisions and recompute the recent requests in the background
+                for key in [key for key in self._cache if key != self._key(key[0])]:
+                    del self._cache[key]
+                for spec in self._requested:
+                    if any(name in changed for name in spec[1]):
+                        self._submit(spec)
+        return changed
+
+    def start_polling(self, interval=60):
+        """
+        Starts a background thread that calls `refresh()` every `interval` seconds.
+
+        Parameters:
+        - interval (float, optional): Seconds between checks. Default is 60.
+        """
+        def poll():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as error:
+                    # Keep serving the last good data; the next poll tries again
+                    print(f'Refreshing the surveys failed: {error!r}', file=sys.stderr)
+
+        self._stop.clear()
+        self._poller = threading.Thread(target=poll, name='survey-refresh', daemon=True)
+        self._poller.start()
+
+    def close(self):
+        """Stops polling and the computation threads."""
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+        self._executor.shutdown(wait=True)
+
+    def index(self):
+        """
+        Lists the served surveys.
+
+        Returns:
+        - list: One dict per survey with its 'name', 'revision' and number of 'responses'.
+        """
+        with self._data_lock:
+            return [{'name': name, 'revision': self.revisions[name], 'responses': len(p.df)}
+                    for name, p in self.processors.items()]
+
+
+def parse_request(path):
+    """
+    Translates a request path into a request spec for `ReportService.get`.
+
+    Parameters:
+    - path (str): The path and query string of the request.
+
+    Returns:
+    - tuple: The request spec; None for the survey index.
+    """
+    url = urlsplit(path)
+    parts = [unquote(part) for part in url.path.split('/') if part]
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    weights = parse_weights(query['weights']) if 'weights' in query else DEFAULT_WEIGHTS
+
+    if parts in ([], ['surveys']):
+        return None
+    if len(parts) == 3 and parts[0] == 'surveys' and parts[2] in ('averages', 'general-averages', 'prioritization-scores'):
+        resource, names = parts[2], (parts[1],)
+        chart_format = None
+    elif len(parts) == 4 and parts[0] == 'surveys' and parts[2] == 'charts':
+        chart, _, chart_format = parts[3].rpartition('.')
+        if chart not in SURVEY_CHARTS:
+            raise KeyError(f"Unknown chart '{chart}'")
+        resource, names = f'chart:{chart}', (parts[1],)
+    elif len(parts) == 2 and parts[0] == 'compare':
+        chart, _, chart_format = parts[1].rpartition('.')
+        if chart not in COMPARISON_CHARTS:
+            raise KeyError(f"Unknown chart '{chart}'")
+        if 'before' not in query or 'after' not in query:
+            raise ValueError("Comparison charts need the 'before' and 'after' surveys")
+        resource, names = f'chart:{chart}', (query['before'], query['after'])
+    else:
+        raise KeyError(f"Unknown resource '{url.path}'")
+
+    if chart_format is not None and chart_format not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format '{chart_format}'; use one of {', '.join(CHART_FORMATS)}")
+    return resource, names, tuple(weights.items()) if resource in WEIGHTED else None, chart_format
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    """Answers GET requests from the `ReportService` of its server."""
+
+    server_version = 'SurveyReport/1.0'
+
+    def do_GET(self):
+        service = self.server.service
+        try:
+            spec = parse_request(self.path)
+            if spec is None:
+                self._send(200, 'application/json', json.dumps(service.index()).encode())
+                return
+            revision, content_type, body = service.get(spec)
+        except KeyError as error:
+            self._send(404, 'application/json', json.dumps({'error': error.args[0]}).encode())
+            return
+        except ValueError as error:
+            self._send(400, 'application/json', json.dumps({'error': str(error)}).encode())
+            return
+        except Exception as error:
+            self._send(500, 'application/json', json.dumps({'error': repr(error)}).encode())
+            return
+
+        # Dashboards that already hold this revision get an empty answer
+        etag = f'"{revision}"'
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, content_type, b'', etag)
+        else:
+            self._send(200, content_type, body, etag)
+
+    def _send(self, status, content_type, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(service, host='127.0.0.1', port=8050):
+    """
+    Creates the HTTP server of a report service; call `serve_forever()` on it to start answering requests.
+
+    Parameters:
+    - service (ReportService): The service to expose.
+    - host (str, optional): Address to listen on. Default is 127.0.0.1 (this machine only).
+    - port (int, optional): Port to listen on; 0 picks a free one. Default is 8050.
+
+    Returns:
+    - ThreadingHTTPServer: The server, with the service as its `service` attribute.
+    """
+    server = ThreadingHTTPServer((host, port), ReportHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve survey results and charts over HTTP.')
+    parser.add_argument('surveys', nargs='+', help='Names of the Google Sheets to serve')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: this machine only)')
+    parser.add_argument('--port', type=int, default=8050, help='Port to listen on')
+    parser.add_argument('--offline', action='store_true', help='Use local copies only, never contact Google Sheets')
+    parser.add_argument('--csv-dir', help='Folder of CSV exports to read in offline mode')
+    parser.add_argument('--cache-dir', help='Folder for the local copies of fetched sheets')
+    parser.add_argument('--workers', type=int, default=4, help='Number of surveys fetched concurrently')
+    parser.add_argument('--refresh-interval', type=float, default=60,
+                        help='Seconds between checks for new responses; 0 disables them')
+    args = parser.parse_args(argv)
+
+    options = {'offline': args.offline or args.csv_dir is not None}
+    if args.csv_dir is not None:
+        options['store'] = CSVExportStore(args.csv_dir)
+    elif args.cache_dir is not None:
+        options['store'] = default_store(args.cache_dir)
+
+    loaded = dict(load_surveys(args.surveys, max_workers=args.workers, **options))
+    service = ReportService([loaded[survey_name] for survey_name in args.surveys])
+    if args.refresh_interval > 0:
+        service.start_polling(args.refresh_interval)
+
+    server = serve(service, args.host, args.port)
+    print(f'Serving {len(args.surveys)} surveys on http://{args.host}:{server.server_port}/surveys', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+
+from prioritization import score_coefficients, weighted_dimensions, weights_matrix
+from survey_schema import score_matrix
+
+
+# Label of respondents who left a segment attribute empty
+MISSING_LABEL = '(missing)'
+
+
+def _attribute_codes(values):
+    """Factorizes one segment attribute into integer codes and labels, with empty cells as their own label."""
+    codes, levels = pd.factorize(values, sort=True)
+    labels = [str(level) for level in levels]
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes)
+        labels.append(MISSING_LABEL)
+    return codes, labels
+
+
+def _numeric_columns(df, columns, values):
+    """Keeps the columns whose filled-in cells include numbers, dropping free-text columns such as 'Team'."""
+    filled = (df[columns].notna() & (df[columns].astype(str) != '')).to_numpy()
+    numeric = ~np.isnan(values)
+    keep = numeric.any(axis=0) | ~filled.any(axis=0)
+    return [column for column, numeric_column in zip(columns, keep) if numeric_column], values[:, keep]
+
+
+def _segment_sums(values, segment, n_segments):
+    """Sums the answers and counts the answered cells of every column per segment with one sorted reduction."""
+    answered = ~np.isnan(values)
+    if n_segments == 0:
+        return np.zeros((0, values.shape[1])), np.zeros((0, values.shape[1]), dtype=np.int64)
+    order = np.argsort(segment, kind='stable')
+    starts = np.searchsorted(segment[order], np.arange(n_segments))
+    totals = np.add.reduceat(np.where(answered, values, 0.0)[order], starts, axis=0)
+    counts = np.add.reduceat(answered[order].astype(np.int64), starts, axis=0)
+    return totals, counts
+
+
+class SegmentCube:
+    """
+    Per-segment answer sums and counts of a survey, for breakdowns by respondent attributes.
+
+    Respondents are split into segments by the combination of their values in the chosen attribute columns
+    (e.g. team or role) and, optionally, the time window of their 'Timestamp'. The responses are scanned once;
+    averages, general averages and prioritization scores of any slice or roll-up are then computed from the
+    sums and counts of the selected segments.
+
+    Attributes:
+    - schema (ColumnSchema): Parsed header of the survey.
+    - attributes (list): Names of the segment attributes; the time window attribute is called 'Period'.
+    - levels (dict): Labels of every attribute, in code order.
+    - codes (dict): Code of each segment in every attribute.
+    - respondents (ndarray): Number of respondents in each segment.
+    - score_total, score_count (ndarray): (segments × score columns) sums and answer counts.
+    - general_columns (list): The numeric general question columns; free-text columns are left out.
+    - general_total, general_count (ndarray): (segments × general question columns) sums and answer counts.
+    """
+
+    def __init__(self, df, schema, by=(), time_window=None):
+        """
+        Scans the responses once and accumulates the sums and counts of every segment.
+
+        Parameters:
+        - df (DataFrame): The survey data.
+        - schema (ColumnSchema): Parsed header of `df`.
+        - by (list, optional): Columns whose values define the segments, e.g. ['Team', 'Role'].
+        - time_window (str, optional): Pandas period frequency (e.g. 'W', 'M' or 'Q') for segmenting by the
+          time window of the 'Timestamp' column.
+        """
+        self.schema = schema
+        self.attributes = list(by)
+        columns = [df[column] for column in by]
+        if time_window is not None:
+            timestamps = pd.to_datetime(df['Timestamp'], errors='coerce')
+            columns.append(timestamps.dt.to_period(time_window).astype(str).where(timestamps.notna()))
+            self.attributes.append('Period')
+
+        # Combine the attribute codes into one code per respondent, then keep only the combinations that occur
+        combined = np.zeros(len(df), dtype=np.int64)
+        levels = []
+        for values in columns:
+            codes, labels = _attribute_codes(values)
+            combined = combined * len(labels) + codes
+            levels.append(labels)
+        combinations, segment = np.unique(combined, return_inverse=True)
+        segment = segment.ravel()
+        n_segments = len(combinations)
+
+        self.levels = dict(zip(self.attributes, levels))
+        self.codes = {}
+        remainder = combinations
+        for attribute, labels in reversed(list(zip(self.attributes, levels))):
+            remainder, self.codes[attribute] = np.divmod(remainder, len(labels))
+
+        self.respondents = np.bincount(segment, minlength=n_segments)
+        self.score_total, self.score_count = _segment_sums(
+            score_matrix(df, schema.score_columns), segment, n_segments)
+        self.general_columns, general = _numeric_columns(
+            df, schema.general_columns, score_matrix(df, schema.general_columns))
+        self.general_total, self.general_count = _segment_sums(general, segment, n_segments)
+
+    @property
+    def segments(self):
+        """
+        Returns the segments with their attribute labels and respondent counts.
+
+        Returns:
+        - DataFrame: One row per segment, with one column per attribute and 'Respondents'.
+        """
+        table = {attribute: pd.Categorical.from_codes(self.codes[attribute], self.levels[attribute])
+                 for attribute in self.attributes}
+        table['Respondents'] = self.respondents
+        return pd.DataFrame(table)
+
+    def select(self, **filters):
+        """
+        Selects the segments whose attributes match the filters.
+
+        Parameters:
+        - filters: Attribute names with one label or a list of labels each, e.g. Team='Sales' or
+          Period=['2023-01', '2023-02']. Attributes that are not given are rolled up.
+
+        Returns:
+        - ndarray: Boolean mask over the segments.
+        """
+        mask = np.ones(len(self.respondents), dtype=bool)
+        for attribute, wanted in filters.items():
+            if attribute not in self.levels:
+                raise KeyError(f"'{attribute}' is not a segment attribute of this cube")
+            wanted = [wanted] if isinstance(wanted, str) or not np.iterable(wanted) else wanted
+            positions = {label: code for code, label in enumerate(self.levels[attribute])}
+            wanted_codes = [positions[str(label)] for label in wanted if str(label) in positions]
+            mask &= np.isin(self.codes[attribute], wanted_codes)
+        return mask
+
+    def _rolled_up(self, by, filters):
+        """Sums the selected segments into one row per combination of the `by` attributes."""
+        mask = self.select(**filters)
+        if by:
+            keys = np.zeros(len(self.respondents), dtype=np.int64)
+            for attribute in by:
+                keys = keys * len(self.levels[attribute]) + self.codes[attribute]
+            combinations, rows = np.unique(keys[mask], return_inverse=True)
+        else:
+            combinations, rows = np.zeros(1, dtype=np.int64), np.zeros(mask.sum(), dtype=np.int64)
+        rows = rows.ravel()
+
+        def rollup(values):
+            out = np.zeros((len(combinations),) + values.shape[1:], dtype=values.dtype)
+            np.add.at(out, rows, values[mask])
+            return out
+
+        labels = {}
+        remainder = combinations
+        for attribute in reversed(list(by)):
+            remainder, code = np.divmod(remainder, len(self.levels[attribute]))
+            labels[attribute] = pd.Categorical.from_codes(code, self.levels[attribute])
+        totals = {
+            'respondents': rollup(self.respondents),
+            'score': (rollup(self.score_total), rollup(self.score_count)),
+            'general': (rollup(self.general_total), rollup(self.general_count)),
+        }
+        return {attribute: labels[attribute] for attribute in by}, totals
+
+    @staticmethod
+    def _means(total, count):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 0, total / count, np.nan)
+
+    def group_averages(self, **filters):
+        """
+        Returns the task/dimension averages of the selected segments as a bare array (the fastest roll-up).
+
+        Parameters:
+        - filters: See `select`.
+
+        Returns:
+        - ndarray: Average of every group in `schema.groups`.
+        """
+        mask = self.select(**filters)
+        return self.schema.group_means(self._means(self.score_total[mask].sum(axis=0),
+                                                   self.score_count[mask].sum(axis=0)))
+
+    def averages(self, by=(), **filters):
+        """
+        Calculates the task/dimension averages of the selected segments, optionally per attribute value.
+
+        Parameters:
+        - by (list, optional): Attributes to break the averages down by. Default rolls everything up.
+        - filters: See `select`.
+
+        Returns:
+        - DataFrame: The columns of `SurveyDataProcessor.calculate_averages`, preceded by the `by` attributes
+                     and followed by 'Respondents'.
+        """
+        labels, totals = self._rolled_up(list(by), filters)
+        group_averages = self.schema.group_means(self._means(*totals['score']))
+        n_rows, n_groups = group_averages.shape
+        frame = {attribute: np.repeat(values, n_groups) for attribute, values in labels.items()}
+        frame.update({
+            'Task': np.tile([task for task, _ in self.schema.groups], n_rows),
+            'Dimension': np.tile([dimension for _, dimension in self.schema.groups], n_rows),
+            'Average': group_averages.ravel(),
+            'Respondents': np.repeat(totals['respondents'], n_groups),
+        })
+        return pd.DataFrame(frame)
+
+    def general_averages(self, by=(), **filters):
+        """
+        Calculates the general question averages of the selected segments, optionally per attribute value.
+
+        Parameters:
+        - by (list, optional): Attributes to break the averages down by. Default rolls everything up.
+        - filters: See `select`.
+
+        Returns:
+        - Series or DataFrame: Averages indexed by question; with `by`, one row per attribute combination.
+        """
+        labels, totals = self._rolled_up(list(by), filters)
+        means = self._means(*totals['general'])
+        if not by:
+            return pd.Series(means[0], index=self.general_columns)
+        index = pd.MultiIndex.from_arrays(list(labels.values()), names=list(labels))
+        return pd.DataFrame(means, index=index, columns=self.general_columns)
+
+    def prioritization_scores(self, weights, by=(), **filters):
+        """
+        Computes the prioritization score of every task for the selected segments, optionally per attribute value.
+
+        Parameters:
+        - weights (dict): A dictionary with dimensions as keys and their respective weights as values.
+        - by (list, optional): Attributes to break the scores down by. Default rolls everything up.
+        - filters: See `select`.
+
+        Returns:
+        - DataFrame: Columns 'Task' and 'Prioritization Score', preceded by the `by` attributes.
+        """
+        labels, totals = self._rolled_up(list(by), filters)
+        group_averages = self.schema.group_means(self._means(*totals['score']))
+        tasks, schema_dimensions = self.schema.tasks, self.schema.dimensions
+        dimensions = weighted_dimensions(weights, schema_dimensions)
+
+        # The groups form a task-major grid, so every row reshapes into a task × dimension matrix
+        grid = group_averages.reshape(len(group_averages), len(tasks), len(schema_dimensions))
+        matrices = grid[:, :, [schema_dimensions.index(dim) for dim in dimensions]]
+        scores = score_coefficients(matrices, dimensions) @ weights_matrix([weights], dimensions)[0]
+
+        frame = {attribute: np.repeat(values, len(tasks)) for attribute, values in labels.items()}
+        frame['Task'] = np.tile(tasks, len(scores))
+        frame['Prioritization Score'] = scores.ravel()
+        return pd.DataFrame(frame)
+
+    def compare(self, other, by=(), **filters):
+        """
+        Compares the task/dimension averages of two cubes (e.g. two survey waves) per segment.
+
+        Parameters:
+        - other (SegmentCube): The cube of the later wave, built with the same attributes.
+        - by (list, optional): Attributes to break the comparison down by. Default rolls everything up.
+        - filters: See `select`; applied to both cubes.
+
+        Returns:
+        - DataFrame: The `by` attributes, 'Task', 'Dimension', 'Average' (this cube), 'Other' (the other cube)
+                     and 'Delta' (Other - Average), for the segments present in both cubes.
+        """
+        keys = list(by) + ['Task', 'Dimension']
+        mine = self.averages(by, **filters).drop(columns='Respondents')
+        theirs = other.averages(by, **filters).drop(columns='Respondents').rename(columns={'Average': 'Other'})
+        for attribute in by:
+            mine[attribute] = mine[attribute].astype(str)
+            theirs[attribute] = theirs[attribute].astype(str)
+        merged = mine.merge(theirs, on=keys, how='inner')
+        return merged.assign(Delta=merged['Other'] - merged['Average'])
+
@@ -0,0 +1,230 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.special import erfc
+
+
+# Significance tests between survey waves.
+#
+# Both tests run on a (respondents × columns) score matrix per wave, for all questions at once. A permutation
+# relabels which respondents belong to which wave; the column sums and answer counts of a whole chunk of
+# relabelings are matrix products of their 0/1 wave memberships with the score matrix, as in `bootstrap`.
+# The Mann-Whitney test ranks every column in one sort and uses the normal approximation, so no test loops
+# over the questions in Python.
+
+
+def _group_means(sums, counts, indicator):
+    """Averages the column means (sums / counts) within every group, ignoring columns without answers."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        column_means = sums / counts
+        valid = ~np.isnan(column_means)
+        return (np.where(valid, column_means, 0.0) @ indicator) / (valid @ indicator)
+
+
+def membership_differences(scores, indicator, membership):
+    """
+    Computes the difference in group averages between the two waves of many wave assignments at once.
+
+    As in `calculate_averages`, a group's average is the mean of its column means.
+
+    Parameters:
+    - scores (ndarray): The pooled (respondents × columns) score matrix of both waves with NaN for missing answers.
+    - indicator (ndarray): The (columns × groups) 0/1 matrix mapping every column to its group.
+    - membership (ndarray): A (assignments × respondents) 0/1 array; 1 puts a respondent in the later wave.
+
+    Returns:
+    - ndarray: An (assignments × groups) array of later minus earlier averages.
+    """
+    answered = ~np.isnan(scores)
+    values = np.where(answered, scores, 0.0)
+    answered = answered.astype(np.float64)
+
+    later_sums = membership @ values
+    later_counts = membership @ answered
+    earlier_sums = values.sum(axis=0) - later_sums
+    earlier_counts = answered.sum(axis=0) - later_counts
+    return _group_means(later_sums, later_counts, indicator) - _group_means(earlier_sums, earlier_counts, indicator)
+
+
+def _permutation_chunk(scores, indicator, n_later, observed, n_permutations, seed):
+    """Draws one chunk of wave assignments and counts how often they differ at least as much as observed."""
+    rng = np.random.default_rng(seed)
+    n_respondents = len(scores)
+
+    # Every row puts a random subset of n_later respondents in the later wave
+    later = np.argpartition(rng.random((n_permutations, n_respondents)), n_later - 1, axis=1)[:, :n_later]
+    membership = np.zeros((n_permutations, n_respondents))
+    np.put_along_axis(membership, later, 1.0, axis=1)
+
+    differences = membership_differences(scores, indicator, membership)
+    # A small tolerance keeps permutations that only differ from the observation by rounding as extreme
+    with np.errstate(invalid='ignore'):
+        extreme = np.abs(differences) >= np.abs(observed) * (1 - 1e-12)
+    return extreme.sum(axis=0)
+
+
+def permutation_test(earlier, later, indicator, n_permutations=10_000, seed=None, n_jobs=None, chunk_size=250):
+    """
+    Runs a two-sided permutation test on the difference in group averages between two waves.
+
+    The permutations are split into chunks, each with its own seed derived from `seed`, so the result is the
+    same whether the chunks run serially or on a process pool.
+
+    Parameters:
+    - earlier (ndarray): The (respondents × columns) score matrix of the earlier wave.
+    - later (ndarray): The score matrix of the later wave, with the same columns.
+    - indicator (ndarray): The (columns × groups) 0/1 matrix mapping every column to its group.
+    - n_permutations (int, optional): Number of permutations. Default is 10 000.
+    - seed (int, optional): Seed that makes the permutations reproducible.
+    - n_jobs (int, optional): Number of worker processes. Default (None or 1) runs in this process.
+    - chunk_size (int, optional): Permutations per chunk. Default is 250.
+
+    Returns:
+    - tuple: (differences, p_values), two arrays with one value per group; NaN where a wave has no answers.
+    """
+    scores = np.vstack([earlier, later])
+    n_later = len(later)
+    membership = np.zeros((1, len(scores)))
+    membership[0, len(earlier):] = 1.0
+    observed = membership_differences(scores, indicator, membership)[0]
+    if len(earlier) == 0 or n_later == 0:
+        return observed, np.full(len(observed), np.nan)
+
+    sizes = [min(chunk_size, n_permutations - start) for start in range(0, n_permutations, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [(scores, indicator, n_later, observed, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if n_jobs is None or n_jobs == 1:
+        counts = [_permutation_chunk(*args) for args in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            counts = list(executor.map(_permutation_chunk, *zip(*arguments)))
+
+    # The observed assignment counts as one of the permutations, so p is never 0
+    extreme = np.sum(counts, axis=0) if counts else np.zeros(len(observed))
+    p_values = (extreme + 1) / (n_permutations + 1)
+    return observed, np.where(np.isnan(observed), np.nan, p_values)
+
+
+def average_ranks(values):
+    """
+    Ranks every column of a matrix, giving tied values the average of their ranks.
+
+    Parameters:
+    - values (ndarray): A (rows × columns) matrix with NaN for missing values.
+
+    Returns:
+    - tuple: (ranks, ties), the 1-based ranks within each column (NaN where missing) and the tie term
+             sum(t³ - t) over the groups of t tied values of every column.
+    """
+    n_rows = len(values)
+    # Sort every column (missing values last) and find the first and last position of each run of equal values
+    order = np.argsort(values, axis=0, kind='stable')
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    missing = np.isnan(sorted_values)
+    changes = sorted_values[1:] != sorted_values[:-1]
+    run_starts = np.vstack([np.ones((1, values.shape[1]), dtype=bool), changes])
+    run_ends = np.vstack([changes, np.ones((1, values.shape[1]), dtype=bool)])
+
+    position = np.arange(n_rows)[:, np.newaxis]
+    first = np.maximum.accumulate(np.where(run_starts, position, 0), axis=0)
+    last = np.minimum.accumulate(np.where(run_ends, position, n_rows - 1)[::-1], axis=0)[::-1]
+
+    sorted_ranks = np.where(missing, np.nan, (first + last) / 2 + 1)
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=0)
+    run_sizes = (last - first + 1).astype(np.float64)
+    ties = np.where(run_starts & ~missing, run_sizes ** 3 - run_sizes, 0.0).sum(axis=0)
+    return ranks, ties
+
+
+def _normal_sf(z):
+    """Upper tail probability of the standard normal distribution."""
+    return 0.5 * erfc(np.asarray(z, dtype=np.float64) / np.sqrt(2))
+
+
+def mann_whitney(earlier, later):
+    """
+    Runs a two-sided Mann-Whitney U test on every column of two samples.
+
+    Uses the normal approximation with tie and continuity correction (as `scipy.stats.mannwhitneyu` with
+    method='asymptotic'); missing values are left out column by column.
+
+    Parameters:
+    - earlier (ndarray): A (respondents × columns) matrix of the earlier wave with NaN for missing values.
+    - later (ndarray): The matrix of the later wave, with the same columns.
+
+    Returns:
+    - tuple: (u, p_values, effect_sizes) with one value per column: the U statistic of the later wave, the
+             p-value and the rank-biserial correlation (positive when the later wave scores higher).
+             NaN where a wave has no values.
+    """
+    ranks, ties = average_ranks(np.vstack([earlier, later]))
+    n_earlier = (~np.isnan(earlier)).sum(axis=0).astype(np.float64)
+    n_later = (~np.isnan(later)).sum(axis=0).astype(np.float64)
+    n = n_earlier + n_later
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        u = np.nansum(ranks[len(earlier):], axis=0) - n_later * (n_later + 1) / 2
+        mean = n_earlier * n_later / 2
+        deviation = np.sqrt(n_earlier * n_later / 12 * ((n + 1) - ties / (n * (n - 1))))
+        z = (np.abs(u - mean) - 0.5) / deviation
+        p_values = np.clip(2 * _normal_sf(z), 0, 1)
+        effect_sizes = 2 * u / (n_earlier * n_later) - 1
+
+    empty = (n_earlier == 0) | (n_later == 0)
+    u[empty] = p_values[empty] = effect_sizes[empty] = np.nan
+    return u, p_values, effect_sizes
+
+
+def adjust_p_values(p_values, method='holm'):
+    """
+    Corrects p-values for multiple comparisons.
+
+    Parameters:
+    - p_values (ndarray): The p-values; NaN entries are left out of the correction and stay NaN.
+    - method (str, optional): 'holm' (family-wise error rate), 'bh' (Benjamini-Hochberg false discovery rate)
+      or None for no correction. Default is 'holm'.
+
+    Returns:
+    - ndarray: The adjusted p-values.
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    if method is None:
+        return p_values.copy()
+    if method not in ('holm', 'bh'):
+        raise ValueError(f"Unknown correction '{method}'; expected 'holm', 'bh' or None")
+
+    adjusted = np.full(p_values.shape, np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    m = len(tested)
+    if m == 0:
+        return adjusted
+    order = tested[np.argsort(p_values[tested], kind='stable')]
+    ranked = p_values[order]
+
+    if method == 'holm':
+        # Step down: the k-th smallest p-value is multiplied by (m - k + 1) and kept monotone
+        adjusted[order] = np.minimum(np.maximum.accumulate(ranked * (m - np.arange(m))), 1.0)
+    else:
+        # Step up: the k-th smallest p-value is multiplied by m / k and kept monotone from the largest down
+        scaled = ranked * m / np.arange(1, m + 1)
+        adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+    return adjusted
+
+
+def respondent_group_means(scores, indicator):
+    """
+    Averages the answers of every respondent within each group.
+
+    Parameters:
+    - scores (ndarray): A (respondents × columns) score matrix with NaN for missing answers.
+    - indicator (ndarray): The (columns × groups) 0/1 matrix mapping every column to its group.
+
+    Returns:
+    - ndarray: A (respondents × groups) matrix; NaN where a respondent answered nothing in a group.
+    """
+    answered = ~np.isnan(scores)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (np.where(answered, scores, 0.0) @ indicator) / (answered @ indicator)
+
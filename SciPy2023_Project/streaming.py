@@ -0,0 +1,316 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from densities import density_frame
+from instrumentation import count, instrumented
+from prioritization import averages_matrix, score_batch, score_coefficients, weighted_dimensions, weights_matrix
+from survey_aggregates import ScoreAccumulator, ScoreHistogram
+from survey_schema import ColumnSchema, column_letter, compact_scores, score_matrix
+
+
+# Out-of-core aggregation of survey responses.
+#
+# Responses are read in chunks (from CSV or Parquet exports, or page by page from the sheet) and folded
+# into fixed-size accumulators, so memory does not grow with the number of responses. Aggregates built
+# from separate files or by separate workers merge into the aggregate of the whole survey.
+
+
+class StreamingAggregate:
+    """
+    Running aggregate of a survey that is read chunk by chunk.
+
+    Offers the same results as `SurveyDataProcessor` (averages, general averages, prioritization scores and
+    violin plot data) without holding the responses in memory.
+
+    Attributes:
+    - survey_name (str): Name of the survey, used as 'Survey' in the violin plot data.
+    - schema (ColumnSchema): Parsed header of the survey.
+    - n_rows (int): Number of responses aggregated so far.
+    - scores (ScoreAccumulator): Counts, means and squared deviations of the score columns.
+    - general (ScoreAccumulator): Counts, means and squared deviations of the general question columns.
+    - histogram (ScoreHistogram): Counts of score values per task and dimension group.
+    """
+
+    def __init__(self, columns, survey_name='Survey', bin_edges=None):
+        """
+        Parameters:
+        - columns (list): Header of the survey.
+        - survey_name (str, optional): Name of the survey. Default is 'Survey'.
+        - bin_edges (ndarray, optional): Edges of the score histograms; see `ScoreHistogram`.
+        """
+        self.survey_name = survey_name
+        self.schema = ColumnSchema(columns)
+        self.n_rows = 0
+        self.scores = ScoreAccumulator(len(self.schema.score_columns))
+        self.general = ScoreAccumulator(len(self.schema.general_columns))
+        self.histogram = ScoreHistogram(self.schema.n_groups, bin_edges)
+
+    @property
+    def TASKS(self):
+        return self.schema.tasks
+
+    @property
+    def DIMENSIONS(self):
+        return self.schema.dimensions
+
+    @instrumented('aggregate.update')
+    def update(self, chunk):
+        """
+        Folds a chunk of responses into the aggregate.
+
+        Parameters:
+        - chunk (DataFrame): Responses with the header of the survey. Cells that are empty or not numeric
+          count as unanswered.
+        """
+        if list(chunk.columns) != self.schema.columns:
+            raise ValueError('The chunk does not have the header of the survey')
+        scores = score_matrix(chunk, self.schema.score_columns)
+        self.scores.update(scores)
+        self.histogram.update(scores, self.schema.group)
+        self.general.update(score_matrix(chunk, self.schema.general_columns))
+        self.n_rows += len(chunk)
+        count('aggregate.rows', len(chunk))
+
+    def merge(self, other):
+        """
+        Adds the aggregate of another part of the same survey, e.g. one built by a parallel worker.
+
+        Parameters:
+        - other (StreamingAggregate): The aggregate to fold in; it must have the same header.
+        """
+        if other.schema.columns != self.schema.columns:
+            raise ValueError('Cannot merge aggregates of surveys with different headers')
+        self.scores.merge(other.scores)
+        self.general.merge(other.general)
+        self.histogram.merge(other.histogram)
+        self.n_rows += other.n_rows
+
+    def calculate_averages(self):
+        """
+        Calculates the average score for each combination of tasks and dimensions.
+
+        Returns:
+        - DataFrame: Columns 'Task', 'Dimension' and 'Average', as from `SurveyDataProcessor.calculate_averages`.
+        """
+        return pd.DataFrame({
+            'Task': [task for task, _ in self.schema.groups],
+            'Dimension': [dimension for _, dimension in self.schema.groups],
+            'Average': self.schema.group_means(self.scores.means()),
+        })
+
+    def calculate_general_averages(self):
+        """
+        Calculates the average scores for the general survey questions.
+
+        Returns:
+        - Series: Average score of every general question; NaN for questions without numeric answers.
+        """
+        return pd.Series(self.general.means(), index=self.schema.general_columns)
+
+    def compute_prioritization_scores(self, averages, weights):
+        """
+        Computes the prioritization scores for each task, as `SurveyDataProcessor.compute_prioritization_scores`.
+
+        Parameters:
+        - averages (DataFrame): The average scores for each task and dimension.
+        - weights (dict): A dictionary with dimensions as keys and their respective weights as values.
+
+        Returns:
+        - DataFrame: Columns 'Task' and 'Prioritization Score'.
+        """
+        dimensions = weighted_dimensions(weights, averages['Dimension'])
+        coefficients = score_coefficients(averages_matrix(averages, self.TASKS, dimensions), dimensions)
+        scores = score_batch(coefficients, weights_matrix([weights], dimensions))[0]
+        return pd.DataFrame({'Task': self.TASKS, 'Prioritization Score': scores})
+
+    def column_summary(self):
+        """
+        Returns the answer count, mean and standard deviation of every score and general question column.
+
+        Returns:
+        - DataFrame: Columns 'Column', 'Count', 'Mean' and 'Std'.
+        """
+        columns = self.schema.score_columns + self.schema.general_columns
+        return pd.DataFrame({
+            'Column': columns,
+            'Count': np.concatenate([self.scores.count, self.general.count]),
+            'Mean': np.concatenate([self.scores.means(), self.general.means()]),
+            'Std': np.sqrt(np.concatenate([self.scores.variances(), self.general.variances()])),
+        })
+
+    def prepare_data_for_violinplot(self):
+        """
+        Rebuilds the long-form violin plot data from the score histograms.
+
+        With the default whole-number bins the scores of every group are exact, but within a group they are
+        sorted instead of in response order, which does not change the plotted distributions.
+
+        Returns:
+        - DataFrame: Columns 'Survey', 'Task-Dimension' and 'Score', as from
+                     `SurveyDataProcessor.prepare_data_for_violinplot`.
+        """
+        counts = self.histogram.counts
+        n_groups, n_bins = counts.shape
+        group_codes = np.repeat(np.repeat(np.arange(n_groups), n_bins), counts.ravel())
+        scores = np.repeat(np.tile(self.histogram.centers, n_groups), counts.ravel())
+
+        n_scores = len(scores)
+        return pd.DataFrame({
+            "Survey": pd.Categorical.from_codes(np.zeros(n_scores, dtype=np.int8), [self.survey_name]),
+            "Task-Dimension": pd.Categorical.from_codes(group_codes, self.schema.group_labels),
+            "Score": compact_scores(scores),
+        })
+
+    def prepare_violin_densities(self):
+        """
+        Computes the violin plot densities straight from the score histograms.
+
+        Returns:
+        - DataFrame: The summary of `SurveyDataProcessor.prepare_violin_densities`.
+        """
+        return density_frame(self.histogram.centers, self.histogram.counts, self.schema.group_labels,
+                             [self.survey_name] * self.schema.n_groups)
+
+
+def iter_csv_chunks(path, chunksize=50_000):
+    """
+    Reads a CSV export chunk by chunk.
+
+    Parameters:
+    - path (str): Path of the CSV file.
+    - chunksize (int, optional): Rows per chunk. Default is 50 000.
+
+    Yields:
+    - DataFrame: The next chunk of responses.
+    """
+    with pd.read_csv(path, chunksize=chunksize) as reader:
+        yield from reader
+
+
+def iter_parquet_chunks(path, chunksize=50_000):
+    """
+    Reads a Parquet export batch by batch. Requires `pyarrow`.
+
+    Parameters:
+    - path (str): Path of the Parquet file.
+    - chunksize (int, optional): Largest number of rows per batch. Default is 50 000.
+
+    Yields:
+    - DataFrame: The next batch of responses.
+    """
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def iter_sheet_pages(sheet_instance, page_size=5_000, retries=5, backoff=1.0):
+    """
+    Reads a worksheet page by page as raw cell values.
+
+    Every page is one range request, retried on quota and server errors.
+
+    Parameters:
+    - sheet_instance (Worksheet): The worksheet holding the responses, with the header in row 1.
+    - page_size (int, optional): Rows per request. Default is 5 000.
+    - retries (int, optional): Retries per request; see `survey_loader.call_with_retries`. Default is 5.
+    - backoff (float, optional): Delay in seconds before the first retry. Default is 1.0.
+
+    Yields:
+    - DataFrame: The next page of responses as text, with the header of the sheet as columns.
+    """
+    from survey_loader import call_with_retries
+
+    header = call_with_retries(lambda: sheet_instance.row_values(1), retries, backoff)
+    last_column = column_letter(len(header))
+    start = 2
+    while True:
+        cell_range = f'A{start}:{last_column}{start + page_size - 1}'
+        rows = call_with_retries(lambda: sheet_instance.get_values(cell_range), retries, backoff)
+        if rows:
+            padded = [list(row) + [''] * (len(header) - len(row)) for row in rows]
+            yield pd.DataFrame(padded, columns=header, dtype=object)
+        # The API leaves out the empty rows at the end of the sheet, so a short page is the last one
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+def aggregate_chunks(chunks, survey_name='Survey', columns=None, bin_edges=None):
+    """
+    Aggregates a survey read chunk by chunk.
+
+    Parameters:
+    - chunks (iterable): DataFrames of responses that share one header.
+    - survey_name (str, optional): Name of the survey. Default is 'Survey'.
+    - columns (list, optional): Header of the survey. Defaults to the columns of the first chunk.
+    - bin_edges (ndarray, optional): Edges of the score histograms; see `ScoreHistogram`.
+
+    Returns:
+    - StreamingAggregate: The aggregate of all chunks; None if there are no chunks and no columns.
+    """
+    aggregate = StreamingAggregate(columns, survey_name, bin_edges) if columns is not None else None
+    for chunk in chunks:
+        if aggregate is None:
+            aggregate = StreamingAggregate(chunk.columns, survey_name, bin_edges)
+        aggregate.update(chunk)
+    return aggregate
+
+
+@instrumented('aggregate.file')
+def aggregate_file(path, survey_name=None, chunksize=50_000, bin_edges=None):
+    """
+    Aggregates a CSV or Parquet export chunk by chunk.
+
+    Parameters:
+    - path (str): Path of the export; files ending in '.parquet' or '.pq' are read as Parquet, all others as CSV.
+    - survey_name (str, optional): Name of the survey. Defaults to the file name without extension.
+    - chunksize (int, optional): Rows per chunk. Default is 50 000.
+    - bin_edges (ndarray, optional): Edges of the score histograms; see `ScoreHistogram`.
+
+    Returns:
+    - StreamingAggregate: The aggregate of the file.
+    """
+    if survey_name is None:
+        survey_name = os.path.splitext(os.path.basename(path))[0]
+    if path.lower().endswith(('.parquet', '.pq')):
+        chunks = iter_parquet_chunks(path, chunksize)
+    else:
+        chunks = iter_csv_chunks(path, chunksize)
+    return aggregate_chunks(chunks, survey_name, bin_edges=bin_edges)
+
+
+def aggregate_files(paths, survey_name='Survey', chunksize=50_000, max_workers=None, bin_edges=None):
+    """
+    Aggregates several exports of one survey (e.g. the parts of a response archive) in parallel.
+
+    Every file is aggregated in its own worker process and the partial aggregates are merged.
+
+    Parameters:
+    - paths (list): Paths of the CSV or Parquet exports; they must share one header.
+    - survey_name (str, optional): Name of the survey. Default is 'Survey'.
+    - chunksize (int, optional): Rows per chunk. Default is 50 000.
+    - max_workers (int, optional): Number of worker processes. Default uses one per CPU; 1 aggregates in this process.
+    - bin_edges (ndarray, optional): Edges of the score histograms; see `ScoreHistogram`.
+
+    Returns:
+    - StreamingAggregate: The aggregate of all files.
+    """
+    paths = list(paths)
+    arguments = (paths, [survey_name] * len(paths), [chunksize] * len(paths), [bin_edges] * len(paths))
+    if max_workers == 1 or len(paths) <= 1:
+        parts = map(aggregate_file, *arguments)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parts = list(executor.map(aggregate_file, *arguments))
+
+    aggregate = None
+    for part in parts:
+        if aggregate is None:
+            aggregate = part
+        else:
+            aggregate.merge(part)
+    return aggregate
@@ -0,0 +1,166 @@
+import numpy as np
+
+
+class ScoreAccumulator:
+    """
+    Running per-column answer counts, means and sums of squared deviations for survey score columns.
+
+    Column means and variances follow from these arrays (Welford's method), so new responses can be folded
+    in chunk by chunk, and accumulators built from separate parts of a survey can be merged, without keeping
+    the responses themselves.
+
+    Attributes:
+    - count (ndarray): Number of answers seen for each column.
+    - mean (ndarray): Mean of the answers seen for each column; 0 for columns without answers.
+    - m2 (ndarray): Sum of squared deviations from the mean for each column.
+    """
+
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self.mean = np.zeros(n_columns, dtype=np.float64)
+        self.m2 = np.zeros(n_columns, dtype=np.float64)
+
+    @classmethod
+    def from_scores(cls, scores):
+        """
+        Builds an accumulator from a (respondents × columns) score matrix with NaN for missing answers.
+
+        Parameters:
+        - scores (ndarray): The score matrix.
+
+        Returns:
+        - ScoreAccumulator: The accumulated counts, means and squared deviations.
+        """
+        accumulator = cls(scores.shape[1])
+        accumulator.update(scores)
+        return accumulator
+
+    @property
+    def total(self):
+        """Sum of the answers seen for each column."""
+        return self.mean * self.count
+
+    def update(self, scores):
+        """
+        Adds the answers of new respondents.
+
+        Parameters:
+        - scores (ndarray): A (new respondents × columns) score matrix with NaN for missing answers.
+        """
+        answered = ~np.isnan(scores)
+        count = answered.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(answered, scores, 0.0).sum(axis=0) / count
+        mean[count == 0] = 0.0
+        m2 = np.where(answered, scores - mean, 0.0)
+        self._combine(count, mean, (m2 ** 2).sum(axis=0))
+
+    def merge(self, other):
+        """
+        Adds the answers of another accumulator over the same columns.
+
+        Parameters:
+        - other (ScoreAccumulator): The accumulator to fold in.
+        """
+        self._combine(other.count, other.mean, other.m2)
+
+    def _combine(self, count, mean, m2):
+        """Folds in the statistics of another set of answers (Chan et al.'s parallel form of Welford's update)."""
+        combined = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            share = np.where(combined > 0, count / combined, 0.0)
+        self.mean = self.mean + delta * share
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * share
+        self.count = combined
+
+    def means(self):
+        """
+        Returns the mean of every column.
+
+        Returns:
+        - ndarray: Column means; NaN for columns without answers.
+        """
+        return np.where(self.count > 0, self.mean, np.nan)
+
+    def variances(self, ddof=1):
+        """
+        Returns the variance of every column.
+
+        Parameters:
+        - ddof (int, optional): Delta degrees of freedom. Default is 1 (sample variance).
+
+        Returns:
+        - ndarray: Column variances; NaN for columns with no more than `ddof` answers.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+
+class ScoreHistogram:
+    """
+    Mergeable per-group counts of score values, the distribution behind the violin plots.
+
+    Likert answers are whole numbers, so by default every bin holds exactly one answer value and the counts
+    reproduce the scores of a group exactly. Values outside the edges go to the outer bins.
+
+    Attributes:
+    - bin_edges (ndarray): Edges of the bins.
+    - counts (ndarray): (groups × bins) number of answers per group and bin.
+    """
+
+    def __init__(self, n_groups, bin_edges=None):
+        """
+        Parameters:
+        - n_groups (int): Number of (task, dimension) groups.
+        - bin_edges (ndarray, optional): Bin edges. Defaults to one bin per whole number from 0 to 10.
+        """
+        if bin_edges is None:
+            bin_edges = np.arange(-0.5, 11.5)
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self.counts = np.zeros((n_groups, len(self.bin_edges) - 1), dtype=np.int64)
+
+    @property
+    def centers(self):
+        """Midpoint of every bin."""
+        return (self.bin_edges[:-1] + self.bin_edges[1:]) / 2
+
+    def update(self, scores, group):
+        """
+        Counts the answers of new respondents.
+
+        Parameters:
+        - scores (ndarray): A (new respondents × columns) score matrix with NaN for missing answers.
+        - group (ndarray): Group code of each column.
+        """
+        n_groups, n_bins = self.counts.shape
+        flat_groups = np.broadcast_to(group, scores.shape)
+        answered = ~np.isnan(scores)
+        bins = np.clip(np.searchsorted(self.bin_edges, scores[answered], side='right') - 1, 0, n_bins - 1)
+
+        # Count every group's bins at once by offsetting each group's bins into one flat bincount
+        self.counts += np.bincount(flat_groups[answered] * n_bins + bins,
+                                   minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+    def merge(self, other):
+        """
+        Adds the counts of another histogram with the same groups and edges.
+
+        Parameters:
+        - other (ScoreHistogram): The histogram to fold in.
+        """
+        if not np.array_equal(self.bin_edges, other.bin_edges):
+            raise ValueError('Cannot merge histograms with different bin edges')
+        self.counts += other.counts
+
+    def expand(self, group):
+        """
+        Reconstructs the scores of one group from its counts, with every answer at its bin center.
+
+        Parameters:
+        - group (int): The group code.
+
+        Returns:
+        - ndarray: The scores of the group, in ascending order.
+        """
+        return np.repeat(self.centers, self.counts[group])
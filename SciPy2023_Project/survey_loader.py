@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from data_processing_API import SurveyDataProcessor
+
+
+# HTTP status codes that signal a temporary condition (quota exhausted or a server-side error)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_client_lock = threading.Lock()
+_shared_client = None
+
+
+def get_shared_client(max_connections=10):
+    """
+    Returns one authorized Google Sheets client for the whole process, authorizing it on first use.
+
+    The client's HTTP session is given a connection pool large enough for `max_connections` concurrent
+    requests, so parallel downloads reuse connections instead of opening new ones.
+
+    Parameters:
+    - max_connections (int, optional): Size of the connection pool. Default is 10.
+
+    Returns:
+    - Client: Google Sheets API client.
+    """
+    global _shared_client
+    with _client_lock:
+        if _shared_client is None:
+            _shared_client = SurveyDataProcessor._get_gspread_client()
+
+            session = getattr(getattr(_shared_client, 'http_client', _shared_client), 'session', None)
+            if session is not None:
+                from requests.adapters import HTTPAdapter
+                adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+                session.mount('https://', adapter)
+        return _shared_client
+
+
+def _status_code(error):
+    """Extracts the HTTP status code from a gspread API error (None for other exceptions)."""
+    code = getattr(error, 'code', None)
+    if code is None and getattr(error, 'response', None) is not None:
+        code = getattr(error.response, 'status_code', None)
+    return code
+
+
+def call_with_retries(function, retries=5, backoff=1.0):
+    """
+    Calls a function, retrying with exponential backoff when the Sheets API reports a quota or server error.
+
+    Parameters:
+    - function (callable): The function to call without arguments.
+    - retries (int, optional): How many times to retry before giving up. Default is 5.
+    - backoff (float, optional): Delay in seconds before the first retry; doubled on every attempt. Default is 1.0.
+
+    Returns:
+    - The return value of `function`.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return function()
+        except Exception as error:
+            # Only API errors carry a status code; anything else is raised straight away
+            if attempt == retries or _status_code(error) not in RETRYABLE_STATUS_CODES:
+                raise
+            # Add jitter so parallel workers hitting the same quota do not retry in lockstep
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+
+def load_surveys(survey_names, max_workers=4, client=None, retries=5, backoff=1.0, **processor_options):
+    """
+    Fetches several surveys concurrently and yields their processors as soon as each one is ready.
+
+    All downloads share one authorized client and run on a bounded thread pool. The returned processors
+    already hold their data.
+
+    Parameters:
+    - survey_names (list): Names of the Google Sheets to load.
+    - max_workers (int, optional): Maximum number of concurrent downloads. Default is 4.
+    - client (Client, optional): Authorized client to use. Defaults to the process-wide shared client.
+    - retries (int, optional): Retries per survey on quota or server errors. Default is 5.
+    - backoff (float, optional): Initial retry delay in seconds. Default is 1.0.
+    - processor_options: Further keyword arguments for `SurveyDataProcessor` (e.g. `store`).
+
+    Yields:
+    - tuple: (survey name, SurveyDataProcessor) pairs in order of completion.
+    """
+    if client is None and not processor_options.get('offline', False):
+        client = get_shared_client(max_connections=max_workers)
+
+    def load(survey_name):
+        return call_with_retries(
+            lambda: SurveyDataProcessor(survey_name, client=client, **processor_options).load(),
+            retries=retries, backoff=backoff
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(load, survey_name): survey_name for survey_name in survey_names}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
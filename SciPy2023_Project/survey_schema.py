@@ -0,0 +1,205 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Survey headers carry a code such as "E1" or "Si3" that identifies the dimension (letters) and the
+# task (digits) a question belongs to. An optional ".2" / "_2" / "-2" suffix numbers the question
+# within that task and dimension. The code must not be glued to other letters or digits, so "E1"
+# never matches "E12" and "S1" never matches "Si1".
+CODE_PATTERN = re.compile(
+    r'(?<![A-Za-z0-9])(?P<dimension>[A-Z][a-z]?)(?P<task>\d+)(?:[._-](?P<question>\d+))?(?![A-Za-z0-9])'
+)
+
+# Preferred display order for the known dimensions. Dimensions discovered in a header that are not
+# listed here are appended in the order they first appear.
+DIMENSION_ORDER = ['E', 'Q', 'S', 'P', 'Si']  # E for Efficiency, Q for Quality, S for Satisfaction, P for Prevalence, Si for Significance
+
+# Columns that are never treated as survey questions
+METADATA_COLUMNS = ['Timestamp']
+
+
+class ColumnSchema:
+    """
+    Parsed index of a survey header, mapping every score column to its (task, dimension, question).
+
+    The header is parsed once; all aggregations then work on the integer group codes stored here
+    instead of scanning the column names again.
+
+    Attributes:
+    - score_columns (list): Names of the columns that carry a task/dimension code, in header order.
+    - general_columns (list): Names of the remaining question columns (metadata columns excluded).
+    - tasks (list): Task identifiers discovered in the header, sorted ascending.
+    - dimensions (list): Dimension identifiers discovered in the header, in display order.
+    - task (ndarray): Task identifier of each score column.
+    - dimension (ndarray): Dimension identifier of each score column.
+    - question (ndarray): Question number of each score column within its task and dimension.
+    - group (ndarray): Group code of each score column, indexing into `groups`.
+    - groups (list): (task, dimension) pairs in task-major order; covers the full task × dimension grid.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+        parsed = []
+        self.general_columns = []
+        for column in self.columns:
+            match = CODE_PATTERN.search(str(column))
+            if match is None:
+                if column not in METADATA_COLUMNS:
+                    self.general_columns.append(column)
+                continue
+            parsed.append((column, int(match.group('task')), match.group('dimension'), match.group('question')))
+
+        self.score_columns = [column for column, _, _, _ in parsed]
+        self.tasks = sorted({task for _, task, _, _ in parsed})
+
+        discovered = list(dict.fromkeys(dimension for _, _, dimension, _ in parsed))
+        self.dimensions = [dim for dim in DIMENSION_ORDER if dim in discovered] + \
+                          [dim for dim in discovered if dim not in DIMENSION_ORDER]
+
+        self.groups = [(task, dimension) for task in self.tasks for dimension in self.dimensions]
+        group_codes = {key: code for code, key in enumerate(self.groups)}
+
+        self.task = np.array([task for _, task, _, _ in parsed], dtype=np.int64)
+        self.dimension = np.array([dimension for _, _, dimension, _ in parsed], dtype=object)
+        self.group = np.array([group_codes[(task, dimension)] for _, task, dimension, _ in parsed], dtype=np.int64)
+
+        # Number questions explicitly when the header does so, otherwise by position within the group
+        self.question = np.zeros(len(parsed), dtype=np.int64)
+        seen = np.zeros(len(self.groups), dtype=np.int64)
+        for i, (_, _, _, question) in enumerate(parsed):
+            seen[self.group[i]] += 1
+            self.question[i] = int(question) if question is not None else seen[self.group[i]]
+
+    @property
+    def n_groups(self):
+        """Number of (task, dimension) groups in the task × dimension grid."""
+        return len(self.groups)
+
+    @property
+    def group_labels(self):
+        """Labels of the groups in the 'task-dimension' form used by the violin plots, e.g. '1-E'."""
+        return [f"{task}-{dimension}" for task, dimension in self.groups]
+
+    def group_columns(self, task, dimension):
+        """
+        Returns the score columns belonging to one task and dimension.
+
+        Parameters:
+        - task (int): The task identifier.
+        - dimension (str): The dimension identifier.
+
+        Returns:
+        - list: Column names in header order; empty if the pair does not occur in the header.
+        """
+        if (task, dimension) not in self.groups:
+            return []
+        code = self.groups.index((task, dimension))
+        return [column for column, group in zip(self.score_columns, self.group) if group == code]
+
+    def group_means(self, column_means):
+        """
+        Averages per-column means within each (task, dimension) group in a single grouped reduction.
+
+        Columns whose mean is NaN (no answers) are ignored, matching `DataFrame.mean().mean()`.
+
+        Parameters:
+        - column_means (ndarray): Mean of each score column, aligned with `score_columns`, or a
+          (rows × columns) matrix holding one such vector per row (e.g. per respondent segment).
+
+        Returns:
+        - ndarray: Mean of the column means for every group in `groups`, per row for a matrix; NaN for empty groups.
+        """
+        column_means = np.asarray(column_means, dtype=np.float64)
+        valid = ~np.isnan(column_means)
+        if column_means.ndim == 2:
+            # Sum the columns of every group for all rows at once through a column × group indicator matrix
+            indicator = group_indicator(self.group, self.n_groups)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return (np.where(valid, column_means, 0.0) @ indicator) / (valid @ indicator)
+        sums = np.bincount(self.group[valid], weights=column_means[valid], minlength=self.n_groups)
+        counts = np.bincount(self.group[valid], minlength=self.n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
+
+
+def group_indicator(group, n_groups):
+    """
+    Builds the (columns × groups) 0/1 matrix that maps every score column to its task/dimension group.
+
+    Parameters:
+    - group (ndarray): Group code of each score column.
+    - n_groups (int): Number of groups.
+
+    Returns:
+    - ndarray: The indicator matrix.
+    """
+    indicator = np.zeros((len(group), n_groups))
+    indicator[np.arange(len(group)), group] = 1.0
+    return indicator
+
+
+def column_letter(position):
+    """
+    Converts a 1-based column position into its spreadsheet letter, e.g. 1 -> 'A', 28 -> 'AB'.
+
+    Parameters:
+    - position (int): The column position.
+
+    Returns:
+    - str: The column letter used in A1 notation.
+    """
+    letters = ''
+    while position > 0:
+        position, remainder = divmod(position - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def score_matrix(df, columns):
+    """
+    Converts the given columns of a survey DataFrame into a float matrix with NaN for missing answers.
+
+    Masked answers of nullable integer columns, empty strings and other non-numeric cells (as returned by
+    the Sheets API for unanswered questions) become NaN. Categorical columns are converted through their
+    categories, so every distinct value is parsed only once.
+
+    Parameters:
+    - df (DataFrame): The survey data.
+    - columns (list): The columns to extract.
+
+    Returns:
+    - ndarray: A (respondents × columns) float64 matrix.
+    """
+    matrix = np.empty((len(df), len(columns)), dtype=np.float64)
+    for i, column in enumerate(columns):
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = pd.to_numeric(values.cat.categories, errors='coerce').to_numpy(dtype=np.float64)
+            # Code -1 marks a missing value and picks the NaN appended after the categories
+            matrix[:, i] = np.append(categories, np.nan)[values.cat.codes.to_numpy()]
+        elif values.dtype.kind in 'biuf':
+            matrix[:, i] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            matrix[:, i] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+    return matrix
+
+
+def compact_scores(values):
+    """
+    Stores scores in the smallest dtype that holds them exactly.
+
+    Likert answers are whole numbers and fit in int8; anything else is kept as float32.
+
+    Parameters:
+    - values (ndarray): Scores without missing values.
+
+    Returns:
+    - ndarray: The scores as int8 when they are all small whole numbers, float32 otherwise.
+    """
+    values = np.asarray(values)
+    if values.size and np.all(np.mod(values, 1) == 0) and values.min() >= -128 and values.max() <= 127:
+        return values.astype(np.int8)
+    return values.astype(np.float32)
@@ -0,0 +1,468 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from survey_schema import METADATA_COLUMNS
+
+
+# Local, typed copies of fetched survey sheets.
+#
+# Every store keeps at most one entry per survey, keyed by the sheet name and its revision (the sheet's
+# last update time, or its row count when that is unavailable). Saving a new revision evicts the old one.
+# Responses that arrive later are appended as separate segment files, listed in a small JSON index per
+# survey, so a refresh only writes the new rows.
+
+
+def _slug(text):
+    """Turns a sheet name or revision into a string that is safe to use in file names."""
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(text)).strip('_') or '_'
+
+
+def _key(survey_name):
+    """
+    Turns a sheet name into the file-name prefix of its cache entries.
+
+    Names that only differ in punctuation share a slug ('Survey (v2)' and 'Survey v2' both become
+    'Survey_v2'), so a short hash of the exact name is added to keep their entries apart.
+    """
+    digest = hashlib.sha1(str(survey_name).encode('utf-8')).hexdigest()[:8]
+    return f'{_slug(survey_name)}-{digest}'
+
+
+def _compact_numeric(numeric):
+    """Stores a numeric column as nullable Int8 when it only holds small whole numbers, as float64 otherwise."""
+    values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+    answered = values[~np.isnan(values)]
+    if np.all(np.mod(answered, 1) == 0) and np.all((answered >= -128) & (answered <= 127)):
+        return numeric.astype('Int8')
+    return pd.Series(values, index=numeric.index, name=numeric.name)
+
+
+def typed_column(values):
+    """
+    Converts one column of sheet values into its compact type.
+
+    Parameters:
+    - values (Series): The cell values of the column.
+
+    Returns:
+    - Series: Nullable Int8 for whole-number answers (Likert scores), float64 for other numbers, datetime64 for
+              the 'Timestamp' column and categorical for free text; missing answers are masked, not stored as ''.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype.kind == 'M':
+        return values
+    if values.dtype.kind in 'biuf':
+        return _compact_numeric(values)
+
+    missing = values.isna()
+    blank = missing | (values.where(~missing, '').astype(str).str.strip() == '')
+    answered = (~blank).sum()
+
+    if values.name in METADATA_COLUMNS:
+        parsed = pd.to_datetime(values.where(~blank), errors='coerce')
+        if parsed.notna().sum() == answered:
+            return parsed
+
+    numeric = pd.to_numeric(values.where(~blank), errors='coerce')
+    if numeric.notna().sum() == answered:
+        return _compact_numeric(numeric)
+    return values.astype(str).where(~blank).astype('category')
+
+
+def columnar_frame(df):
+    """
+    Converts a DataFrame built from sheet records into one compact type per column.
+
+    The Sheets API returns numbers for answered questions and empty strings for unanswered ones. The column
+    types are settled once here, so later reductions run on numeric arrays instead of Python objects
+    (see `typed_column`).
+
+    Parameters:
+    - df (DataFrame): The survey data as fetched from the sheet.
+
+    Returns:
+    - DataFrame: The same data with nullable Int8, float64, datetime64 and categorical columns only.
+    """
+    return pd.DataFrame({column: typed_column(df[column]) for column in df.columns}, index=df.index)
+
+
+def unique_header(header):
+    """
+    Checks that every column of a sheet's header row has its own name.
+
+    Parameters:
+    - header (list): The header row.
+
+    Returns:
+    - list: The column names as strings.
+    """
+    header = [str(column) for column in header]
+    if len(set(header)) != len(header):
+        raise ValueError('The header row of the sheet is not unique')
+    return header
+
+
+def grid_frame(header, rows):
+    """
+    Parses a raw grid of sheet values (as from `Worksheet.get_all_values`) into typed columns.
+
+    The rows are copied into one 2-D object array and every column is typed from its slice, so no
+    per-respondent dict keyed by the question texts is ever built.
+
+    Parameters:
+    - header (list): The header row.
+    - rows (list): Rows of cell values below the header; trailing empty cells may be missing.
+
+    Returns:
+    - DataFrame: The typed data, as returned by `columnar_frame`.
+    """
+    header = unique_header(header)
+    grid = np.full((len(rows), len(header)), '', dtype=object)
+    for i, row in enumerate(rows):
+        row = row[:len(header)]
+        grid[i, :len(row)] = row
+    return pd.DataFrame({column: typed_column(pd.Series(grid[:, j], name=column))
+                         for j, column in enumerate(header)})
+
+
+def append_frame(df, new_rows):
+    """
+    Appends typed rows to typed survey data, keeping the compact column types.
+
+    Categorical columns are combined over the union of their categories; a column whose type differs between
+    the two frames (e.g. a non-integer answer arriving in an Int8 column) is typed again as a whole.
+
+    Parameters:
+    - df (DataFrame): The survey data, as returned by `columnar_frame`.
+    - new_rows (DataFrame): Rows with the same columns, as returned by `columnar_frame`.
+
+    Returns:
+    - DataFrame: The combined data with a fresh index.
+    """
+    columns = {}
+    for column in df.columns:
+        old, new = df[column], new_rows[column]
+        if isinstance(old.dtype, pd.CategoricalDtype) and isinstance(new.dtype, pd.CategoricalDtype):
+            columns[column] = pd.Series(union_categoricals([old.array, new.array]), name=column)
+        elif old.dtype == new.dtype:
+            columns[column] = pd.concat([old, new], ignore_index=True)
+        else:
+            combined = pd.concat([old.astype(object), new.astype(object)], ignore_index=True)
+            columns[column] = typed_column(combined)
+    return pd.DataFrame(columns)
+
+
+class SheetStore:
+    """
+    Base class for on-disk survey caches.
+
+    Subclasses implement `_write` and `_read` for one file format; the base class handles keys, appended
+    segments and eviction.
+
+    Attributes:
+    - directory (str): Folder holding the cached entries.
+    """
+
+    EXTENSION = ''
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, survey_name, revision, part=0):
+        suffix = f'.{part}' if part else ''
+        return os.path.join(self.directory, f'{_key(survey_name)}--{_slug(revision)}{suffix}{self.EXTENSION}')
+
+    def _index_path(self, survey_name):
+        return os.path.join(self.directory, f'{_key(survey_name)}.index.json')
+
+    def _segments(self, survey_name):
+        """Returns the indexed segments of a survey (the full copy first, then the appended rows), or None."""
+        path = self._index_path(survey_name)
+        if not os.path.exists(path):
+            return None
+        with open(path) as index:
+            return json.load(index)['segments']
+
+    def _write_index(self, survey_name, segments):
+        with open(self._index_path(survey_name), 'w') as index:
+            json.dump({'survey': survey_name, 'segments': segments}, index)
+
+    def _read_segments(self, segments):
+        """Reads the segments of a survey and appends them into one frame."""
+        frames = [self._read(os.path.join(self.directory, segment['file'])) for segment in segments]
+        if len(frames) == 1:
+            return frames[0]
+        # Combine the (small) appended segments first, so the full copy is concatenated only once
+        appended = frames[1]
+        for frame in frames[2:]:
+            appended = append_frame(appended, frame)
+        return append_frame(frames[0], appended)
+
+    def _entries(self, survey_name):
+        """Returns the cached entries for a survey, most recently written first."""
+        pattern = os.path.join(self.directory, f'{glob.escape(_key(survey_name))}--*{self.EXTENSION}')
+        return sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+
+    def load(self, survey_name, revision):
+        """
+        Reads the cached copy of a survey at the given revision.
+
+        Parameters:
+        - survey_name (str): The name of the Google Sheet.
+        - revision (str): The revision the copy must match.
+
+        Returns:
+        - DataFrame or None: The cached data, or None when there is no copy for this revision.
+        """
+        segments = self._segments(survey_name)
+        if segments is None:
+            path = self._path(survey_name, revision)
+            return self._read(path) if os.path.exists(path) else None
+        if segments[-1]['revision'] != str(revision):
+            return None
+        return self._read_segments(segments)
+
+    def latest(self, survey_name):
+        """
+        Reads the most recent cached copy of a survey regardless of its revision (used in offline mode).
+
+        Parameters:
+        - survey_name (str): The name of the Google Sheet.
+
+        Returns:
+        - DataFrame or None: The cached data, or None when the survey has never been cached.
+        """
+        segments = self._segments(survey_name)
+        if segments:
+            return self._read_segments(segments)
+        entries = self._entries(survey_name)
+        return self._read(entries[0]) if entries else None
+
+    def revision(self, survey_name):
+        """
+        Identifies the most recent cached copy of a survey without reading its data.
+
+        Parameters:
+        - survey_name (str): The name of the Google Sheet.
+
+        Returns:
+        - str or None: The revision of the copy `latest` returns (for copies without an index, the modification
+                       time of the file), or None when the survey has never been cached.
+        """
+        segments = self._segments(survey_name)
+        if segments:
+            return segments[-1]['revision']
+        entries = self._entries(survey_name)
+        return f'mtime-{os.path.getmtime(entries[0])}' if entries else None
+
+    def save(self, survey_name, revision, df):
+        """
+        Stores a survey at the given revision and evicts the copies of older revisions.
+
+        Parameters:
+        - survey_name (str): The name of the Google Sheet.
+        - revision (str): The revision of the data being stored.
+        - df (DataFrame): The survey data, as returned by `columnar_frame`.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.evict(survey_name)
+        path = self._path(survey_name, revision)
+        self._write(path, df)
+        self._write_index(survey_name, [{'file': os.path.basename(path), 'revision': str(revision), 'rows': len(df)}])
+
+    def append(self, survey_name, revision, new_rows):
+        """
+        Stores rows appended to a cached survey without rewriting the rows stored before.
+
+        The new rows become a segment of their own. Once the appended segments hold as many rows as the full
+        copy, all segments are merged into a new full copy, so reads stay fast while the writes per appended
+        row remain constant on average.
+
+        Parameters:
+        - survey_name (str): The name of the Google Sheet.
+        - revision (str): The revision of the sheet including the new rows.
+        - new_rows (DataFrame): The appended rows, as returned by `columnar_frame`.
+
+        Returns:
+        - bool: True if the rows were stored; False if there is no indexed copy to append to, in which case
+                the caller should `save` the whole survey.
+        """
+        segments = self._segments(survey_name)
+        if not segments:
+            return False
+        path = self._path(survey_name, revision, part=len(segments))
+        self._write(path, new_rows.reset_index(drop=True))
+        segments.append({'file': os.path.basename(path), 'revision': str(revision), 'rows': len(new_rows)})
+
+        if sum(segment['rows'] for segment in segments[1:]) >= segments[0]['rows']:
+            self.save(survey_name, revision, self._read_segments(segments))
+        else:
+            self._write_index(survey_name, segments)
+        return True
+
+    def evict(self, survey_name):
+        """
+        Removes the cached copies of a survey.
+
+        Parameters:
+        - survey_name (str): The name of the Google Sheet.
+        """
+        for path in self._entries(survey_name):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        if os.path.exists(self._index_path(survey_name)):
+            os.remove(self._index_path(survey_name))
+
+    def _write(self, path, df):
+        raise NotImplementedError
+
+    def _read(self, path):
+        raise NotImplementedError
+
+
+class ParquetStore(SheetStore):
+    """
+    Caches surveys as compressed Parquet files. Requires `pyarrow`.
+
+    The files are small, but every column is decompressed and decoded into new arrays on load, so reading
+    copies the whole survey even though the file is memory-mapped.
+    """
+
+    EXTENSION = '.parquet'
+
+    def _write(self, path, df):
+        df.to_parquet(path, engine='pyarrow', index=False)
+
+    def _read(self, path):
+        return pd.read_parquet(path, engine='pyarrow', memory_map=True)
+
+
+class FeatherStore(SheetStore):
+    """
+    Caches surveys as uncompressed Feather (Arrow IPC) files. Requires `pyarrow`.
+
+    The files are memory-mapped and need no decoding, but converting the Arrow table for pandas still copies
+    the nullable Int8 and categorical columns, so only the float and datetime columns are read without a copy.
+    """
+
+    EXTENSION = '.feather'
+
+    def _write(self, path, df):
+        df.reset_index(drop=True).to_feather(path, compression='uncompressed')
+
+    def _read(self, path):
+        from pyarrow import feather
+        return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+class NumpyStore(SheetStore):
+    """
+    Caches surveys as `.npy` files per column plus a JSON manifest, without extra dependencies.
+
+    Int8 columns are stored as their values plus a missing-answer mask, categorical columns as their codes
+    with the categories in the manifest. Everything is memory-mapped copy-on-write on load, so reading does not
+    copy any data, and in-place edits of the loaded frame only copy the pages they change, never writing to the files.
+    """
+
+    EXTENSION = '.npcols'
+
+    def _write(self, path, df):
+        os.makedirs(path)
+        entries = []
+        for i, column in enumerate(df.columns):
+            values = df[column]
+            entry = {'column': str(column), 'file': f'{i}.npy', 'kind': 'plain'}
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                entry.update(kind='category', categories=[str(category) for category in values.cat.categories])
+                data = values.cat.codes.to_numpy()
+            elif isinstance(values.dtype, pd.api.extensions.ExtensionDtype) and values.dtype.kind in 'biu':
+                entry.update(kind='masked', mask=f'{i}.mask.npy')
+                data = values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0)
+                np.save(os.path.join(path, entry['mask']), values.isna().to_numpy())
+            else:
+                data = values.to_numpy()
+                if data.dtype.kind not in 'biufM':
+                    data = data.astype(str)
+            np.save(os.path.join(path, entry['file']), data)
+            entries.append(entry)
+        with open(os.path.join(path, 'manifest.json'), 'w') as manifest:
+            json.dump({'columns': entries}, manifest)
+
+    def _read(self, path):
+        with open(os.path.join(path, 'manifest.json')) as manifest:
+            meta = json.load(manifest)
+
+        def load(file_name):
+            return np.load(os.path.join(path, file_name), mmap_mode='c')
+
+        columns = {}
+        for entry in meta['columns']:
+            data = load(entry['file'])
+            if entry['kind'] == 'category':
+                columns[entry['column']] = pd.Categorical.from_codes(data, entry['categories'])
+            elif entry['kind'] == 'masked':
+                columns[entry['column']] = pd.arrays.IntegerArray(data, load(entry['mask']))
+            else:
+                columns[entry['column']] = data
+        return pd.DataFrame(columns, copy=False)
+
+
+class CSVExportStore(SheetStore):
+    """
+    Read-only store over a folder of CSV exports, one `<survey name>.csv` file per survey.
+
+    Use it in offline mode to analyse sheets that were downloaded by hand from Google Sheets.
+    """
+
+    EXTENSION = '.csv'
+
+    def _entries(self, survey_name):
+        paths = [os.path.join(self.directory, f'{survey_name}.csv'),
+                 os.path.join(self.directory, f'{_slug(survey_name)}.csv')]
+        return [path for path in paths if os.path.exists(path)][:1]
+
+    def load(self, survey_name, revision):
+        return None
+
+    def save(self, survey_name, revision, df):
+        # The exports are maintained by hand and are never overwritten
+        pass
+
+    def append(self, survey_name, revision, new_rows):
+        # Nothing is stored, so callers fall back to `save`, which leaves the exports alone as well
+        return False
+
+    def evict(self, survey_name):
+        pass
+
+    def _read(self, path):
+        return columnar_frame(pd.read_csv(path, keep_default_na=False))
+
+
+def default_store(directory):
+    """
+    Returns the store that loads fastest in this environment for the given folder.
+
+    Both candidates write uncompressed files that are read back without the decoding pass a `ParquetStore`
+    needs (see their descriptions for which columns are still copied).
+
+    Parameters:
+    - directory (str): Folder holding the cached entries.
+
+    Returns:
+    - SheetStore: A `FeatherStore` when `pyarrow` is installed, a `NumpyStore` otherwise.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return NumpyStore(directory)
+    return FeatherStore(directory)
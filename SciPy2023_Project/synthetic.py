@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from survey_schema import DIMENSION_ORDER
+
+
+def generate_survey_frame(n_respondents=100, n_tasks=3, dimensions=DIMENSION_ORDER, questions_per_group=1,
+                          n_general=5, missing_rate=0.1, scale=7, seed=None):
+    """
+    Generates a synthetic survey with the same header conventions as the real response sheets.
+
+    Score columns carry a task/dimension code such as "E1" or "Si3" (followed by ".2", ".3", ... when a
+    task and dimension have several questions); general questions carry no code. Answers are whole numbers
+    on a 1..scale Likert scale, and unanswered questions are NaN.
+
+    Parameters:
+    - n_respondents (int, optional): Number of responses. Default is 100.
+    - n_tasks (int, optional): Number of tasks. Default is 3.
+    - dimensions (list, optional): Dimension identifiers. Default is ['E', 'Q', 'S', 'P', 'Si'].
+    - questions_per_group (int, optional): Questions per task and dimension. Default is 1.
+    - n_general (int, optional): Number of general questions. Default is 5.
+    - missing_rate (float, optional): Probability that an answer is missing. Default is 0.1.
+    - scale (int, optional): Highest answer on the Likert scale. Default is 7.
+    - seed (int, optional): Seed for reproducible data.
+
+    Returns:
+    - DataFrame: A 'Timestamp' column, the score columns in task-major order, then the general questions.
+    """
+    rng = np.random.default_rng(seed)
+
+    columns = []
+    for task in range(1, n_tasks + 1):
+        for dimension in dimensions:
+            for question in range(1, questions_per_group + 1):
+                code = f'{dimension}{task}' if questions_per_group == 1 else f'{dimension}{task}.{question}'
+                columns.append(f'How would you rate task {task} on this aspect? ({code})')
+    columns += [f'General question {i}: how much do you agree?' for i in range(1, n_general + 1)]
+
+    # Give every question its own mean so averages differ between tasks and dimensions
+    centers = rng.uniform(2, scale - 1, size=len(columns))
+    answers = np.rint(rng.normal(centers, 1.2, size=(n_respondents, len(columns)))).clip(1, scale)
+    answers[rng.random(answers.shape) < missing_rate] = np.nan
+
+    start = pd.Timestamp('2023-01-01')
+    timestamps = start + pd.to_timedelta(np.sort(rng.uniform(0, 90, n_respondents)), unit='D')
+
+    df = pd.DataFrame(answers, columns=columns)
+    df.insert(0, 'Timestamp', timestamps.strftime('%m/%d/%Y %H:%M:%S'))
+    return df
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The project modules are imported as top-level modules, as when running the scripts from this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Draw figures without a display
+os.environ.setdefault('MPLBACKEND', 'Agg')
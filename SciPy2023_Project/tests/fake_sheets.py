@@ -0,0 +1,86 @@
+import re
+
+
+def column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+
+class FakeWorksheet:
+    """
+    In-memory stand-in for a gspread worksheet, serving its values the way the Sheets API does.
+
+    Trailing empty cells of a row and empty rows at the end of a range are left out, as in API responses.
+    Every call is recorded in `calls` as (method, argument).
+    """
+
+    def __init__(self, values):
+        self.values = [list(row) for row in values]
+        self.calls = []
+
+    def _range(self, cell_range):
+        start_column, start_row, end_column, end_row = re.fullmatch(
+            r'([A-Z]*)(\d*):([A-Z]*)(\d*)', cell_range).groups()
+        width = max((len(row) for row in self.values), default=0)
+        first_row = int(start_row) if start_row else 1
+        last_row = int(end_row) if end_row else len(self.values)
+        first_column = column_number(start_column) if start_column else 1
+        last_column = column_number(end_column) if end_column else width
+
+        rows = [[str(cell) for cell in row[first_column - 1:last_column]]
+                for row in self.values[first_row - 1:last_row]]
+        rows = [row[:max((i + 1 for i, cell in enumerate(row) if cell != ''), default=0)] for row in rows]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def get_all_values(self):
+        self.calls.append(('get_all_values', None))
+        width = max((len(row) for row in self.values), default=0)
+        return [[str(cell) for cell in row] + [''] * (width - len(row)) for row in self.values]
+
+    def batch_get(self, ranges):
+        self.calls.append(('batch_get', tuple(ranges)))
+        return [self._range(cell_range) for cell_range in ranges]
+
+    def row_values(self, row):
+        self.calls.append(('row_values', row))
+        return self._range(f'{row}:{row}')[0]
+
+    def col_values(self, column):
+        self.calls.append(('col_values', column))
+        return [row[column - 1] if len(row) >= column else '' for row in self._range('A1:')]
+
+    def get_all_records(self):
+        self.calls.append(('get_all_records', None))
+        header, *rows = self.get_all_values()
+
+        def value(cell):
+            # gspread converts numeric cells to numbers
+            try:
+                return int(cell)
+            except ValueError:
+                try:
+                    return float(cell)
+                except ValueError:
+                    return cell
+        return [dict(zip(header, map(value, row))) for row in rows]
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet, last_update=None):
+        self.worksheet = worksheet
+        self.lastUpdateTime = last_update
+
+    def get_worksheet(self, index):
+        return self.worksheet
+
+
+class FakeClient:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open(self, name):
+        return self.spreadsheet
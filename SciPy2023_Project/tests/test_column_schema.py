@@ -0,0 +1,41 @@
+import numpy as np
+
+from survey_schema import ColumnSchema
+
+
+def test_codes_are_not_matched_inside_longer_codes():
+    schema = ColumnSchema(['Timestamp', 'How easy was E1?', 'How easy was E12?', 'How significant was Si1?',
+                           'How satisfied with S1?', 'How easy was E1.2?'])
+
+    assert schema.tasks == [1, 12]
+    assert schema.dimensions == ['E', 'S', 'Si']
+    assert schema.group_columns(1, 'E') == ['How easy was E1?', 'How easy was E1.2?']
+    assert schema.group_columns(12, 'E') == ['How easy was E12?']
+    assert schema.group_columns(1, 'S') == ['How satisfied with S1?']
+    assert schema.group_columns(1, 'Si') == ['How significant was Si1?']
+    assert schema.question.tolist() == [1, 1, 1, 1, 2]
+
+
+def test_unknown_dimensions_follow_the_known_ones():
+    schema = ColumnSchema(['How rare was Xr2?', 'How good was Q2?', 'How easy was E2?', 'How fast was Fa2?'])
+
+    assert schema.dimensions == ['E', 'Q', 'Xr', 'Fa']
+    assert schema.groups == [(2, 'E'), (2, 'Q'), (2, 'Xr'), (2, 'Fa')]
+    assert schema.group_labels == ['2-E', '2-Q', '2-Xr', '2-Fa']
+
+
+def test_text_without_a_code_is_a_general_question():
+    schema = ColumnSchema(['Timestamp', 'Overall satisfaction', 'Any COVID19 impact?', 'Which team are you in?',
+                           'How easy was task E3_1?', 'How easy was task E3-2?'])
+
+    assert schema.general_columns == ['Overall satisfaction', 'Any COVID19 impact?', 'Which team are you in?']
+    assert schema.score_columns == ['How easy was task E3_1?', 'How easy was task E3-2?']
+    assert schema.group_columns(4, 'E') == []
+
+
+def test_groups_cover_the_full_grid():
+    schema = ColumnSchema(['E1', 'Q1', 'E3'])
+
+    assert schema.groups == [(1, 'E'), (1, 'Q'), (3, 'E'), (3, 'Q')]
+    assert schema.group_means(np.array([2.0, 4.0, 6.0])).tolist()[:3] == [2.0, 4.0, 6.0]
+    assert np.isnan(schema.group_means(np.array([2.0, 4.0, 6.0]))[3])
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import gaussian_kde
+
+from data_processing_API import SurveyDataProcessor
+from densities import GRIDSIZE, violin_summary
+from synthetic import generate_survey_frame
+
+
+def expanded_scores(df, schema):
+    # The individual scores of every task/dimension, as a long-form violin plot would draw them
+    for label, (task, dimension) in zip(schema.group_labels, schema.groups):
+        scores = df[schema.group_columns(task, dimension)].to_numpy(dtype=np.float64).ravel()
+        yield label, scores[~np.isnan(scores)]
+
+
+def assert_matches_expanded(summary, groups):
+    for label, scores in groups:
+        rows = summary[summary['Task-Dimension'] == label]
+        assert len(rows) == GRIDSIZE
+        assert (rows['Count'] == len(scores)).all()
+        np.testing.assert_allclose(rows['Density'], gaussian_kde(scores)(rows['Score']), rtol=1e-10)
+        quartiles = np.percentile(scores, [25, 50, 75])
+        np.testing.assert_allclose(rows[['Q1', 'Median', 'Q3']].iloc[0], quartiles)
+
+
+def test_densities_from_value_counts_match_gaussian_kde():
+    df = generate_survey_frame(n_respondents=120, n_tasks=2, questions_per_group=2, missing_rate=0.2, seed=11)
+    processor = SurveyDataProcessor.from_dataframe('Survey', df)
+    schema = processor.schema
+
+    summary = processor.prepare_violin_densities()
+    assert_matches_expanded(summary, expanded_scores(df, schema))
+
+
+def test_binned_scores_keep_the_quartiles_and_bandwidth_close():
+    rng = np.random.default_rng(5)
+    scores = rng.normal(4.0, 1.5, size=2000)
+    data = pd.DataFrame({'Survey': 'Survey', 'Task-Dimension': 'T1-E', 'Score': scores})
+
+    summary = violin_summary(data)
+    # Fractional scores are binned, so the estimate only approximates the KDE over the raw scores
+    np.testing.assert_allclose(summary['Density'], gaussian_kde(scores)(summary['Score']), atol=2e-3)
+    np.testing.assert_allclose(summary[['Q1', 'Median', 'Q3']].iloc[0], np.percentile(scores, [25, 50, 75]),
+                               atol=0.05)
+
+
+def test_group_with_a_single_distinct_score_is_flat():
+    data = pd.DataFrame({'Survey': 'Survey', 'Task-Dimension': ['T1-E'] * 3 + ['T1-Q'] * 2,
+                         'Score': [4.0, 4.0, 4.0, 2.0, 6.0]})
+    summary = violin_summary(data)
+
+    flat = summary[summary['Task-Dimension'] == 'T1-E']
+    assert (flat['Score'] == 4.0).all() and (flat['Density'] == 1.0).all()
+    spread = summary[summary['Task-Dimension'] == 'T1-Q']
+    np.testing.assert_allclose(spread['Density'], gaussian_kde([2.0, 6.0])(spread['Score']), rtol=1e-10)
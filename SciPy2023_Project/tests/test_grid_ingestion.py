@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from data_processing_API import SurveyDataProcessor
+from survey_storage import NumpyStore, columnar_frame, grid_frame
+
+from fake_sheets import FakeClient, FakeSpreadsheet, FakeWorksheet
+
+
+HEADER = ['Timestamp', 'How easy was E1?', 'How good was Q1?', 'Which team are you in?', 'How easy was E2?',
+          'Overall satisfaction', 'Any comments?']
+ROWS = [
+    ['2023-01-01 10:00:00', '4', '5', 'Sales', '3', '6', 'Great'],
+    ['2023-01-02 11:30:00', '2', '', 'Ops', '7', '5'],
+    ['2023-01-03 09:15:00', '', '6', '', '', '4', ''],
+    ['2023-01-04 16:45:00', '7', '1', 'Sales'],
+    ['2023-01-05 08:00:00', '5', '5', 'IT', '2', '3', 'More training'],
+]
+
+
+def fetch(tmp_path, values, column_batch=None):
+    worksheet = FakeWorksheet(values)
+    processor = SurveyDataProcessor('Survey', store=NumpyStore(str(tmp_path / 'cache')),
+                                    client=FakeClient(FakeSpreadsheet(worksheet, last_update='r1')))
+    processor.COLUMN_BATCH = column_batch
+    return processor.df, worksheet
+
+
+def records_frame(values):
+    """The survey data as the former `get_all_records` path built it."""
+    return columnar_frame(pd.DataFrame(FakeWorksheet(values).get_all_records()))
+
+
+def test_ragged_rows_are_padded_with_missing_answers():
+    df = grid_frame(HEADER, ROWS)
+
+    assert list(df.columns) == HEADER
+    assert len(df) == len(ROWS)
+    assert df['How easy was E2?'].isna().tolist() == [False, False, True, True, False]
+    assert df['Any comments?'].isna().tolist() == [False, True, True, True, False]
+    assert str(df['How easy was E1?'].dtype) == 'Int8'
+    assert df['Timestamp'].dtype.kind == 'M'
+    assert isinstance(df['Which team are you in?'].dtype, pd.CategoricalDtype)
+
+
+def test_cells_beyond_the_header_are_ignored():
+    df = grid_frame(['How easy was E1?', 'How good was Q1?'], [['1', '2', 'extra'], ['3']])
+    assert df['How easy was E1?'].tolist() == [1, 3]
+    assert df['How good was Q1?'].isna().tolist() == [False, True]
+
+
+def test_duplicate_header_is_rejected():
+    with pytest.raises(ValueError):
+        grid_frame(['How easy was E1?', 'How easy was E1?'], [['1', '2']])
+
+
+@pytest.mark.parametrize('column_batch', [None, 1, 2, 3, 7, 10])
+def test_grid_matches_records_path(tmp_path, column_batch):
+    values = [HEADER] + ROWS
+    df, _ = fetch(tmp_path, values, column_batch)
+    pd.testing.assert_frame_equal(df, records_frame([HEADER] + [row + [''] * (len(HEADER) - len(row))
+                                                               for row in ROWS]))
+
+
+def test_column_blocks_follow_the_batch_width(tmp_path):
+    _, worksheet = fetch(tmp_path, [HEADER] + ROWS, column_batch=3)
+    assert ('batch_get', ('A2:C', 'D2:F', 'G2:G')) in worksheet.calls
+    assert ('get_all_values', None) not in worksheet.calls
+
+
+def test_blocks_with_different_lengths_are_aligned(tmp_path):
+    # The last rows only answer the first questions, so the API returns a shorter block for the others
+    rows = ROWS + [['2023-01-06 12:00:00', '3'], ['2023-01-07 12:00:00', '6']]
+    df, _ = fetch(tmp_path, [HEADER] + rows, column_batch=2)
+
+    assert len(df) == len(rows)
+    assert df['How easy was E1?'].tolist()[-2:] == [3, 6]
+    assert df['Overall satisfaction'].isna().tolist()[-2:] == [True, True]
+    pd.testing.assert_frame_equal(df, grid_frame(HEADER, rows))
+
+
+def test_duplicate_header_in_the_sheet_is_rejected(tmp_path):
+    header = HEADER[:2] + [HEADER[1]]
+    with pytest.raises(ValueError):
+        fetch(tmp_path, [header] + [row[:3] for row in ROWS], column_batch=2)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing_API import SurveyDataProcessor
+from prioritization import PrioritizationSensitivity, weighted_dimensions
+
+
+def make_processor():
+    # Task 2 has no Q question, so there is no (2, Q) average
+    df = pd.DataFrame({
+        'Timestamp': ['2023-01-01 10:00:00', '2023-01-02 10:00:00'],
+        'How easy was E1?': [4, 6],
+        'How good was Q1?': [6, 2],
+        'How easy was E2?': [2, 4],
+    })
+    return SurveyDataProcessor.from_dataframe('Survey', df)
+
+
+def test_zero_weights_are_left_out():
+    assert weighted_dimensions({'E': 0.5, 'Q': 0, 'X': 0.0}, ['E', 'Q']) == ['E']
+
+
+def test_zero_weight_for_a_missing_average_keeps_the_score():
+    processor = make_processor()
+    averages = processor.calculate_averages()
+    scores = processor.compute_prioritization_scores(averages, {'E': 1, 'Q': 0, 'X': 0})
+
+    assert scores['Prioritization Score'].tolist() == pytest.approx([-1.0, -0.6])
+    assert processor.compute_prioritization_scores(averages, {'E': 1}).equals(scores)
+
+
+def test_weighted_missing_average_is_still_missing():
+    processor = make_processor()
+    scores = processor.compute_prioritization_scores(processor.calculate_averages(), {'E': 1, 'Q': 1})
+    assert scores['Prioritization Score'].tolist()[0] == pytest.approx(-1.8)
+    assert np.isnan(scores['Prioritization Score'].tolist()[1])
+
+
+@pytest.mark.parametrize('weights', [{'E': 1, 'X': 0.5}, {'X': 1}])
+def test_unknown_weighted_dimension_is_rejected(weights):
+    processor = make_processor()
+    with pytest.raises(ValueError, match='X'):
+        processor.compute_prioritization_scores(processor.calculate_averages(), weights)
+    with pytest.raises(ValueError, match='X'):
+        processor.bootstrap_prioritization_scores(weights, n_replicates=10, seed=0)
+
+
+def test_bootstrap_scores_ignore_zero_weights():
+    processor = make_processor()
+    scores = processor.bootstrap_prioritization_scores({'E': 1, 'X': 0}, n_replicates=50, seed=0)
+    assert not scores[['Prioritization Score', 'Lower', 'Upper']].isna().any().any()
+
+
+def test_sensitivity_rejects_unknown_dimensions():
+    averages = make_processor().calculate_averages()
+    with pytest.raises(ValueError, match='X'):
+        PrioritizationSensitivity(averages, ['E', 'X'])
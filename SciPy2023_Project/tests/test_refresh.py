@@ -0,0 +1,154 @@
+import pandas as pd
+import pytest
+
+from data_processing_API import SurveyDataProcessor
+from survey_storage import NumpyStore
+
+from fake_sheets import FakeClient, FakeSpreadsheet, FakeWorksheet
+
+
+HEADER = ['Timestamp', 'How easy was E1?', 'How good was Q1?', 'How easy was E2?', 'Overall satisfaction']
+
+
+def response(i):
+    return [f'2023-01-01 10:{i // 60:02d}:{i % 60:02d}', str(i % 7 + 1), str((3 * i) % 7 + 1),
+            '' if i % 5 == 0 else str((5 * i) % 7 + 1), str(i % 3 + 2)]
+
+
+def make_processor(tmp_path, n_rows, spreadsheet=None):
+    worksheet = FakeWorksheet([HEADER] + [response(i) for i in range(n_rows)])
+    spreadsheet = spreadsheet or FakeSpreadsheet(worksheet)
+    spreadsheet.worksheet = worksheet
+    store = NumpyStore(str(tmp_path / 'cache'))
+    processor = SurveyDataProcessor('Survey', store=store, client=FakeClient(spreadsheet))
+    return processor.load(), worksheet, store
+
+
+def expected_averages(worksheet):
+    return SurveyDataProcessor.from_dataframe('Expected', pd.DataFrame(
+        worksheet.values[1:], columns=worksheet.values[0])).calculate_averages()
+
+
+def test_refresh_appends_only_new_rows(tmp_path):
+    processor, worksheet, store = make_processor(tmp_path, 20)
+    processor.calculate_averages()
+    worksheet.values += [response(i) for i in range(20, 23)]
+    worksheet.calls.clear()
+
+    assert processor.refresh() == 3
+
+    # Only the header and the rows from the last ingested one on are downloaded, and the row count of the
+    # revision comes from them instead of another download
+    assert worksheet.calls == [('batch_get', ('1:1', 'A21:E'))]
+    assert [segment['rows'] for segment in store._segments('Survey')] == [20, 3]
+    pd.testing.assert_frame_equal(processor.calculate_averages(), expected_averages(worksheet))
+    assert len(processor.df) == 23
+
+
+def test_refreshed_copy_is_reused(tmp_path):
+    processor, worksheet, store = make_processor(tmp_path, 4)
+    segment_rows = []
+    n_rows = 4
+    for batch in (2, 1, 2, 1):
+        worksheet.values += [response(i) for i in range(n_rows, n_rows + batch)]
+        n_rows += batch
+        processor.refresh()
+        segment_rows.append([segment['rows'] for segment in store._segments('Survey')])
+
+    # The appended segments are merged into a new full copy once they hold as many rows as it
+    assert segment_rows == [[4, 2], [4, 2, 1], [9], [9, 1]]
+
+    worksheet.calls.clear()
+    reloaded = SurveyDataProcessor('Survey', store=store, client=FakeClient(FakeSpreadsheet(worksheet))).load()
+    assert ('get_all_values', None) not in worksheet.calls
+    assert len(reloaded.df) == 10
+    pd.testing.assert_frame_equal(reloaded.df, processor.df)
+    pd.testing.assert_frame_equal(reloaded.calculate_averages(), expected_averages(worksheet))
+
+
+def test_refresh_of_unchanged_sheet_is_a_no_op(tmp_path):
+    processor, worksheet, store = make_processor(tmp_path, 10)
+    averages = processor.calculate_averages()
+    segments = store._segments('Survey')
+
+    assert processor.refresh() == 0
+
+    assert store._segments('Survey') == segments
+    pd.testing.assert_frame_equal(processor.calculate_averages(), averages)
+
+
+def test_changed_header_fetches_the_whole_sheet(tmp_path):
+    processor, worksheet, store = make_processor(tmp_path, 10)
+    processor.calculate_averages()
+    worksheet.values[0] = HEADER + ['How good was Q2?']
+    for row in worksheet.values[1:]:
+        row.append('6')
+    worksheet.values.append(response(10) + ['2'])
+
+    assert processor.refresh() == 11
+
+    assert ('get_all_values', None) in worksheet.calls
+    assert list(processor.df.columns) == HEADER + ['How good was Q2?']
+    assert processor.TASKS == [1, 2]
+    pd.testing.assert_frame_equal(processor.calculate_averages(), expected_averages(worksheet))
+
+
+def test_edited_last_row_fetches_the_whole_sheet(tmp_path):
+    processor, worksheet, store = make_processor(tmp_path, 10)
+    worksheet.values[10][0] = '2024-05-05 09:00:00'
+
+    assert processor.refresh() == 10
+    assert processor.df['Timestamp'].iloc[-1] == pd.Timestamp('2024-05-05 09:00:00')
+
+
+def test_edited_answer_in_last_row_fetches_the_whole_sheet(tmp_path):
+    processor, worksheet, store = make_processor(tmp_path, 10)
+    worksheet.values[10][2] = '1' if worksheet.values[10][2] != '1' else '2'
+
+    assert processor.refresh() == 10
+    pd.testing.assert_frame_equal(processor.calculate_averages(), expected_averages(worksheet))
+
+
+def test_edited_earlier_row_fetches_the_whole_sheet(tmp_path):
+    spreadsheet = FakeSpreadsheet(None, last_update='2023-01-01T12:00:00Z')
+    processor, worksheet, store = make_processor(tmp_path, 10, spreadsheet)
+    processor.calculate_averages()
+    assert processor.refresh() == 0
+
+    # The edit only shows in the sheet's update time
+    worksheet.values[3][1] = '7' if worksheet.values[3][1] != '7' else '1'
+    spreadsheet.lastUpdateTime = '2023-01-01T12:05:00Z'
+    worksheet.calls.clear()
+
+    assert processor.refresh() == 10
+    assert ('get_all_values', None) in worksheet.calls
+    assert processor.revision == '2023-01-01T12:05:00Z'
+    pd.testing.assert_frame_equal(processor.calculate_averages(), expected_averages(worksheet))
+
+
+def test_copy_with_appended_rows_is_not_trusted_by_a_new_session(tmp_path):
+    spreadsheet = FakeSpreadsheet(None, last_update='2023-01-01T12:00:00Z')
+    processor, worksheet, store = make_processor(tmp_path, 10, spreadsheet)
+
+    # An earlier row is edited in the same interval as new responses arrive, which refresh() cannot see
+    worksheet.values[3][1] = '7' if worksheet.values[3][1] != '7' else '1'
+    worksheet.values += [response(i) for i in range(10, 12)]
+    spreadsheet.lastUpdateTime = '2023-01-01T12:05:00Z'
+    assert processor.refresh() == 2
+    assert store.revision('Survey') != '2023-01-01T12:05:00Z'
+
+    # Without further changes, the next refresh is still a no-op
+    assert processor.refresh() == 0
+
+    # A new session does not take the appended copy for the sheet's current revision
+    worksheet.calls.clear()
+    reloaded = SurveyDataProcessor('Survey', store=store, client=FakeClient(spreadsheet)).load()
+    assert ('get_all_values', None) in worksheet.calls
+    assert reloaded.revision == '2023-01-01T12:05:00Z'
+    pd.testing.assert_frame_equal(reloaded.calculate_averages(), expected_averages(worksheet))
+
+
+def test_refresh_in_offline_mode_fails():
+    processor = SurveyDataProcessor.from_dataframe('Survey', pd.DataFrame({'How easy was E1?': [1]}))
+    with pytest.raises(RuntimeError):
+        processor.refresh()
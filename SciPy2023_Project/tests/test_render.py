@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_process_pool_renders_under_spawn(tmp_path):
+    # Spawned workers import the script that started them again, as `python main.py` is imported in each
+    # worker; importing `main` must therefore not run the pipeline
+    script = tmp_path / 'render_spawn.py'
+    script.write_text(textwrap.dedent(f'''
+        import multiprocessing
+        import sys
+
+        sys.path.insert(0, {PROJECT_DIR!r})
+
+        import main  # noqa: F401
+        import pandas as pd
+        from data_processing_API import SurveyDataProcessor
+        from render import FigureJob, render_figures
+
+        if __name__ == '__main__':
+            multiprocessing.set_start_method('spawn')
+            processor = SurveyDataProcessor.from_dataframe('Survey', pd.DataFrame({{
+                'Timestamp': ['2023-01-01 10:00:00', '2023-01-02 10:00:00'],
+                'How easy was E1?': [4, 6],
+                'How good was Q1?': [6, 2],
+                'How easy was E2?': [2, 4],
+            }}))
+            averages = processor.calculate_averages()
+            jobs = [FigureJob('heatmap', 'create_heatmap', averages),
+                    FigureJob('line_graphs', 'create_line_graphs', averages, processor.TASKS)]
+            outputs = render_figures(jobs, {str(tmp_path / 'figures')!r}, max_workers=2)
+            print(sorted(outputs))
+    '''))
+
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=300)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "['heatmap', 'line_graphs']"
+    assert (tmp_path / 'figures' / 'heatmap.png').stat().st_size > 0
+    assert (tmp_path / 'figures' / 'line_graphs.png').stat().st_size > 0
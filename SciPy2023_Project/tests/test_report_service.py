@@ -0,0 +1,63 @@
+import pandas as pd
+
+from data_processing_API import SurveyDataProcessor
+from report_service import ReportService, data_revision, parse_request
+from survey_storage import NumpyStore, grid_frame
+
+from fake_sheets import FakeClient, FakeSpreadsheet, FakeWorksheet
+
+
+HEADER = ['Timestamp', 'How easy was E1?', 'How good was Q1?', 'Overall satisfaction']
+ROWS = [['2023-01-01 10:00:00', '4', '6', '5'], ['2023-01-02 10:00:00', '6', '2', '3']]
+NEW_ROWS = [['2023-01-03 10:00:00', '1', '1', '1']]
+AVERAGES = parse_request('/surveys/Survey/averages')
+
+
+def test_polling_follows_the_sheet_revision(tmp_path):
+    worksheet = FakeWorksheet([HEADER] + ROWS)
+    spreadsheet = FakeSpreadsheet(worksheet, last_update='2023-01-02T10:00:00Z')
+    processor = SurveyDataProcessor('Survey', store=NumpyStore(str(tmp_path)), client=FakeClient(spreadsheet))
+    service = ReportService([processor.load()])
+    try:
+        assert service.revisions == {'Survey': '2023-01-02T10:00:00Z'}
+        first = service.get(AVERAGES)
+
+        # Without new responses the cached results stay valid
+        assert service.refresh() == []
+        assert service.get(AVERAGES) is first
+
+        worksheet.values += NEW_ROWS
+        spreadsheet.lastUpdateTime = '2023-01-03T10:00:00Z'
+        assert service.refresh() == ['Survey']
+        revision, _, body = service.get(AVERAGES)
+        assert revision == '2023-01-03T10:00:00Z-appended'
+        assert body != first[2]
+    finally:
+        service.close()
+
+
+def test_offline_copy_is_read_again_only_when_its_revision_changes(tmp_path, monkeypatch):
+    store = NumpyStore(str(tmp_path))
+    store.save('Survey', 'r1', grid_frame(HEADER, ROWS))
+    service = ReportService([SurveyDataProcessor('Survey', store=store, offline=True).load()])
+    reads = []
+    latest = store.latest
+    monkeypatch.setattr(store, 'latest', lambda name: reads.append(name) or latest(name))
+    try:
+        assert service.revisions == {'Survey': 'r1'}
+        assert service.refresh() == []
+        assert reads == []
+
+        store.append('Survey', 'r2', grid_frame(HEADER, NEW_ROWS))
+        assert service.refresh() == ['Survey']
+        assert reads == ['Survey']
+        assert service.revisions == {'Survey': 'r2'}
+        assert len(service.processors['Survey'].df) == 3
+    finally:
+        service.close()
+
+
+def test_in_memory_data_is_identified_by_its_size():
+    processor = SurveyDataProcessor.from_dataframe('Survey', pd.DataFrame(ROWS, columns=HEADER))
+    assert processor.revision is None
+    assert data_revision(processor) == 'rows-2'
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from data_processing_API import SurveyDataProcessor
+
+
+def make_processor():
+    df = pd.DataFrame({
+        'Timestamp': ['2023-01-01 10:00:00', '2023-01-02 10:00:00'],
+        'How easy was E1?': [4, 4],
+        'How good was Q1?': [6, 2],
+        'Overall satisfaction': [5, 3],
+    })
+    return SurveyDataProcessor.from_dataframe('Survey', df)
+
+
+def test_cached_results_are_reused():
+    processor = make_processor()
+    first = processor.calculate_averages()
+    first['Average'] = 0
+    assert processor.calculate_averages()['Average'].tolist() == [4.0, 4.0]
+
+
+def test_clear_results_after_in_place_edit():
+    processor = make_processor()
+    assert processor.calculate_averages()['Average'].iloc[0] == 4.0
+
+    processor.df.loc[:, 'How easy was E1?'] = 1
+    processor.clear_results()
+
+    assert processor.calculate_averages()['Average'].iloc[0] == 1.0
+
+
+def test_replacing_df_drops_cached_results():
+    processor = make_processor()
+    processor.calculate_averages()
+    df = processor.df.copy()
+    df['How good was Q1?'] = pd.array([7, 7], dtype='Int8')
+    processor.df = df
+    assert processor.calculate_averages()['Average'].tolist() == [4.0, 7.0]
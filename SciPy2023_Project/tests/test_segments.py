@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from data_processing_API import SurveyDataProcessor
+from synthetic import generate_survey_frame
+
+
+def survey_with_teams():
+    df = generate_survey_frame(n_respondents=60, n_tasks=2, n_general=2, missing_rate=0.2, seed=13)
+    df['Team'] = np.where(np.arange(len(df)) % 3 == 0, 'Backend', 'Frontend')
+    df['Comments'] = ''
+    df.loc[::4, 'Comments'] = 'More coffee'
+    return df
+
+
+def test_segment_cube_leaves_out_free_text_columns():
+    df = survey_with_teams()
+    processor = SurveyDataProcessor.from_dataframe('Survey', df)
+    cube = processor.segment_cube(by=['Team'])
+
+    overall = cube.general_averages()
+    assert 'Team' not in overall.index and 'Comments' not in overall.index
+    pd.testing.assert_series_equal(overall, processor.calculate_general_averages().dropna(), check_names=False)
+
+
+def test_segment_general_averages_match_the_filtered_frame():
+    df = survey_with_teams()
+    cube = SurveyDataProcessor.from_dataframe('Survey', df).segment_cube(by=['Team'])
+
+    per_team = cube.general_averages(by=['Team'])
+    assert not per_team.isna().any().any()
+    for team, rows in df.groupby('Team'):
+        expected = SurveyDataProcessor.from_dataframe('Survey', rows.reset_index(drop=True))
+        np.testing.assert_allclose(per_team.loc[(team,)], expected.calculate_general_averages()[per_team.columns])
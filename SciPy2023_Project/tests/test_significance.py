@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from scipy.stats import mannwhitneyu
+
+from significance import mann_whitney
+
+
+def test_mann_whitney_matches_scipy():
+    rng = np.random.default_rng(0)
+    earlier = rng.integers(1, 8, size=(40, 3)).astype(np.float64)
+    later = rng.integers(2, 8, size=(30, 3)).astype(np.float64)
+    earlier[::7, 1] = np.nan
+    later[:, 2] = np.nan
+
+    u, p_values, _ = mann_whitney(earlier, later)
+
+    for column in range(2):
+        a, b = earlier[:, column], later[:, column]
+        expected = mannwhitneyu(b[~np.isnan(b)], a[~np.isnan(a)], method='asymptotic')
+        assert u[column] == pytest.approx(expected.statistic)
+        assert p_values[column] == pytest.approx(expected.pvalue)
+    assert np.isnan(u[2]) and np.isnan(p_values[2])
@@ -0,0 +1,76 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from survey_storage import CSVExportStore, FeatherStore, NumpyStore, ParquetStore, default_store, grid_frame
+
+
+def survey(*scores):
+    return grid_frame(['How easy was E1?'], [[str(score)] for score in scores])
+
+
+@pytest.mark.parametrize('store_class', [NumpyStore, FeatherStore, ParquetStore])
+def test_similar_names_keep_separate_entries(tmp_path, store_class):
+    store = store_class(str(tmp_path))
+    store.save('Survey (v2)', 'r1', survey(1, 2))
+    store.save('Survey v2', 'r1', survey(7))
+
+    assert store.load('Survey (v2)', 'r1')['How easy was E1?'].tolist() == [1, 2]
+    assert store.load('Survey v2', 'r1')['How easy was E1?'].tolist() == [7]
+
+    store.append('Survey v2', 'r2', survey(6))
+    store.evict('Survey (v2)')
+    assert store.latest('Survey (v2)') is None
+    assert store.load('Survey v2', 'r2')['How easy was E1?'].tolist() == [7, 6]
+
+
+def test_default_store_is_uncompressed(tmp_path, monkeypatch):
+    assert type(default_store(str(tmp_path))) is FeatherStore
+
+    # Without pyarrow the NumPy files are the only option
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    assert type(default_store(str(tmp_path))) is NumpyStore
+
+
+def test_round_trip_keeps_the_column_types(tmp_path):
+    df = grid_frame(['Timestamp', 'How easy was E1?', 'Which team are you in?'],
+                    [['2023-01-01 10:00:00', '4', 'Sales'], ['2023-01-02 11:30:00', '', 'Ops']])
+    store = default_store(str(tmp_path))
+    store.save('Survey', 'r1', df)
+    pd.testing.assert_frame_equal(store.load('Survey', 'r1'), df)
+
+
+def test_folder_is_created_on_first_save(tmp_path):
+    store = NumpyStore(str(tmp_path / 'cache'))
+    assert store.latest('Survey') is None
+    assert not (tmp_path / 'cache').exists()
+
+    store.save('Survey', 'r1', survey(1))
+    assert store.latest('Survey')['How easy was E1?'].tolist() == [1]
+
+
+def test_numpy_copies_can_be_edited_in_place(tmp_path):
+    df = grid_frame(['Timestamp', 'How easy was E1?', 'Which team are you in?', 'Overall satisfaction'],
+                    [['2023-01-01 10:00:00', '4', 'Sales', '1.5'], ['2023-01-02 11:30:00', '', 'Ops', '2.5']])
+    store = NumpyStore(str(tmp_path))
+    store.save('Survey', 'r1', df)
+
+    loaded = store.load('Survey', 'r1')
+    loaded.loc[0, 'How easy was E1?'] = 3
+    loaded.loc[0, 'Which team are you in?'] = 'Ops'
+    loaded.loc[1, 'Overall satisfaction'] = 9.5
+    assert loaded.iloc[0].tolist()[1:3] == [3, 'Ops']
+
+    # The edits stay in memory
+    pd.testing.assert_frame_equal(store.load('Survey', 'r1'), df)
+
+
+def test_csv_exports_are_never_written(tmp_path):
+    (tmp_path / 'Survey.csv').write_text('Timestamp,How easy was E1?\n2023-01-01 10:00:00,4\n')
+    store = CSVExportStore(str(tmp_path))
+
+    assert not store.append('Survey', 'r2', survey(5))
+    store.save('Survey', 'r2', survey(5))
+    assert store.latest('Survey')['How easy was E1?'].tolist() == [4]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['Survey.csv']
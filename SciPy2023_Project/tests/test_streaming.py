@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing_API import SurveyDataProcessor
+from streaming import StreamingAggregate, aggregate_chunks
+from survey_aggregates import ScoreAccumulator
+from synthetic import generate_survey_frame
+
+# Chunk boundaries with an empty chunk, single-row chunks and uneven sizes
+BOUNDARIES = [0, 0, 1, 2, 40, 41, 97, 150]
+
+
+def chunks(df):
+    return [df.iloc[start:stop] for start, stop in zip(BOUNDARIES[:-1], BOUNDARIES[1:])]
+
+
+def test_merged_accumulators_match_the_full_matrix():
+    rng = np.random.default_rng(3)
+    scores = rng.integers(1, 8, size=(150, 6)).astype(np.float64)
+    scores[rng.random(scores.shape) < 0.2] = np.nan
+    # One column is only answered in a single row, one never
+    scores[:, 4] = np.nan
+    scores[60, 4] = 5.0
+    scores[:, 5] = np.nan
+
+    merged = ScoreAccumulator(scores.shape[1])
+    for start, stop in zip(BOUNDARIES[:-1], BOUNDARIES[1:]):
+        merged.merge(ScoreAccumulator.from_scores(scores[start:stop]))
+
+    full = pd.DataFrame(scores)
+    np.testing.assert_array_equal(merged.count, full.count().to_numpy())
+    np.testing.assert_allclose(merged.means(), full.mean().to_numpy(), equal_nan=True)
+    np.testing.assert_allclose(merged.variances(), full.var().to_numpy(), equal_nan=True)
+    np.testing.assert_allclose(merged.variances(ddof=0), full.var(ddof=0).to_numpy(), equal_nan=True)
+
+
+def test_merging_into_an_empty_accumulator_keeps_the_statistics():
+    scores = np.array([[1.0, np.nan], [4.0, 2.0], [7.0, np.nan]])
+    merged = ScoreAccumulator(2)
+    merged.merge(ScoreAccumulator.from_scores(scores))
+    merged.merge(ScoreAccumulator(2))
+
+    reference = ScoreAccumulator.from_scores(scores)
+    np.testing.assert_array_equal(merged.count, reference.count)
+    np.testing.assert_allclose(merged.means(), [4.0, 2.0])
+    np.testing.assert_allclose(merged.variances(), [9.0, np.nan], equal_nan=True)
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_chunked_aggregate_matches_the_processor(parallel):
+    df = generate_survey_frame(n_respondents=150, n_tasks=3, questions_per_group=2, missing_rate=0.3, seed=7)
+    processor = SurveyDataProcessor.from_dataframe('Survey', df)
+
+    if parallel:
+        # Every chunk aggregated on its own, as by the workers of `aggregate_files`, then merged
+        aggregate = StreamingAggregate(df.columns)
+        for chunk in chunks(df):
+            part = StreamingAggregate(df.columns)
+            part.update(chunk)
+            aggregate.merge(part)
+    else:
+        aggregate = aggregate_chunks(chunks(df))
+
+    assert aggregate.n_rows == len(df)
+    pd.testing.assert_frame_equal(aggregate.calculate_averages(), processor.calculate_averages())
+    pd.testing.assert_series_equal(aggregate.calculate_general_averages(), processor.calculate_general_averages())
+
+    summary = aggregate.column_summary().set_index('Column')
+    columns = summary.index.tolist()
+    np.testing.assert_allclose(summary['Std'].to_numpy(), df[columns].astype(float).std().to_numpy())
+    np.testing.assert_array_equal(summary['Count'].to_numpy(), df[columns].count().to_numpy())
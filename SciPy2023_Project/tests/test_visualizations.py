@@ -0,0 +1,14 @@
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from visualizations import plot_task_specific_scores
+
+
+def test_task_ticks_use_the_task_ids():
+    averages = pd.DataFrame({'Task': [2, 2, 5, 5], 'Dimension': ['E', 'Q', 'E', 'Q'], 'Average': [4.0, 5.0, 3.0, 6.0]})
+    fig = plot_task_specific_scores(averages, averages, [2, 5], ['E', 'Q'], show=False)
+    try:
+        labels = [label.get_text() for label in fig.axes[0].get_xticklabels()]
+    finally:
+        plt.close(fig)
+    assert labels == ['E2', 'Q2', 'E5', 'Q5']
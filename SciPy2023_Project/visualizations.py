@@ -3,7 +3,9 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import textwrap
 import seaborn as sns
-from data_processing_API import SurveyDataProcessor
+
+from densities import violin_summary
+from instrumentation import instrumented, span
 
 # Set global style for all plots
 sns.set_style("whitegrid")
@@ -12,7 +14,31 @@ sns.set_style("whitegrid")
 color_palette = sns.color_palette("muted") # Colour palette 
 
 
-def create_grouped_bar_charts(averages, dimensions, tasks):
+def _error_bars(intervals, values, value_column, keys):
+    """
+    Converts confidence intervals into the (2 × n) error bar lengths expected by matplotlib.
+    
+    Parameters:
+    - intervals (DataFrame or None): Intervals with the `keys` columns plus 'Lower' and 'Upper'.
+    - values (DataFrame): The plotted values, with the `keys` columns and `value_column`, in plotting order.
+    - value_column (str): The column holding the plotted values.
+    - keys (list): Columns that identify a bar.
+    
+    Returns:
+    ndarray or None: Distances from each value down to its lower and up to its upper bound, or None without intervals.
+    """
+    if intervals is None:
+        return None
+    bounds = values[keys].merge(intervals[keys + ['Lower', 'Upper']], on=keys, how='left')
+    plotted = values[value_column].to_numpy(dtype=float)
+    return np.vstack([
+        plotted - bounds['Lower'].to_numpy(dtype=float),
+        bounds['Upper'].to_numpy(dtype=float) - plotted
+    ]).clip(min=0)
+
+
+@instrumented('plot.create_grouped_bar_charts')
+def create_grouped_bar_charts(averages, dimensions, tasks, show=True):
     """
     Creates grouped bar charts to visualize average scores for each dimension across different tasks.
     
@@ -20,9 +46,10 @@ def create_grouped_bar_charts(averages, dimensions, tasks):
     - averages (DataFrame): The average scores for each task and dimension.
     - dimensions (list): A list of dimension identifiers.
     - tasks (list): A list of task identifiers.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
     
     Returns:
-    None
+    Figure: The matplotlib figure.
     """
     # Define the width of each bar in the bar chart
     width = 0.8 / len(dimensions) 
@@ -34,49 +61,61 @@ def create_grouped_bar_charts(averages, dimensions, tasks):
         ax.bar(dimension_df['Task'] + i * width - width*(len(dimensions)-1)/2, dimension_df['Average'], width, label=dimension, color=color_palette[i % len(color_palette)])
 
     # Set x-axis ticks and labels
-    ax.set_xticks(np.arange(1, len(tasks) + 1))
+    ax.set_xticks(tasks)
     ax.set_xticklabels([f'Task {i}' for i in tasks])
     ax.set_ylim(0, 7)
     ax.set_title('Average Scores')
     ax.set_xlabel('Task')
     ax.set_ylabel('Average Score')
     ax.legend()
-    plt.show()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
 
-def create_heatmap(averages):
+@instrumented('plot.create_heatmap')
+def create_heatmap(averages, show=True):
     """
     Creates a heatmap to visualize average scores across dimensions and tasks.
     
     Parameters:
     - averages (DataFrame): The average scores for each task and dimension.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
     
     Returns:
-    None
+    Figure: The matplotlib figure.
     """
     heatmap_data = averages.pivot(index='Dimension', columns='Task', values='Average')
-    plt.figure(figsize=(10, 6))
+    fig = plt.figure(figsize=(10, 6))
     sns.heatmap(heatmap_data, annot=True, cmap='coolwarm')
     plt.title('Heatmap of Average Scores')
-    plt.show()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
 
 
-def create_line_graphs(averages, tasks):
+@instrumented('plot.create_line_graphs')
+def create_line_graphs(averages, tasks, show=True):
     """
     Creates line graphs to visualize average scores for each dimension across different tasks.
     
     Parameters:
     - averages (DataFrame): The average scores for each task and dimension.
     - tasks (list): A list of task identifiers.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
     
     Returns:
-    None
+    Figure: The matplotlib figure.
     """
 
     # Define the y-axis range for the graph
     y_range = [0, 7]
     
-    # Define the desired order for dimensions for a consistent look across graphs
-    ordered_dimensions = ['E', 'Q', 'S', 'P', 'Si']  # Define the desired order
+    # Keep the dimension order of the averages (as discovered from the survey header) for a consistent look across graphs
+    ordered_dimensions = list(dict.fromkeys(averages['Dimension']))
+    
+    fig = plt.figure()
     
     for idx, task in enumerate(tasks):
         task_df = averages[averages['Task'] == task]
@@ -85,7 +124,7 @@ def create_line_graphs(averages, tasks):
         task_df = task_df.set_index('Dimension').loc[ordered_dimensions].reset_index()
         
         # Plot a line for each task with a distinct color and marker
-        plt.plot(task_df['Dimension'], task_df['Average'], marker='o', label=f'Task {task}', color=color_palette[idx])
+        plt.plot(task_df['Dimension'], task_df['Average'], marker='o', label=f'Task {task}', color=color_palette[idx % len(color_palette)])
 
     # Set titles, labels, and other graph properties
     plt.title('Line Graph of Average Scores for Each Dimension')
@@ -94,29 +133,39 @@ def create_line_graphs(averages, tasks):
     plt.ylim(y_range)  
     plt.legend()
     plt.grid(True)
-    plt.show()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
 
 
 
-def plot_prioritization_scores(prioritization_scores):
+@instrumented('plot.plot_prioritization_scores')
+def plot_prioritization_scores(prioritization_scores, intervals=None, show=True):
     """
     Plots a bar graph to visualize the prioritization scores for each task.
     
     Parameters:
     - prioritization_scores (DataFrame): The prioritization scores for each task.
+    - intervals (DataFrame, optional): Confidence intervals with columns 'Task', 'Lower' and 'Upper',
+      e.g. from `SurveyDataProcessor.bootstrap_prioritization_scores`. Drawn as error bars.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
     
     Returns:
-    None
+    Figure: The matplotlib figure.
     """
     
     # Sort the DataFrame by prioritization score in descending order for better visualization
     sorted_prioritization_scores = prioritization_scores.sort_values(by='Prioritization Score', ascending=False)
     
     # Create the bar graph using the sorted data and colors from the global color palette
+    fig = plt.figure()
     plt.bar(
         sorted_prioritization_scores['Task'],
         sorted_prioritization_scores['Prioritization Score'],
-        color=color_palette[:len(sorted_prioritization_scores)]  # use as many colors as the tasks
+        color=color_palette[:len(sorted_prioritization_scores)],  # use as many colors as the tasks
+        yerr=_error_bars(intervals, sorted_prioritization_scores, 'Prioritization Score', ['Task']),
+        capsize=4
     )
     
     # Set graph titles, labels, and other properties
@@ -126,12 +175,16 @@ def plot_prioritization_scores(prioritization_scores):
     plt.ylim(0, 1)  # Set y-axis limits to 0-1
 
     # Assign x-ticks based on the tasks
-    plt.xticks(ticks=[1, 2, 3], labels=sorted_prioritization_scores['Task'])
+    plt.xticks(ticks=sorted_prioritization_scores['Task'], labels=sorted_prioritization_scores['Task'])
 
-    plt.show()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
 
 
-def plot_task_specific_scores(averages1, averages2, tasks, dimensions, width_adjusted=0.35):
+@instrumented('plot.plot_task_specific_scores')
+def plot_task_specific_scores(averages1, averages2, tasks, dimensions, width_adjusted=0.35, intervals1=None, intervals2=None, show=True):
     """
     Plots a grouped bar chart comparing average scores from two different surveys for specific tasks and dimensions.
 
@@ -141,9 +194,13 @@ def plot_task_specific_scores(averages1, averages2, tasks, dimensions, width_adj
     - tasks (list): A list of task identifiers.
     - dimensions (list): A list of dimension identifiers.
     - width_adjusted (float, optional): Adjusted width for the bars in the bar chart. Default is 0.35.
-
+    - intervals1 (DataFrame, optional): Confidence intervals for the first survey with columns 'Task', 'Dimension',
+      'Lower' and 'Upper', e.g. from `SurveyDataProcessor.bootstrap_averages`. Drawn as error bars.
+    - intervals2 (DataFrame, optional): Confidence intervals for the second survey, in the same format.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
+    
     Returns:
-    None
+    Figure: The matplotlib figure.
     """
 
     # Initialize the plot and set its size
@@ -167,18 +224,23 @@ def plot_task_specific_scores(averages1, averages2, tasks, dimensions, width_adj
         # Extract the average scores in the order of the provided dimensions list
         bars1 = task_df1.set_index('Dimension')['Average'].reindex(dimensions).tolist()
         bars2 = task_df2.set_index('Dimension')['Average'].reindex(dimensions).tolist()
+
+        # Extract the matching confidence intervals, if any, as error bar lengths
+        bar_frame = pd.DataFrame({'Task': task, 'Dimension': dimensions})
+        errors1 = _error_bars(intervals1, bar_frame.assign(Average=bars1), 'Average', ['Task', 'Dimension'])
+        errors2 = _error_bars(intervals2, bar_frame.assign(Average=bars2), 'Average', ['Task', 'Dimension'])
         
         # Calculate x-axis positions for the bars based on the current task index
         positions = x + idx * (len(dimensions) + 1)
         bar_positions.extend(positions)
 
         # Plot bars for both surveys side-by-side for easy comparison
-        ax.bar(positions - width_adjusted/2, bars1, width_adjusted, color=color_initial, alpha=0.6, label=f'Initial Survey' if idx == 0 else "")
-        ax.bar(positions + width_adjusted/2, bars2, width_adjusted, color=color_later, alpha=0.6, label=f'Later Survey' if idx == 0 else "")
+        ax.bar(positions - width_adjusted/2, bars1, width_adjusted, color=color_initial, alpha=0.6, label=f'Initial Survey' if idx == 0 else "", yerr=errors1, capsize=3)
+        ax.bar(positions + width_adjusted/2, bars2, width_adjusted, color=color_later, alpha=0.6, label=f'Later Survey' if idx == 0 else "", yerr=errors2, capsize=3)
 
     # Setting properties for x-axis ticks, labels, and graph title
     ax.set_xticks(bar_positions)
-    ax.set_xticklabels([f'{dim}{idx+1}' for idx in range(len(tasks)) for dim in dimensions])
+    ax.set_xticklabels([f'{dim}{task}' for task in tasks for dim in dimensions])
     ax.set_ylim(0, 7)
     ax.set_title(f'Average Scores for Tasks')
     ax.set_xlabel('Dimension')
@@ -189,25 +251,47 @@ def plot_task_specific_scores(averages1, averages2, tasks, dimensions, width_adj
 
     # Adjust the layout for better display
     plt.tight_layout()
-    plt.show()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
 
 
-def plot_general_comparison(processor1, processor2):
+@instrumented('plot.plot_general_comparison')
+def plot_general_comparison(processor1, processor2, show=True):
     """
     Plots a horizontal bar chart comparing average scores for general questions from two different surveys.
     
     Parameters:
     - processor1: An instance of the data processor class for the first survey.
     - processor2: An instance of the data processor class for the second survey.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
 
     Returns:
-    None
+    Figure: The matplotlib figure.
     """
 
     # Calculate average scores for general questions from both surveys using the data processors
     averages_general1 = processor1.calculate_general_averages()
     averages_general2 = processor2.calculate_general_averages()
 
+    return plot_general_averages_comparison(averages_general1, averages_general2, show=show)
+
+
+@instrumented('plot.plot_general_averages_comparison')
+def plot_general_averages_comparison(averages_general1, averages_general2, show=True):
+    """
+    Plots a horizontal bar chart comparing precomputed average scores for general questions from two surveys.
+    
+    Parameters:
+    - averages_general1 (Series): Average scores for the general questions of the first survey.
+    - averages_general2 (Series): Average scores for the general questions of the second survey.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
+
+    Returns:
+    Figure: The matplotlib figure.
+    """
+
     # Construct a DataFrame containing average scores from both surveys, as well as their differences
     df_general_averages = pd.DataFrame({
         'Initial': averages_general1, 
@@ -242,64 +326,180 @@ def plot_general_comparison(processor1, processor2):
     ax.set_title('Comparison of Average Scores for General Questions')
 
     # Display the plot
-    plt.show()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
 
 
-def plot_violin_graph(data1, data2):
+@instrumented('plot.plot_violin_graph')
+def plot_violin_graph(data1, data2, show=True):
     """
     Plots a side-by-side violin graph comparing the distributions of scores for each task and dimension 
     across two surveys. The graphs show the distribution of responses for each combination of task and dimension.
+
+    The scores are first reduced to densities per task and dimension (see `densities.violin_summary`);
+    pass precomputed summaries to `plot_violin_densities` to skip that step.
     
     Parameters:
     - data1 (DataFrame): Data from the first survey. Should have columns 'Task-Dimension', 'Score', and 'Survey'.
     - data2 (DataFrame): Data from the second survey. Should have columns 'Task-Dimension', 'Score', and 'Survey'.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
     
     Returns:
-    None
+    Figure: The matplotlib figure.
     """
+    return plot_violin_densities(violin_summary(data1), violin_summary(data2), show=show)
+
+
+@instrumented('plot.plot_violin_densities')
+def plot_violin_densities(densities1, densities2, show=True):
+    """
+    Plots the split violin graph of two surveys from precomputed densities.
+
+    Each violin shows the first survey on the left and the later survey on the right, with the median as a
+    dashed and the quartiles as dotted lines. Only the compact summaries are drawn, so the cost does not
+    depend on the number of respondents.
     
-    # Update the Survey columns to differentiate the source of data
-    data1['Survey'] = 'Initial Survey'
-    data2['Survey'] = 'Later Survey'
-    
-    # Combine the data from both dataframes into a single dataframe
-    combined_data = pd.concat([data1, data2])
-    
-    # Define the tasks present in the data
-    tasks = [1, 2, 3]
-    
-    # Initialize a figure with 3 subplots (one for each task), sharing the y-axis
-    fig, axs = plt.subplots(1, 3, figsize=(15, 5), sharey=True)
-    
-    # Define a color palette to distinguish between the two surveys
-    hue_palette = {
-        'Initial Survey': color_palette[0],
-        'Later Survey': color_palette[1]
-    }
+    Parameters:
+    - densities1 (DataFrame): Densities of the first survey, e.g. from `SurveyDataProcessor.prepare_violin_densities`.
+    - densities2 (DataFrame): Densities of the later survey, in the same format.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
     
-    # Plot the violin graphs for each task
+    Returns:
+    Figure: The matplotlib figure.
+    """
+    halves = [(densities1, 'Initial Survey', -1, color_palette[0]), (densities2, 'Later Survey', 1, color_palette[1])]
+
+    # Define the tasks present in the data, from the task part of the 'Task-Dimension' labels
+    labels = list(dict.fromkeys(str(label) for densities, _, _, _ in halves
+                                for label in pd.unique(densities['Task-Dimension'])))
+    tasks = list(dict.fromkeys(label.split('-')[0] for label in labels))
+
+    # Initialize a figure with one subplot per task, sharing the y-axis
+    fig, axs = plt.subplots(1, len(tasks), figsize=(5 * len(tasks), 5), sharey=True, squeeze=False)
+    axs = axs[0]
+
+    # Scale every half violin by the highest density of the figure, so equal widths mean equal densities
+    peak = max(densities['Density'].max() for densities, _, _, _ in halves if len(densities)) or 1.0
+
     for i, task in enumerate(tasks):
-        # Filter data for the current task
-        task_data = combined_data[combined_data['Task-Dimension'].str.startswith(str(task))]
-        
-        # Plot the violin graph for the current task, splitting by the 'Survey' hue
-        sns.violinplot(
-            x="Task-Dimension", y="Score", hue="Survey", data=task_data, 
-            ax=axs[i], split=True, inner="quartile", palette=hue_palette
-        )
-        
+        ax = axs[i]
+        task_labels = [label for label in labels if label.startswith(f'{task}-')]
+        for position, label in enumerate(task_labels):
+            for densities, _, side, color in halves:
+                group = densities[densities['Task-Dimension'] == label]
+                if group.empty:
+                    continue
+                score = group['Score'].to_numpy()
+                width = 0.4 * group['Density'].to_numpy() / peak
+                if score[0] == score[-1]:
+                    # Every answer has the same score, so the distribution collapses to a line
+                    ax.plot([position, position + side * 0.4], [score[0], score[0]], color=color, linewidth=2)
+                    continue
+                ax.fill_betweenx(score, position, position + side * width, facecolor=color, edgecolor='0.25', linewidth=1)
+
+                # Draw the quartiles across the half violin, at the width of the density there
+                for column, style in (('Q1', ':'), ('Median', '--'), ('Q3', ':')):
+                    level = group[column].iloc[0]
+                    ax.plot([position, position + side * np.interp(level, score, width)], [level, level],
+                            linestyle=style, color='0.25', linewidth=1)
+
+        ax.set_xticks(range(len(task_labels)))
+        ax.set_xticklabels(task_labels)
+        ax.set_xlim(-0.5, len(task_labels) - 0.5)
+
         # Set title and x-label for the subplot
-        axs[i].set_title(f'Task {task} Distribution')
-        axs[i].set_xlabel('Dimension')
+        ax.set_title(f'Task {task} Distribution')
+        ax.set_xlabel('Dimension')
         
         # Set y-label only for the first subplot to avoid repetition
-        if i == 0:
-            axs[i].set_ylabel('Score')
-        else:
-            axs[i].set_ylabel('')
+        ax.set_ylabel('Score' if i == 0 else '')
+
+    axs[0].legend(handles=[plt.Rectangle((0, 0), 1, 1, facecolor=color) for _, _, _, color in halves],
+                  labels=[name for _, name, _, _ in halves], title='Survey')
 
     # Adjust the layout for better presentation
     plt.tight_layout()
     
     # Render the plots
-    plt.show()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
+
+
+@instrumented('plot.plot_wave_small_multiples')
+def plot_wave_small_multiples(wave_averages, wave_labels, tasks, dimensions, show=True):
+    """
+    Plots one small line chart per task showing how the average of every dimension evolves across survey waves.
+    
+    Parameters:
+    - wave_averages (ndarray): (waves × tasks × dimensions) average scores, e.g. `SurveyWaves.averages`.
+    - wave_labels (list): Display name of each wave.
+    - tasks (list): A list of task identifiers.
+    - dimensions (list): A list of dimension identifiers.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
+    
+    Returns:
+    Figure: The matplotlib figure.
+    """
+    # Arrange the tasks in a grid of at most 4 columns, sharing both axes
+    n_columns = min(len(tasks), 4)
+    n_rows = int(np.ceil(len(tasks) / n_columns))
+    fig, axs = plt.subplots(n_rows, n_columns, figsize=(4 * n_columns, 3.5 * n_rows), sharex=True, sharey=True, squeeze=False)
+    x = np.arange(len(wave_labels))
+
+    for idx, task in enumerate(tasks):
+        ax = axs[idx // n_columns][idx % n_columns]
+        for dim_idx, dimension in enumerate(dimensions):
+            ax.plot(x, wave_averages[:, idx, dim_idx], marker='o', label=dimension,
+                    color=color_palette[dim_idx % len(color_palette)])
+        ax.set_title(f'Task {task}')
+        ax.set_ylim(0, 7)
+        ax.set_xticks(x)
+        ax.set_xticklabels([textwrap.fill(str(label), width=15) for label in wave_labels], rotation=45, ha='right')
+
+    # Hide the unused cells of the grid
+    for idx in range(len(tasks), n_rows * n_columns):
+        axs[idx // n_columns][idx % n_columns].set_visible(False)
+
+    axs[0][0].set_ylabel('Average Score')
+    axs[0][0].legend(title='Dimension')
+    fig.suptitle('Average Scores Across Survey Waves')
+    plt.tight_layout()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
+
+
+@instrumented('plot.plot_wave_deltas')
+def plot_wave_deltas(deltas, wave_labels, tasks, dimensions, show=True):
+    """
+    Plots a heatmap of the change in every task/dimension average relative to a baseline wave.
+    
+    Parameters:
+    - deltas (ndarray): (waves × tasks × dimensions) differences, e.g. from `SurveyWaves.deltas()`.
+    - wave_labels (list): Display name of each wave.
+    - tasks (list): A list of task identifiers.
+    - dimensions (list): A list of dimension identifiers.
+    - show (bool, optional): If True (default), display the figure. Set to False to keep it open for saving.
+    
+    Returns:
+    Figure: The matplotlib figure.
+    """
+    # One row per task and dimension, one column per wave
+    heatmap_data = pd.DataFrame(
+        deltas.reshape(len(wave_labels), -1).T,
+        index=[f'{dimension}{task}' for task in tasks for dimension in dimensions],
+        columns=wave_labels
+    )
+    fig = plt.figure(figsize=(2 + 1.5 * len(wave_labels), 0.3 * len(heatmap_data) + 2))
+    sns.heatmap(heatmap_data, annot=len(heatmap_data) <= 40, fmt='.2f', cmap='coolwarm', center=0)
+    plt.title('Change in Average Scores Across Survey Waves')
+    plt.tight_layout()
+    if show:
+        with span('plot.show'):
+            plt.show()
+    return fig
@@ -0,0 +1,270 @@
+import numpy as np
+import pandas as pd
+
+from data_processing_API import prepare_data_for_violinplots
+from prioritization import averages_matrix, score_coefficients, weighted_dimensions, weights_matrix
+from significance import adjust_p_values, mann_whitney, permutation_test, respondent_group_means
+from survey_schema import DIMENSION_ORDER, group_indicator, score_matrix
+
+
+class SurveyWaves:
+    """
+    Comparison of any number of survey waves, built from one wave × task × dimension array.
+
+    Every survey is aggregated once; deltas, trends, prioritization scores and plots across waves are then
+    derived from the precomputed arrays instead of recomputing each pair of surveys.
+
+    Attributes:
+    - processors (list): One `SurveyDataProcessor` per wave, in wave order.
+    - labels (list): Display name of each wave.
+    - tasks (list): Union of the tasks of all waves.
+    - dimensions (list): Union of the dimensions of all waves, in display order.
+    - averages (ndarray): (waves × tasks × dimensions) average scores; NaN where a wave lacks a combination.
+    - general_questions (list): Union of the general questions of all waves.
+    - general_averages (ndarray): (waves × general questions) average scores.
+    """
+
+    def __init__(self, processors, labels=None):
+        """
+        Aggregates every wave once.
+
+        Parameters:
+        - processors (list): One `SurveyDataProcessor` per wave, in wave order.
+        - labels (list, optional): Display name of each wave. Defaults to the survey names.
+        """
+        self.processors = list(processors)
+        self.labels = list(labels) if labels is not None else [p.survey_name for p in self.processors]
+
+        self.tasks = sorted({task for p in self.processors for task in p.TASKS})
+        discovered = list(dict.fromkeys(dim for p in self.processors for dim in p.DIMENSIONS))
+        self.dimensions = [dim for dim in DIMENSION_ORDER if dim in discovered] + \
+                          [dim for dim in discovered if dim not in DIMENSION_ORDER]
+        self.averages = np.stack([averages_matrix(p.calculate_averages(), self.tasks, self.dimensions)
+                                  for p in self.processors])
+
+        general = [p.calculate_general_averages() for p in self.processors]
+        self.general_questions = list(dict.fromkeys(question for averages in general for question in averages.index))
+        self.general_averages = np.stack([
+            pd.to_numeric(averages, errors='coerce').reindex(self.general_questions).to_numpy(dtype=np.float64)
+            for averages in general
+        ])
+
+    @classmethod
+    def load(cls, survey_names, labels=None, **loader_options):
+        """
+        Fetches the surveys concurrently and builds the wave comparison.
+
+        Parameters:
+        - survey_names (list): Names of the Google Sheets, in wave order.
+        - labels (list, optional): Display name of each wave. Defaults to the survey names.
+        - loader_options: Keyword arguments for `survey_loader.load_surveys`.
+
+        Returns:
+        - SurveyWaves: The wave comparison.
+        """
+        from survey_loader import load_surveys
+
+        loaded = dict(load_surveys(survey_names, **loader_options))
+        return cls([loaded[survey_name] for survey_name in survey_names], labels)
+
+    def deltas(self, baseline=0):
+        """
+        Returns the change of every average relative to one wave.
+
+        Parameters:
+        - baseline (int, optional): Index of the reference wave. Default is 0 (the first wave).
+
+        Returns:
+        - ndarray: (waves × tasks × dimensions) differences to the baseline wave.
+        """
+        return self.averages - self.averages[baseline]
+
+    def consecutive_deltas(self):
+        """
+        Returns the change of every average from each wave to the next.
+
+        Returns:
+        - ndarray: ((waves - 1) × tasks × dimensions) differences between consecutive waves.
+        """
+        return np.diff(self.averages, axis=0)
+
+    def trend(self):
+        """
+        Fits a least-squares line through the waves of every task and dimension.
+
+        Waves in which a combination is missing are left out of its fit.
+
+        Returns:
+        - ndarray: (tasks × dimensions) slopes, in score points per wave.
+        """
+        x = np.arange(len(self.averages), dtype=np.float64)[:, np.newaxis, np.newaxis]
+        valid = ~np.isnan(self.averages)
+        counts = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean = np.where(valid, x, 0).sum(axis=0) / counts
+            y_mean = np.where(valid, self.averages, 0).sum(axis=0) / counts
+            dx = np.where(valid, x - x_mean, 0)
+            dy = np.where(valid, self.averages - y_mean, 0)
+            return (dx * dy).sum(axis=0) / (dx ** 2).sum(axis=0)
+
+    def prioritization_scores(self, weights):
+        """
+        Computes the prioritization scores of every task in every wave.
+
+        Parameters:
+        - weights (dict): A dictionary with dimensions as keys and their respective weights as values.
+
+        Returns:
+        - DataFrame: Waves as rows and tasks as columns.
+        """
+        dimensions = weighted_dimensions(weights, self.dimensions)
+        matrices = self.averages[:, :, [self.dimensions.index(dim) for dim in dimensions]]
+        scores = score_coefficients(matrices, dimensions) @ weights_matrix([weights], dimensions)[0]
+        return pd.DataFrame(scores, index=pd.Index(self.labels, name='Wave'), columns=pd.Index(self.tasks, name='Task'))
+
+    def to_frame(self, baseline=0):
+        """
+        Returns the averages of all waves in long form.
+
+        Parameters:
+        - baseline (int, optional): Index of the reference wave for the 'Delta' column. Default is 0.
+
+        Returns:
+        - DataFrame: Columns 'Wave', 'Task', 'Dimension', 'Average' and 'Delta'.
+        """
+        n_waves, n_tasks, n_dimensions = self.averages.shape
+        return pd.DataFrame({
+            'Wave': np.repeat(self.labels, n_tasks * n_dimensions),
+            'Task': np.tile(np.repeat(self.tasks, n_dimensions), n_waves),
+            'Dimension': np.tile(self.dimensions, n_waves * n_tasks),
+            'Average': self.averages.ravel(),
+            'Delta': self.deltas(baseline).ravel(),
+        })
+
+    def question_matrices(self):
+        """
+        Returns the score matrices of all waves over the union of their score and general question columns.
+
+        Every column belongs to one question: a task/dimension group of the `tasks` × `dimensions` grid (in the
+        order of `averages`) or one of the `general_questions` after them.
+
+        Returns:
+        - tuple: (matrices, indicator), one (respondents × columns) matrix per wave with NaN for missing answers
+                 and columns a wave lacks, and the (columns × questions) 0/1 indicator matrix.
+        """
+        grid = {(task, dimension): i * len(self.dimensions) + j
+                for i, task in enumerate(self.tasks) for j, dimension in enumerate(self.dimensions)}
+        general = {question: len(grid) + i for i, question in enumerate(self.general_questions)}
+
+        question_of = {}
+        for p in self.processors:
+            for column, group in zip(p.schema.score_columns, p.schema.group):
+                question_of.setdefault(column, grid[p.schema.groups[group]])
+            for column in p.schema.general_columns:
+                question_of.setdefault(column, general[column])
+        columns = list(question_of)
+
+        matrices = []
+        for p in self.processors:
+            present = [i for i, column in enumerate(columns) if column in p.df.columns]
+            matrix = np.full((len(p.df), len(columns)), np.nan)
+            matrix[:, present] = score_matrix(p.df, [columns[i] for i in present])
+            matrices.append(matrix)
+        indicator = group_indicator(np.array(list(question_of.values()), dtype=np.int64), len(grid) + len(general))
+        return matrices, indicator
+
+    def significance(self, baseline=0, n_permutations=10_000, correction='holm', seed=None, n_jobs=None):
+        """
+        Tests whether every task/dimension average and general question changed relative to one wave.
+
+        Two tests run per question and wave, for all questions at once:
+        - A permutation test on the difference in averages (the 'Delta' of `to_frame`), which reshuffles the
+          respondents of both waves.
+        - A Mann-Whitney U test on the respondents' average answer to the question.
+        The p-values of each test are corrected for multiple comparisons over all rows of the result.
+
+        Parameters:
+        - baseline (int, optional): Index of the reference wave. Default is 0 (the first wave).
+        - n_permutations (int, optional): Number of permutations per compared wave. Default is 10 000.
+        - correction (str, optional): 'holm', 'bh' (Benjamini-Hochberg) or None; see
+          `significance.adjust_p_values`. Default is 'holm'.
+        - seed (int, optional): Seed that makes the permutations reproducible.
+        - n_jobs (int, optional): Number of worker processes for the permutations; by default everything runs
+          in this process.
+
+        Returns:
+        - DataFrame: Columns 'Wave', 'Baseline', 'Question' (a 'task-dimension' label such as '1-E' or the
+                     general question), 'Delta', 'Permutation p', 'Mann-Whitney U', 'Mann-Whitney p',
+                     'Effect Size' (rank-biserial correlation, positive when the wave scores higher),
+                     'Permutation p (adjusted)' and 'Mann-Whitney p (adjusted)'.
+        """
+        matrices, indicator = self.question_matrices()
+        questions = [f"{task}-{dimension}" for task in self.tasks for dimension in self.dimensions] + \
+                    list(self.general_questions)
+        earlier_means = respondent_group_means(matrices[baseline], indicator)
+
+        frames = []
+        for wave, matrix in enumerate(matrices):
+            if wave == baseline:
+                continue
+            wave_seed = None if seed is None else [seed, wave]
+            delta, permutation_p = permutation_test(matrices[baseline], matrix, indicator, n_permutations,
+                                                    seed=wave_seed, n_jobs=n_jobs)
+            u, mann_whitney_p, effect_size = mann_whitney(earlier_means, respondent_group_means(matrix, indicator))
+            frames.append(pd.DataFrame({
+                'Wave': self.labels[wave],
+                'Baseline': self.labels[baseline],
+                'Question': questions,
+                'Delta': delta,
+                'Permutation p': permutation_p,
+                'Mann-Whitney U': u,
+                'Mann-Whitney p': mann_whitney_p,
+                'Effect Size': effect_size,
+            }))
+
+        columns = ['Wave', 'Baseline', 'Question', 'Delta', 'Permutation p', 'Mann-Whitney U', 'Mann-Whitney p',
+                   'Effect Size']
+        result = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        result['Permutation p (adjusted)'] = adjust_p_values(result['Permutation p'].to_numpy(dtype=np.float64), correction)
+        result['Mann-Whitney p (adjusted)'] = adjust_p_values(result['Mann-Whitney p'].to_numpy(dtype=np.float64), correction)
+        return result
+
+    def wave_averages(self, wave):
+        """
+        Returns the averages of one wave in the format of `SurveyDataProcessor.calculate_averages`.
+
+        Parameters:
+        - wave (int): Index of the wave.
+
+        Returns:
+        - DataFrame: Columns 'Task', 'Dimension' and 'Average'.
+        """
+        return pd.DataFrame({
+            'Task': np.repeat(self.tasks, len(self.dimensions)),
+            'Dimension': np.tile(self.dimensions, len(self.tasks)),
+            'Average': self.averages[wave].ravel(),
+        })
+
+    def violin_data(self):
+        """
+        Returns the long-form violin plot data of all waves, with the wave labels as 'Survey'.
+
+        Returns:
+        - DataFrame: Columns 'Survey', 'Task-Dimension' and 'Score'.
+        """
+        data = prepare_data_for_violinplots(self.processors)
+        names = {p.survey_name: label for p, label in zip(self.processors, self.labels)}
+        data['Survey'] = data['Survey'].cat.rename_categories(lambda name: names.get(name, name))
+        return data
+
+    def violin_densities(self):
+        """
+        Returns the precomputed violin plot densities of all waves, with the wave labels as 'Survey'.
+
+        Returns:
+        - DataFrame: The summaries of `SurveyDataProcessor.prepare_violin_densities`, one wave after the other.
+        """
+        frames = [p.prepare_violin_densities().assign(Survey=label) for p, label in zip(self.processors, self.labels)]
+        data = pd.concat(frames, ignore_index=True)
+        data['Survey'] = pd.Categorical(data['Survey'], categories=self.labels)
+        return data